@@ -0,0 +1,212 @@
+"""
+Cliente HTTP Asíncrono para OpenAI (Chat Completions)
+Un solo httpx.AsyncClient (pool de conexiones keep-alive) compartido por todo el
+proceso. Vive en un event loop propio (thread dedicado), así los endpoints síncronos
+(/analyze, /analyze/batch, cola de investigación) envían corrutinas con run() y las
+llamadas independientes corren en paralelo con asyncio.gather.
+
+- Timeouts explícitos de conexión y lectura (AI_CONNECT_TIMEOUT / AI_READ_TIMEOUT)
+- Reintentos con backoff exponencial + jitter ante errores de red, 429 y 5xx
+- Latencia registrada por tipo de llamada (stats())
+- Caché persistente de respuestas (llm_cache) con refresco en background de entradas vencidas;
+  la E/S de SQLite corre en threads (asyncio.to_thread) para no frenar el loop compartido
+- OPENAI_BASE_URL permite apuntar a un servidor stub local en pruebas
+"""
+import os
+import time
+import random
+import asyncio
+import threading
+
+import httpx
+
+from llm_cache import llm_cache
+
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or "https://api.openai.com/v1"
+AI_CONNECT_TIMEOUT = float(os.getenv("AI_CONNECT_TIMEOUT", "5"))
+AI_READ_TIMEOUT = float(os.getenv("AI_READ_TIMEOUT", "60"))
+AI_MAX_RETRIES = int(os.getenv("AI_MAX_RETRIES", "2"))
+AI_MAX_CONNECTIONS = int(os.getenv("AI_MAX_CONNECTIONS", "20"))
+AI_BACKOFF_BASE = 0.25  # Segundos. Espera antes del reintento n: U(0, base * 2^n) (full jitter)
+AI_BACKOFF_MAX = 8.0
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class AIClientError(Exception):
+    """Fallo definitivo de una llamada a la IA (después de los reintentos)."""
+
+
+class AsyncAIClient:
+    """
+    Cliente pooled de Chat Completions con reintentos y métricas de latencia.
+
+    Métricas por etiqueta: {"calls", "errors", "retries", "avg_ms", "max_ms", "last_ms"}
+    """
+
+    def __init__(self, base_url: str = OPENAI_BASE_URL, api_key: str = None,
+                 connect_timeout: float = AI_CONNECT_TIMEOUT, read_timeout: float = AI_READ_TIMEOUT,
+                 max_retries: int = AI_MAX_RETRIES, max_connections: int = AI_MAX_CONNECTIONS,
+                 cache=None):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key if api_key is not None else os.getenv("OPENAI_API_KEY", "")
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.max_retries = max_retries
+        self.cache = cache
+        self._refreshing = {}  # llave -> Task de refresco en background (deduplicado)
+        self._client = None
+        self._loop = None
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+
+    # --- Event loop compartido ---
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="ai-client-loop", daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    def run(self, coro, timeout: float = None):
+        """Ejecuta una corrutina en el loop del cliente y espera el resultado (para código síncrono)."""
+        future = asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+        return future.result(timeout)
+
+    def close(self):
+        """Cierra el pool de conexiones y detiene el loop (shutdown de la app)."""
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is None or loop.is_closed():
+            return
+        if self._client is not None:
+            asyncio.run_coroutine_threadsafe(self._client.aclose(), loop).result(5)
+            self._client = None
+        loop.call_soon_threadsafe(loop.stop)
+
+    def _http(self) -> httpx.AsyncClient:
+        # Solo se usa dentro del loop del cliente (un único thread), no requiere lock
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url, timeout=self.timeout, limits=self.limits,
+                headers={"Authorization": f"Bearer {self.api_key}"}
+            )
+        return self._client
+
+    # --- Llamadas ---
+
+    @staticmethod
+    def _backoff(attempt: int, retry_after: str = None) -> float:
+        try:
+            if retry_after is not None:
+                return min(float(retry_after), AI_BACKOFF_MAX)
+        except ValueError:
+            pass
+        return random.uniform(0, min(AI_BACKOFF_MAX, AI_BACKOFF_BASE * 2 ** attempt))
+
+    async def chat(self, messages: list, model: str = "gpt-3.5-turbo", max_tokens: int = None,
+                   temperature: float = None, label: str = "chat", use_cache: bool = True,
+                   validate=None) -> str:
+        """
+        POST /chat/completions. Retorna el contenido del primer mensaje.
+        Con caché: hit => sin llamada; entrada vencida => se sirve y se refresca en background.
+        validate(contenido) -> bool decide si la respuesta se guarda (ej. JSON parseable).
+        Raises:
+            AIClientError: Error no recuperable o reintentos agotados
+        """
+        payload = {"model": model, "messages": messages}
+        if max_tokens is not None:
+            payload["max_tokens"] = max_tokens
+        if temperature is not None:
+            payload["temperature"] = temperature
+
+        key = None
+        if use_cache and self.cache is not None:
+            key = self.cache.make_key(model, temperature, max_tokens, messages)
+            cached = await asyncio.to_thread(self.cache.get, key, label)
+            if cached is not None:
+                content, stale = cached
+                if stale and key not in self._refreshing:
+                    self._refreshing[key] = asyncio.ensure_future(self._refresh(key, payload, label, validate))
+                return content
+
+        content = await self._request(payload, label)
+        if key is not None and (validate is None or validate(content)):
+            await asyncio.to_thread(self.cache.put, key, content, label, model)
+        return content
+
+    async def _refresh(self, key: str, payload: dict, label: str, validate):
+        try:
+            content = await self._request(payload, label)
+            if validate is None or validate(content):
+                await asyncio.to_thread(self.cache.put, key, content, label, payload["model"])
+        except AIClientError as e:
+            print(f"⚠️ No se pudo refrescar la caché de IA ({label}): {e}")
+        finally:
+            self._refreshing.pop(key, None)
+
+    async def _request(self, payload: dict, label: str) -> str:
+        start = time.perf_counter()
+        retry_after = None
+        error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                await asyncio.sleep(self._backoff(attempt, retry_after))
+            try:
+                response = await self._http().post("/chat/completions", json=payload)
+            except httpx.TransportError as e:  # Incluye timeouts de conexión / lectura
+                error, retry_after = f"{type(e).__name__}: {e}", None
+                continue
+            if response.status_code in RETRY_STATUS:
+                error, retry_after = f"HTTP {response.status_code}", response.headers.get("Retry-After")
+                continue
+            if response.status_code >= 400:
+                error = f"HTTP {response.status_code}: {response.text[:200]}"
+                break
+            try:
+                content = response.json()["choices"][0]["message"]["content"]
+            except (ValueError, KeyError, IndexError, TypeError) as e:
+                error = f"Respuesta inválida: {e}"
+                break
+            self._record(label, start, attempt, ok=True)
+            return content.strip()
+
+        self._record(label, start, attempt, ok=False)
+        raise AIClientError(f"{label}: {error}")
+
+    # --- Métricas ---
+
+    def _record(self, label: str, start: float, retries: int, ok: bool):
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._stats_lock:
+            entry = self._stats.setdefault(
+                label, {"calls": 0, "errors": 0, "retries": 0, "total_ms": 0.0, "max_ms": 0.0, "last_ms": 0.0}
+            )
+            entry["calls"] += 1
+            entry["errors"] += 0 if ok else 1
+            entry["retries"] += retries
+            entry["total_ms"] += elapsed_ms
+            entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+            entry["last_ms"] = elapsed_ms
+        print(f"[IA] {label}: {elapsed_ms:.0f} ms ({'ok' if ok else 'error'}, reintentos: {retries})")
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                label: {
+                    "calls": e["calls"],
+                    "errors": e["errors"],
+                    "retries": e["retries"],
+                    "avg_ms": round(e["total_ms"] / e["calls"], 1),
+                    "max_ms": round(e["max_ms"], 1),
+                    "last_ms": round(e["last_ms"], 1)
+                }
+                for label, e in self._stats.items()
+            }
+
+
+# Instancia compartida por el proceso (un pool de conexiones por worker)
+ai_client = AsyncAIClient(cache=llm_cache)
@@ -1,21 +1,66 @@
 import os
-import openai
+import asyncio
 from dotenv import load_dotenv
 
+from ai_client import ai_client
+from legal_justification import get_justification_engine
+
 load_dotenv()
 
-# Configurar API Key (Manejo de errores si no existe)
-try:
-    openai.api_key = os.getenv("OPENAI_API_KEY")
-except:
-    pass
+def _parse_json_response(content: str):
+    """JSON de la respuesta, quitando bloques de código markdown si la IA los pone."""
+    import json
+    if "```json" in content:
+        content = content.split("```json")[1].split("```")[0].strip()
+    elif "```" in content:
+        content = content.split("```")[1].strip()
+    return json.loads(content)
+
+def _is_json_response(content: str) -> bool:
+    try:
+        _parse_json_response(content)
+        return True
+    except (ValueError, IndexError):
+        return False
 
 class AIService:
-    def __init__(self):
+    """
+    Capa cualitativa (IA). Las llamadas reales van por el cliente asíncrono compartido
+    (ai_client: pool HTTP, timeouts, reintentos); los métodos síncronos son wrappers
+    para el código existente y generate_report_sections corre las llamadas en paralelo.
+    """
+    def __init__(self, client=None):
         self.api_key = os.getenv("OPENAI_API_KEY") 
         self.mock_mode = not self.api_key or "placeholder" in self.api_key
+        self.client = client or ai_client
+
+    def generate_report_sections(self, data: dict, base_structure: list = None):
+        """
+        Justificación legal + enriquecimiento capitular en paralelo (son independientes).
+        Returns:
+            (justificacion_legal, estructura_ampliada | None si no hay base_structure)
+        """
+        async def both():
+            calls = [self.agenerate_legal_justification(data)]
+            if base_structure is not None:
+                calls.append(self.aenrich_chapter_structure(
+                    base_structure, data.get("estado", ""), data.get("municipio", "")
+                ))
+            return await asyncio.gather(*calls)
+
+        results = self.client.run(both())
+        return results[0], (results[1] if base_structure is not None else None)
 
     def generate_legal_justification(self, data: dict) -> str:
+        return self.client.run(self.agenerate_legal_justification(data))
+
+    def enrich_chapter_structure(self, base_structure: list, estado: str, municipio: str) -> list:
+        return self.client.run(self.aenrich_chapter_structure(base_structure, estado, municipio))
+
+    def research_municipal_regulations(self, estado: str, municipio: str) -> dict:
+        return self.client.run(self.aresearch_municipal_regulations(estado, municipio))
+
+    async def agenerate_legal_justification(self, data: dict) -> str:
         """
         Genera un párrafo de justificación legal estricta y técnica.
         YA NO USA EL TEXTO GENÉRICO DEL ATLAS.
@@ -28,73 +73,11 @@ class AIService:
         aforo = data.get("aforo", 0)
         niveles = data.get("niveles", 1)
 
-        # Construcción lógica de causales de riesgo
-        # Construcción lógica de causales de riesgo
-        causales = []
-        if trabajadores > 25: causales.append(f"PLANTILLA DE TRABAJADORES SUPERIOR A 25 PERSONAS ({trabajadores})")
-        if m2 > 250: causales.append(f"SUPERFICIE CONSTRUIDA SUPERIOR A 250 M² ({m2} M²)")
-        if aforo > 50: causales.append(f"AFORO DE VISITANTES SUPERIOR A 50 PERSONAS ({aforo})")
-        if niveles > 2: causales.append(f"NIVELES ESTRUCTURALES MAYOR A 2 ({niveles})")
-        
-        # Nuevos factores de riesgo (Sincronización con Rules Engine)
-        if data.get("has_gas"): causales.append("INSTALACIÓN DE GAS L.P./NATURAL")
-        if data.get("has_special_inst"): causales.append("INSTALACIONES ESPECIALES (DICTAMEN ELÉCTRICO/GAS)")
-        if data.get("has_pool"): causales.append("RIESGO ACUÁTICO (ALBERCA/CUERPO DE AGUA)")
-        
-        if "Aeropuerto" in tipo or "Hangar" in tipo: causales.append("GIRO DE ALTO RIESGO POR INFRAESTRUCTURA DE TRANSPORTE AÉREO")
-
-        causales_str = ", ".join(causales) if causales else "GIRO REGULADO POR LEY DE ESTABLECIMIENTOS MERCANTILES"
-
-        # TEXTO BASE DETERMINISTA (SOLICITADO POR EL USUARIO - EN SINTONÍA CON CALCULATOR)
-        # 1. Determinación de nombres de ley precisos (Simulación/Fallback)
-        # 1. Determinación de nombres de ley precisos (Base de Datos Interna Ampliada)
-        leyes_estados = {
-            "Aguascalientes": {"ley": "LEY DE PROTECCIÓN CIVIL DEL ESTADO DE AGUASCALIENTES", "art": "ARTÍCULO 45"},
-            "Baja California": {"ley": "LEY DE PROTECCIÓN CIVIL Y GESTIÓN DE RIESGOS DE BAJA CALIFORNIA", "art": "ARTÍCULO 58"},
-            "Baja California Sur": {"ley": "LEY DE PROTECCIÓN CIVIL DE B.C.S.", "art": "ARTÍCULO 33"},
-            "Campeche": {"ley": "LEY DE PROTECCIÓN CIVIL DEL ESTADO DE CAMPECHE", "art": "ARTÍCULO 60"},
-            "Coahuila": {"ley": "LEY DE PROTECCIÓN CIVIL PARA EL ESTADO DE COAHUILA", "art": "ARTÍCULO 42"},
-            "Colima": {"ley": "LEY DE PROTECCIÓN CIVIL DEL ESTADO DE COLIMA", "art": "ARTÍCULO 55"},
-            "Chiapas": {"ley": "LEY DE PROTECCIÓN CIVIL DEL ESTADO DE CHIAPAS", "art": "ARTÍCULO 74"},
-            "Chihuahua": {"ley": "LEY DE PROTECCIÓN CIVIL DEL ESTADO DE CHIHUAHUA", "art": "ARTÍCULO 68"},
-            "Ciudad de México": {"ley": "LEY DE GESTIÓN INTEGRAL DE RIESGOS Y PC DE LA CDMX", "art": "ARTÍCULO 58"},
-            "Durango": {"ley": "LEY DE PROTECCIÓN CIVIL DEL ESTADO DE DURANGO", "art": "ARTÍCULO 40"},
-            "Guanajuato": {"ley": "LEY DE PROTECCIÓN CIVIL PARA EL ESTADO DE GUANAJUATO", "art": "ARTÍCULO 39"},
-            "Guerrero": {"ley": "LEY DE PROTECCIÓN CIVIL DEL ESTADO DE GUERRERO", "art": "ARTÍCULO 50"},
-            "Hidalgo": {"ley": "LEY DE PROTECCIÓN CIVIL DEL ESTADO DE HIDALGO", "art": "ARTÍCULO 72"},
-            "Jalisco": {"ley": "LEY DEL SISTEMA ESTATAL DE PROTECCIÓN CIVIL DE JALISCO", "art": "ARTÍCULO 24"},
-            "México": {"ley": "LIBRO SEXTO DEL CÓDIGO ADMINISTRATIVO DEL EDOMEX", "art": "ARTÍCULO 6.18"},
-            "Michoacán": {"ley": "LEY DE PROTECCIÓN CIVIL DEL ESTADO DE MICHOACÁN", "art": "ARTÍCULO 55"},
-            "Morelos": {"ley": "LEY DE PROTECCIÓN CIVIL DEL ESTADO DE MORELOS", "art": "ARTÍCULO 48"},
-            "Nayarit": {"ley": "LEY DE PROTECCIÓN CIVIL DEL ESTADO DE NAYARIT", "art": "ARTÍCULO 62"},
-            "Nuevo León": {"ley": "LEY DE PROTECCIÓN CIVIL DEL ESTADO DE NUEVO LEÓN", "art": "ARTÍCULO 18"},
-            "Oaxaca": {"ley": "LEY DE PROTECCIÓN CIVIL DEL ESTADO DE OAXACA", "art": "ARTÍCULO 44"},
-            "Puebla": {"ley": "LEY DEL SISTEMA ESTATAL DE PROTECCIÓN CIVIL DE PUEBLA", "art": "ARTÍCULO 66"},
-            "Querétaro": {"ley": "LEY DE PROTECCIÓN CIVIL DEL ESTADO DE QUERÉTARO", "art": "ARTÍCULO 54"},
-            "Quintana Roo": {"ley": "LEY DE PROTECCIÓN CIVIL DEL ESTADO DE QUINTANA ROO", "art": "ARTÍCULO 88"},
-            "San Luis Potosí": {"ley": "LEY DEL SISTEMA DE PROTECCIÓN CIVIL DE S.L.P.", "art": "ARTÍCULO 52"},
-            "Sinaloa": {"ley": "LEY DE PROTECCIÓN CIVIL DEL ESTADO DE SINALOA", "art": "ARTÍCULO 70"},
-            "Sonora": {"ley": "LEY DE PROTECCIÓN CIVIL PARA EL ESTADO DE SONORA", "art": "ARTÍCULO 38"},
-            "Tabasco": {"ley": "LEY DE PROTECCIÓN CIVIL DEL ESTADO DE TABASCO", "art": "ARTÍCULO 65"},
-            "Tamaulipas": {"ley": "LEY DE PROTECCIÓN CIVIL DEL ESTADO DE TAMAULIPAS", "art": "ARTÍCULO 41"},
-            "Tlaxcala": {"ley": "LEY DE PROTECCIÓN CIVIL DEL ESTADO DE TLAXCALA", "art": "ARTÍCULO 53"},
-            "Veracruz": {"ley": "LEY DE PC Y REDUCCIÓN DE RIESGO DE VERACRUZ", "art": "ARTÍCULO 66"},
-            "Yucatán": {"ley": "LEY DE PROTECCIÓN CIVIL DEL ESTADO DE YUCATÁN", "art": "ARTÍCULO 59"},
-            "Zacatecas": {"ley": "LEY DE PROTECCIÓN CIVIL DEL ESTADO DE ZACATECAS", "art": "ARTÍCULO 35"}
-        }
-
-        info_estatal = leyes_estados.get(estado, {"ley": "LEY DE PROTECCIÓN CIVIL DEL ESTADO", "art": "ARTÍCULO 58"})
-        ley_estatal_nombre = info_estatal["ley"]
-        art_ley_estatal = info_estatal["art"]
-
-        # 2. Generación del Texto Estricto (Sin Atlas, Referencias Precisas)
-        texto_juridico_estricto = (
-            f"EL INMUEBLE ESTÁ OBLIGADO A PRESENTAR UN PROGRAMA INTERNO DE PROTECCIÓN CIVIL (PIPC) "
-            f"DERIVADO DE SUS CARACTERÍSTICAS FÍSICAS Y OPERATIVAS: {causales_str}. "
-            f"ESTA CONDICIÓN ACTIVA LA OBLIGATORIEDAD PREVISTA EN EL ARTÍCULO 39 DE LA LEY GENERAL DE PROTECCIÓN CIVIL; "
-            f"{art_ley_estatal} DE LA {ley_estatal_nombre} Y SU REGLAMENTO ESTATAL; "
-            f"ASÍ COMO LAS DISPOSICIONES DEL REGLAMENTO DE PROTECCIÓN CIVIL DEL MUNICIPIO DE {municipio.upper()}."
-        )
+        # TEXTO BASE DETERMINISTA (plantillas pre-compiladas desde legal_db.json, compartidas
+        # con CivilProtectionCalculator: el resumen ejecutivo y el dictamen no pueden divergir)
+        engine = get_justification_engine()
+        causales_str = engine.causales(data)
+        texto_juridico_estricto = engine.render(data)
 
         if self.mock_mode:
             return texto_juridico_estricto
@@ -125,13 +108,13 @@ class AIService:
             3. El Reglamento de Protección Civil del Municipio de {municipio}.
             """
             
-            response = openai.ChatCompletion.create(
+            return await self.client.chat(
+                [{"role": "user", "content": prompt}],
                 model="gpt-3.5-turbo",
-                messages=[{"role": "user", "content": prompt}],
                 max_tokens=150,
-                temperature=0.2
+                temperature=0.2,
+                label="legal_justification"
             )
-            return response.choices[0].message.content.strip()
         except Exception as e:
             print(f"Error OpenAI: {e}")
             return texto_juridico_estricto
@@ -142,7 +125,7 @@ class AIService:
         # La App usará sus datos internos actualizados.
         return []
 
-    def enrich_chapter_structure(self, base_structure: list, estado: str, municipio: str) -> list:
+    async def aenrich_chapter_structure(self, base_structure: list, estado: str, municipio: str) -> list:
         """
         Amplía la estructura capitular base usando IA para insertar requisitos
         específicos del reglamento municipal o condiciones locales.
@@ -221,31 +204,27 @@ class AIService:
             FORMATO DE RESPUESTA: Solo el JSON válido.
             """
             
-            response = openai.ChatCompletion.create(
+            content = await self.client.chat(
+                [{"role": "user", "content": prompt}],
                 model="gpt-4", # Usamos GPT-4 para mayor precisión legal si es posible, si no fallback a lo que haya
-                messages=[{"role": "user", "content": prompt}],
                 max_tokens=2500,
-                temperature=0.5
+                temperature=0.5,
+                label="chapter_enrichment",
+                validate=_is_json_response  # No cachear respuestas que no se pueden usar
             )
-            
-            content = response.choices[0].message.content.strip()
-            # Limpieza de bloques de código markdown si la IA los pone
-            if "```json" in content:
-                content = content.split("```json")[1].split("```")[0].strip()
-            elif "```" in content:
-                content = content.split("```")[1].strip()
-            
-            return json.loads(content)
+            return _parse_json_response(content)
 
         except Exception as e:
             print(f"Error enriching structure with AI: {e}")
             return base_structure
 
 
-    def research_municipal_regulations(self, estado: str, municipio: str) -> dict:
+    async def aresearch_municipal_regulations(self, estado: str, municipio: str) -> dict:
         """
         Investiga automáticamente la normativa municipal específica usando IA.
         Retorna un diccionario con los datos normativos exactos del municipio.
+        Si no hubo investigación real (modo mock, error de API o respuesta no
+        parseable) retorna la estructura genérica con "_fallback" = motivo.
         
         Returns:
             dict: {
@@ -257,7 +236,7 @@ class AIService:
         """
         # Si estamos en modo mock, retornar estructura genérica
         if self.mock_mode:
-            return self._generate_generic_municipal_structure(estado, municipio)
+            return self._generate_generic_municipal_structure(estado, municipio, "modo mock (sin API key)")
         
         try:
             prompt = f"""Eres un experto en derecho administrativo mexicano especializado en Protección Civil Municipal.
@@ -284,37 +263,37 @@ INSTRUCCIONES:
 - Los artículos deben ser citaciones realistas para ese tipo de ordenamiento
 - SOLO devuelve el JSON, sin explicaciones adicionales"""
 
-            response = openai.ChatCompletion.create(
-                model="gpt-4",
-                messages=[
+            result_text = await self.client.chat(
+                [
                     {"role": "system", "content": "Eres un investigador jurídico experto en normativa municipal mexicana de Protección Civil."},
                     {"role": "user", "content": prompt}
                 ],
+                model="gpt-4",
                 temperature=0.3,  # Bajo para respuestas más precisas
-                max_tokens=300
+                max_tokens=300,
+                label="municipal_research",
+                validate=_is_json_response
             )
             
-            result_text = response.choices[0].message.content.strip()
-            
             # Intentar parsear JSON
-            import json
             try:
-                result_data = json.loads(result_text)
+                result_data = _parse_json_response(result_text)
                 return result_data
             except:
                 # Si falla el parsing, retornar genérico
                 print(f"⚠ Warning: AI response no parseable para {municipio}")
-                return self._generate_generic_municipal_structure(estado, municipio)
+                return self._generate_generic_municipal_structure(estado, municipio, "respuesta no parseable")
                 
         except Exception as e:
             print(f"⚠ Warning: AI research falló para {municipio}: {e}")
-            return self._generate_generic_municipal_structure(estado, municipio)
+            return self._generate_generic_municipal_structure(estado, municipio, str(e))
     
-    def _generate_generic_municipal_structure(self, estado: str, municipio: str) -> dict:
-        """Genera estructura genérica como fallback"""
+    def _generate_generic_municipal_structure(self, estado: str, municipio: str, reason: str) -> dict:
+        """Genera estructura genérica como fallback (marcada con el motivo en "_fallback")"""
         return {
             "reglamento": f"Reglamento de Protección Civil del Municipio de {municipio}",
             "bando": f"Bando de Policía y Gobierno del Municipio de {municipio}",
             "art_inspeccion": "Art. Fundamento (Facultad de Inspección)",
-            "art_bando": "Orden Público y Convivencia"
+            "art_bando": "Orden Público y Convivencia",
+            "_fallback": reason
         }
@@ -0,0 +1,177 @@
+"""
+Caché de Resultados de Análisis (Content-Addressed)
+Evita repetir motor de reglas + árbol normativo + IA cuando un consultor vuelve
+a correr /analyze con exactamente los mismos datos. main.py no reutiliza PDFs:
+cada dictamen lleva su fecha y hora de generación (pie de página y QR).
+
+La llave es el hash canónico del input sanitizado + versión de rules_matrix +
+versión del marco legal. Memoria LRU con TTL y, opcionalmente, respaldo en SQLite
+(ANALYSIS_CACHE_DB) para sobrevivir reinicios y compartirse entre workers.
+"""
+import os
+import json
+import time
+import copy
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from contextlib import closing, contextmanager
+
+CACHE_MAX_ENTRIES = int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", "256"))
+CACHE_TTL_SECONDS = int(os.getenv("ANALYSIS_CACHE_TTL", "86400"))
+CACHE_DB_PATH = os.getenv("ANALYSIS_CACHE_DB", "")  # Vacío = solo memoria
+
+
+class AnalysisCache:
+    """
+    Caché LRU/TTL de reportes completos.
+
+    Entradas: {"report": dict, "created_at": float}
+    """
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl_seconds: int = CACHE_TTL_SECONDS,
+                 db_path: str = CACHE_DB_PATH):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path or None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if self.db_path:
+            self._init_db()
+
+    @staticmethod
+    def make_key(input_dict: dict, rules_version: str, legal_version: str) -> str:
+        """Hash canónico (orden de llaves estable) del input + versiones de reglas y marco legal."""
+        payload = json.dumps(
+            {"input": input_dict, "rules": rules_version, "legal": legal_version},
+            sort_keys=True, ensure_ascii=False, default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    # --- Respaldo SQLite (opcional) ---
+
+    @contextmanager
+    def _connect(self):
+        """Conexión en una transacción (commit o rollback) que siempre se cierra al salir."""
+        with closing(sqlite3.connect(self.db_path, timeout=5)) as conn, conn:
+            yield conn
+
+    def _init_db(self):
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS analysis_cache ("
+                    "key TEXT PRIMARY KEY, report TEXT NOT NULL, created_at REAL NOT NULL)"
+                )
+        except sqlite3.Error as e:
+            print(f"⚠️ Caché de análisis sin respaldo en disco ({self.db_path}): {e}")
+            self.db_path = None
+
+    def _db_get(self, key: str):
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT report, created_at FROM analysis_cache WHERE key = ?", (key,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            print(f"⚠️ Error leyendo caché en disco: {e}")
+            return None
+        if not row:
+            return None
+        return {"report": json.loads(row[0]), "created_at": row[1]}
+
+    def _db_put(self, key: str, entry: dict):
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO analysis_cache (key, report, created_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(entry["report"], ensure_ascii=False, default=str), entry["created_at"])
+                )
+                conn.execute(
+                    "DELETE FROM analysis_cache WHERE created_at < ?",
+                    (time.time() - self.ttl_seconds,)
+                )
+        except sqlite3.Error as e:
+            print(f"⚠️ Error escribiendo caché en disco: {e}")
+
+    # --- API pública ---
+
+    def _expired(self, entry: dict) -> bool:
+        return time.time() - entry["created_at"] > self.ttl_seconds
+
+    def _store(self, key: str, entry: dict):
+        """Inserta en memoria respetando el límite LRU (llamar con el lock tomado)."""
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key: str):
+        """
+        Busca un resultado. Retorna {"report": dict (copia)} o None.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry):
+                del self._entries[key]
+                self.evictions += 1
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        if entry is None and self.db_path:
+            entry = self._db_get(key)
+            if entry is not None and self._expired(entry):
+                entry = None
+            if entry is not None:
+                with self._lock:
+                    self._store(key, entry)
+
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return {"report": copy.deepcopy(entry["report"])}
+
+    def put(self, key: str, report: dict):
+        """Guarda un reporte completo (se almacena una copia)."""
+        entry = {"report": copy.deepcopy(report), "created_at": time.time()}
+        with self._lock:
+            self._store(key, entry)
+        if self.db_path:
+            self._db_put(key, entry)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.db_path:
+            try:
+                with self._connect() as conn:
+                    conn.execute("DELETE FROM analysis_cache")
+            except sqlite3.Error as e:
+                print(f"⚠️ Error limpiando caché en disco: {e}")
+
+    def stats(self) -> dict:
+        """Métricas de hit/miss para monitoreo."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "persistent": bool(self.db_path)
+            }
+
+
+# Instancia compartida por worker de gunicorn
+analysis_cache = AnalysisCache()
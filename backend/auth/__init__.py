@@ -1,13 +1,19 @@
 """
 Módulo de Autenticación para CivilProtect Application
 """
-from .hash_handler import hash_password, verify_password
+from .hash_handler import hash_password, verify_password, needs_rehash
 from .jwt_handler import create_access_token, create_refresh_token, verify_token
 from .dependencies import get_current_user, get_current_active_user, require_role, require_admin
+from .password_hasher import password_hasher, HasherSaturated
+from .principal_cache import principal_cache
+from .token_context import request_claims, verified_token_cache, TokenContextMiddleware
 
 __all__ = [
     "hash_password",
     "verify_password",
+    "needs_rehash",
+    "password_hasher",
+    "HasherSaturated",
     "create_access_token",
     "create_refresh_token",
     "verify_token",
@@ -15,4 +21,8 @@ __all__ = [
     "get_current_active_user",
     "require_role",
     "require_admin",
+    "principal_cache",
+    "request_claims",
+    "verified_token_cache",
+    "TokenContextMiddleware",
 ]
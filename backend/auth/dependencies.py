@@ -1,8 +1,15 @@
 """
 Módulo de Autenticación para CivilProtect Application
 FastAPI Dependencies para Protección de Endpoints
+
+get_current_user es async: los claims del JWT ya vienen verificados en request.state
+(auth/token_context.py, una verificación por request compartida con el rate limiter),
+y la consulta del usuario es SQLAlchemy síncrono: se ejecuta en el threadpool de
+Starlette para no bloquear el event loop durante el round trip a la base de datos,
+y solo cuando el usuario no está en la caché de principales (auth/principal_cache.py).
 """
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from typing import Optional
@@ -13,13 +20,20 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from database import get_db, User
-from auth.jwt_handler import verify_token
+from auth.principal_cache import principal_cache
+from auth.token_context import request_claims
 
 # Security scheme para Bearer token
 security = HTTPBearer()
 
 
+def _load_user(db: Session, user_id: int) -> Optional[User]:
+    """Consulta síncrona del usuario (se ejecuta fuera del event loop)."""
+    return db.query(User).filter(User.id == user_id).first()
+
+
 async def get_current_user(
+    request: Request,
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
 ) -> User:
@@ -27,7 +41,8 @@ async def get_current_user(
     Dependency que obtiene el usuario actual desde el token JWT.
     
     Args:
-        credentials: Credenciales HTTP (Bearer token)
+        request: Request (claims del token en request.state)
+        credentials: Credenciales HTTP (Bearer token; exige el header)
         db: Sesión de base de datos
         
     Returns:
@@ -36,11 +51,8 @@ async def get_current_user(
     Raises:
         HTTPException 401: Si el token es inválido o el usuario no existe
     """
-    # Extraer token
-    token = credentials.credentials
-    
-    # Verificar y decodificar token
-    payload = verify_token(token, token_type="access")
+    # Claims del token (verificado una vez por request por TokenContextMiddleware)
+    payload = request_claims(request)
     
     if payload is None:
         raise HTTPException(
@@ -67,8 +79,13 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Buscar usuario en base de datos
-    user = db.query(User).filter(User.id == user_id).first()
+    # Buscar usuario: caché de principales y, si no está, base de datos (en el threadpool)
+    user = principal_cache.get(user_id)
+    if user is None:
+        version = principal_cache.version(user_id)
+        user = await run_in_threadpool(_load_user, db, user_id)
+        if user is not None:
+            principal_cache.put(user, version)
     
     if user is None:
         raise HTTPException(
@@ -1,9 +1,17 @@
 """
 Módulo de Autenticación para CivilProtect Application
 Manejo de Hashing de Contraseñas con bcrypt
+
+El costo se configura con BCRYPT_ROUNDS; los hashes con otro costo se regeneran
+en el siguiente login exitoso (needs_rehash). En los endpoints, el hashing corre
+en el pool acotado de auth/password_hasher.py, no en el thread del request.
 """
+import os
 import bcrypt
 
+# Costo de bcrypt (2^rounds iteraciones); bcrypt acepta 4..31
+BCRYPT_ROUNDS = min(31, max(4, int(os.getenv("BCRYPT_ROUNDS", "12"))))
+
 
 def hash_password(password: str) -> str:
     """
@@ -25,7 +33,7 @@ def hash_password(password: str) -> str:
         password_bytes = password_bytes[:72]
     
     # Generar salt y hash
-    salt = bcrypt.gensalt(rounds=12)
+    salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(password_bytes, salt)
     
     # Retornar como string
@@ -53,3 +61,17 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     # Verificar
     return bcrypt.checkpw(password_bytes, hash_bytes)
 
+
+
+def hash_rounds(hashed_password: str) -> int:
+    """Costo con el que se generó un hash bcrypt ($2b$12$... -> 12); 0 si no es bcrypt."""
+    parts = hashed_password.split("$")
+    try:
+        return int(parts[2]) if len(parts) > 3 else 0
+    except ValueError:
+        return 0
+
+
+def needs_rehash(hashed_password: str) -> bool:
+    """True si el hash se generó con un costo distinto de BCRYPT_ROUNDS."""
+    return hash_rounds(hashed_password) != BCRYPT_ROUNDS
@@ -0,0 +1,141 @@
+"""
+Pool de Hashing de Contraseñas (bcrypt)
+bcrypt con 12 rounds son ~250 ms de CPU por login o registro. Corriendo en el
+thread del request, una ráfaga de logins ocupa todos los threads del servidor y
+el resto de los endpoints (/history, /analysis/...) se queda esperando.
+
+- Pool de threads dedicado (bcrypt libera el GIL): PASSWORD_HASH_WORKERS acota
+  cuántos cores puede consumir el hashing a la vez
+- Threads con prioridad baja (PASSWORD_HASH_NICE, Linux): cuando compiten por CPU,
+  los requests normales ganan y el login absorbe la espera
+- Admisión acotada (PASSWORD_HASH_MAX_PENDING): al saturarse, hash()/verify()
+  lanzan HasherSaturated con un Retry-After estimado (los endpoints responden 503)
+  en vez de encolar threads del servidor esperando
+"""
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+
+from auth.hash_handler import hash_password, verify_password
+
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "0")) or max(1, (os.cpu_count() or 2) // 2)
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "0")) or PASSWORD_HASH_WORKERS * 4
+PASSWORD_HASH_NICE = int(os.getenv("PASSWORD_HASH_NICE", "10"))
+
+
+class HasherSaturated(Exception):
+    """Pool de hashing lleno; reintentar después de `retry_after` segundos."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Pool de hashing saturado, reintentar en {retry_after}s")
+        self.retry_after = retry_after
+
+
+def _lower_priority(nice: int):
+    """Initializer: baja la prioridad del thread (en Linux setpriority acepta el id del thread)."""
+    if nice <= 0:
+        return
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), nice)
+    except (AttributeError, OSError) as e:
+        print(f"⚠️ Threads de bcrypt con prioridad normal: {e}")
+
+
+def _timed(fn, *args) -> tuple:
+    start = time.perf_counter()
+    return fn(*args), (time.perf_counter() - start) * 1000
+
+
+class PasswordHasher:
+    """
+    Ejecuta hash_password / verify_password en un pool de threads con admisión acotada.
+
+    `pending` cuenta operaciones en curso + en espera; nunca supera max_pending.
+    """
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, max_pending: int = PASSWORD_HASH_MAX_PENDING,
+                 nice: int = PASSWORD_HASH_NICE):
+        self.workers = workers
+        self.max_pending = max(max_pending, workers)
+        self.nice = nice
+        self._pool = None
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+        self._total_ms = 0.0
+        self._max_ms = 0.0
+        self._lock = threading.Lock()
+
+    def _ensure_pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix="bcrypt",
+                initializer=_lower_priority,
+                initargs=(self.nice,)
+            )
+        return self._pool
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=not wait)
+
+    def _retry_after(self) -> int:
+        """Segundos estimados para vaciar la cola (pendientes / workers * latencia media)."""
+        avg_s = self._total_ms / self._completed / 1000 if self._completed else 0.25
+        return max(1, round(self._pending / self.workers * avg_s))
+
+    def _submit(self, fn, *args) -> Future:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._rejected += 1
+                raise HasherSaturated(self._retry_after())
+            self._pending += 1
+            try:
+                future = self._ensure_pool().submit(_timed, fn, *args)
+            except Exception:
+                self._pending -= 1
+                raise
+        future.add_done_callback(self._finish)
+        return future
+
+    def _finish(self, future: Future):
+        with self._lock:
+            self._pending -= 1
+            if not future.cancelled() and future.exception() is None:
+                elapsed_ms = future.result()[1]
+                self._completed += 1
+                self._total_ms += elapsed_ms
+                self._max_ms = max(self._max_ms, elapsed_ms)
+
+    def hash(self, password: str, timeout: float = None) -> str:
+        """
+        hash_password en el pool.
+        Raises:
+            HasherSaturated: Ya hay max_pending operaciones en curso o en espera
+        """
+        return self._submit(hash_password, password).result(timeout)[0]
+
+    def verify(self, password: str, hashed_password: str, timeout: float = None) -> bool:
+        """verify_password en el pool (misma admisión que hash)."""
+        return self._submit(verify_password, password, hashed_password).result(timeout)[0]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "pending": self._pending,
+                "max_pending": self.max_pending,
+                "nice": self.nice,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "avg_ms": round(self._total_ms / self._completed, 1) if self._completed else 0.0,
+                "max_ms": round(self._max_ms, 1)
+            }
+
+
+# Instancia compartida por worker de gunicorn (los threads se crean al primer uso)
+password_hasher = PasswordHasher()
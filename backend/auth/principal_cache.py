@@ -0,0 +1,163 @@
+"""
+Caché de Principales (usuario autenticado por user_id)
+Cada endpoint protegido resolvía el usuario del JWT con una consulta a `users`.
+Aquí se guarda una copia de sus columnas por unos segundos (PRINCIPAL_CACHE_TTL):
+
+- Cada hit devuelve un User transitorio nuevo (no se comparten instancias ORM entre requests)
+- Invalidación explícita al cambiar rol o estado (/admin/users/{id}/role y /status)
+- Entre workers: contador de versión por usuario en un SQLite compartido
+  (PRINCIPAL_CACHE_DB). Un cambio en otro worker invalida la entrada en el siguiente
+  request; sin archivo, la invalidación es local y el TTL acota lo desactualizado
+"""
+import os
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from database import User
+
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "5"))
+PRINCIPAL_CACHE_MAX_ENTRIES = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", "1024"))
+PRINCIPAL_CACHE_DB = os.getenv("PRINCIPAL_CACHE_DB", "")  # Vacío = invalidación solo local
+
+# Columnas que se copian del User (las que usan los endpoints y require_role)
+PRINCIPAL_FIELDS = ("id", "email", "name", "role", "is_active", "created_at")
+
+
+class PrincipalCache:
+    """
+    Caché TTL/LRU de usuarios autenticados.
+
+    Entradas: user_id -> (version, expires_at, {columna: valor})
+    La versión se toma ANTES de consultar la BD: si el usuario se invalida mientras
+    tanto, la copia nace vieja y no se sirve.
+    """
+
+    def __init__(self, ttl_seconds: float = PRINCIPAL_CACHE_TTL,
+                 max_entries: int = PRINCIPAL_CACHE_MAX_ENTRIES, db_path: str = PRINCIPAL_CACHE_DB):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.db_path = db_path or None
+        self._entries = OrderedDict()
+        self._generations = {}  # Invalidaciones locales por usuario
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        if self.db_path:
+            self._init_db()
+
+    # --- Contador de versión compartido (opcional) ---
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=5)
+
+    def _init_db(self):
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS principal_versions ("
+                    "user_id INTEGER PRIMARY KEY, version INTEGER NOT NULL)"
+                )
+        except sqlite3.Error as e:
+            print(f"⚠️ Caché de principales sin invalidación entre workers ({self.db_path}): {e}")
+            self.db_path = None
+
+    def _shared_version(self, user_id: int) -> int:
+        if not self.db_path:
+            return 0
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT version FROM principal_versions WHERE user_id = ?", (user_id,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            print(f"⚠️ Error leyendo versión de principal: {e}")
+            return -1  # Versión imposible: no se sirve desde caché mientras falle
+        return row[0] if row else 0
+
+    def _bump_shared_version(self, user_id: int):
+        if not self.db_path:
+            return
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT INTO principal_versions (user_id, version) VALUES (?, 1) "
+                    "ON CONFLICT(user_id) DO UPDATE SET version = version + 1",
+                    (user_id,)
+                )
+        except sqlite3.Error as e:
+            print(f"⚠️ Error publicando invalidación de principal: {e}")
+
+    # --- API pública ---
+
+    def version(self, user_id: int) -> tuple:
+        """Versión actual del usuario (tomarla antes de consultar la BD y pasarla a put)."""
+        with self._lock:
+            generation = self._generations.get(user_id, 0)
+        return generation, self._shared_version(user_id)
+
+    def get(self, user_id: int):
+        """User transitorio con las columnas en caché, o None (expirado, invalidado o ausente)."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[1] < time.monotonic():
+                del self._entries[user_id]
+                entry = None
+        if entry is not None and entry[0] != self.version(user_id):
+            with self._lock:
+                self._entries.pop(user_id, None)
+            entry = None
+
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+
+        return User(**entry[2])
+
+    def put(self, user, version: tuple):
+        """Guarda una copia de las columnas del usuario recién consultado."""
+        if self.ttl_seconds <= 0:
+            return
+        values = {field: getattr(user, field) for field in PRINCIPAL_FIELDS}
+        with self._lock:
+            if version[0] != self._generations.get(user.id, 0):
+                return  # Invalidado mientras se consultaba
+            self._entries[user.id] = (version, time.monotonic() + self.ttl_seconds, values)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int):
+        """Descarta al usuario en este worker y publica la invalidación a los demás."""
+        with self._lock:
+            self._entries.pop(user_id, None)
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            self.invalidations += 1
+        self._bump_shared_version(user_id)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "shared_invalidation": bool(self.db_path),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0
+            }
+
+
+# Instancia compartida por worker de gunicorn
+principal_cache = PrincipalCache()
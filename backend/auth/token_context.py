@@ -0,0 +1,114 @@
+"""
+Contexto del Token por Request
+El mismo Bearer token se verificaba hasta tres veces por request: la llave del rate
+limiter (rate_limit_config.get_user_identifier), get_current_user y el handler de 429.
+
+- TokenContextMiddleware verifica el access token UNA vez y deja los claims en
+  request.state.token_claims (None si no hay token o no es válido)
+- request_claims(request) es lo que leen el limiter y las dependencies (si el
+  middleware no está instalado, resuelve y memoiza en el propio request)
+- VerifiedTokenCache: tokens ya verificados por hash sha256, válidos hasta su `exp`;
+  los requests siguientes con el mismo token no recalculan el HMAC
+"""
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from starlette.requests import Request
+
+from auth.jwt_handler import verify_token
+
+VERIFIED_TOKEN_CACHE_SIZE = int(os.getenv("JWT_VERIFY_CACHE_SIZE", "2048"))
+
+
+class VerifiedTokenCache:
+    """
+    LRU de access tokens verificados.
+
+    Entradas: sha256(token) -> payload. Solo se guardan tokens válidos (con `exp`);
+    los inválidos siempre pasan por verify_token.
+    """
+
+    def __init__(self, max_entries: int = VERIFIED_TOKEN_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def verify(self, token: str) -> Optional[dict]:
+        """Igual que verify_token(token, "access"), con caché hasta la expiración del token."""
+        key = hashlib.sha256(token.encode("utf-8")).digest()
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is not None and payload["exp"] <= time.time():
+                del self._entries[key]
+                payload = None
+            if payload is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return payload
+            self.misses += 1
+
+        payload = verify_token(token, token_type="access")
+        if payload is not None and self.max_entries > 0 and isinstance(payload.get("exp"), (int, float)):
+            with self._lock:
+                self._entries[key] = payload
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return payload
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0
+            }
+
+
+# Instancia compartida por worker de gunicorn
+verified_token_cache = VerifiedTokenCache()
+
+
+def bearer_token(authorization: Optional[str]) -> Optional[str]:
+    """Token del header Authorization (esquema Bearer sin distinguir mayúsculas, como HTTPBearer)."""
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer":
+        return None
+    return token.strip() or None
+
+
+def request_claims(request: Request) -> Optional[dict]:
+    """Claims del access token del request (verificado una sola vez por request)."""
+    state = request.state
+    if not hasattr(state, "token_claims"):
+        token = bearer_token(request.headers.get("Authorization"))
+        state.token_claims = verified_token_cache.verify(token) if token else None
+    return state.token_claims
+
+
+class TokenContextMiddleware:
+    """
+    Middleware ASGI: verifica el Bearer token antes del rate limiter y de las
+    dependencies, y comparte los claims vía request.state.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            request_claims(Request(scope))
+        await self.app(scope, receive, send)
@@ -0,0 +1,199 @@
+"""
+Almacenamiento de PDFs Renderizados (Blob Store Intercambiable)
+El render produce bytes en memoria (sin archivos temporales) y /download los
+sirve con StreamingResponse. Para que el historial pueda volver a descargar un
+dictamen después de que expira el job de render, los bytes se escriben además
+(write-through) en un blob store:
+
+- local: un directorio (PDF_BLOB_DIR, por defecto backend/data/reports)
+- s3:    bucket S3-compatible por HTTP path-style (MinIO / stub local / gateway
+         con token). PUT/GET/HEAD/DELETE en {PDF_BLOB_S3_ENDPOINT}/{bucket}/{llave}
+- none:  sin persistencia; el PDF solo vive en memoria mientras dura el job
+
+Seleccionado con PDF_BLOB_STORE (local | s3 | none).
+"""
+import os
+import re
+
+import httpx
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+PDF_BLOB_STORE = os.getenv("PDF_BLOB_STORE", "local").lower()
+PDF_BLOB_DIR = os.getenv("PDF_BLOB_DIR") or os.path.join(BASE_DIR, "data", "reports")
+PDF_BLOB_S3_ENDPOINT = os.getenv("PDF_BLOB_S3_ENDPOINT", "")
+PDF_BLOB_S3_BUCKET = os.getenv("PDF_BLOB_S3_BUCKET", "civilprotect-reports")
+PDF_BLOB_S3_TOKEN = os.getenv("PDF_BLOB_S3_TOKEN", "")
+CHUNK_SIZE = 64 * 1024
+
+# Las llaves son nombres de archivo (Dictamen_<municipio>_<uuid>.pdf): sin rutas
+_VALID_KEY = re.compile(r"^[^/\\]+$")
+
+
+def _check_key(key: str) -> str:
+    if not key or not _VALID_KEY.match(key) or key in (".", ".."):
+        raise ValueError(f"Llave de blob inválida: {key!r}")
+    return key
+
+
+def iter_bytes(data: bytes, chunk_size: int = CHUNK_SIZE):
+    """Trocea bytes en memoria para StreamingResponse."""
+    view = memoryview(data)
+    for start in range(0, len(view), chunk_size):
+        yield bytes(view[start:start + chunk_size])
+
+
+class NullBlobStore:
+    """Sin persistencia (PDF_BLOB_STORE=none)."""
+
+    persistent = False
+
+    def put(self, key: str, data: bytes):
+        _check_key(key)
+
+    def get(self, key: str):
+        return None
+
+    def stream(self, key: str, chunk_size: int = CHUNK_SIZE):
+        """Iterador de chunks o None si no existe."""
+        return None
+
+    def exists(self, key: str) -> bool:
+        return False
+
+    def delete(self, key: str):
+        pass
+
+    def describe(self) -> dict:
+        return {"backend": "none"}
+
+
+class LocalBlobStore(NullBlobStore):
+    """Un archivo por PDF en un directorio local (escritura atómica)."""
+
+    persistent = True
+
+    def __init__(self, directory: str = PDF_BLOB_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, _check_key(key))
+
+    def put(self, key: str, data: bytes):
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def get(self, key: str):
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def stream(self, key: str, chunk_size: int = CHUNK_SIZE):
+        try:
+            f = open(self._path(key), "rb")
+        except FileNotFoundError:
+            return None
+
+        def chunks():
+            with f:
+                while True:
+                    chunk = f.read(chunk_size)
+                    if not chunk:
+                        break
+                    yield chunk
+        return chunks()
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+    def delete(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def describe(self) -> dict:
+        return {"backend": "local", "directory": self.directory}
+
+
+class S3BlobStore(NullBlobStore):
+    """
+    Bucket S3-compatible por HTTP path-style.
+    Autenticación opcional con token Bearer (gateway / stub); sin firma SigV4.
+    """
+
+    persistent = True
+
+    def __init__(self, endpoint: str = PDF_BLOB_S3_ENDPOINT, bucket: str = PDF_BLOB_S3_BUCKET,
+                 token: str = PDF_BLOB_S3_TOKEN, timeout: float = 10.0):
+        if not endpoint:
+            raise ValueError("PDF_BLOB_S3_ENDPOINT no configurado")
+        self.endpoint = endpoint.rstrip("/")
+        self.bucket = bucket
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        self._client = httpx.Client(base_url=f"{self.endpoint}/{bucket}", headers=headers, timeout=timeout)
+
+    def put(self, key: str, data: bytes):
+        response = self._client.put(f"/{_check_key(key)}", content=data,
+                                    headers={"Content-Type": "application/pdf"})
+        response.raise_for_status()
+
+    def get(self, key: str):
+        response = self._client.get(f"/{_check_key(key)}")
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.content
+
+    def stream(self, key: str, chunk_size: int = CHUNK_SIZE):
+        request = self._client.build_request("GET", f"/{_check_key(key)}")
+        response = self._client.send(request, stream=True)
+        if response.status_code == 404:
+            response.close()
+            return None
+        if response.status_code >= 400:
+            response.close()
+            response.raise_for_status()
+
+        def chunks():
+            try:
+                yield from response.iter_bytes(chunk_size)
+            finally:
+                response.close()
+        return chunks()
+
+    def exists(self, key: str) -> bool:
+        response = self._client.head(f"/{_check_key(key)}")
+        return response.status_code == 200
+
+    def delete(self, key: str):
+        response = self._client.delete(f"/{_check_key(key)}")
+        if response.status_code not in (200, 204, 404):
+            response.raise_for_status()
+
+    def describe(self) -> dict:
+        return {"backend": "s3", "endpoint": self.endpoint, "bucket": self.bucket}
+
+
+def create_blob_store(backend: str = PDF_BLOB_STORE):
+    """Blob store según PDF_BLOB_STORE; si no se puede crear, se opera sin persistencia."""
+    try:
+        if backend == "local":
+            return LocalBlobStore()
+        if backend == "s3":
+            return S3BlobStore()
+        if backend != "none":
+            print(f"⚠️ PDF_BLOB_STORE desconocido ({backend}), PDFs solo en memoria")
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Blob store de PDFs no disponible ({backend}): {e}. PDFs solo en memoria")
+    return NullBlobStore()
+
+
+# Instancia compartida por worker de gunicorn
+blob_store = create_blob_store()
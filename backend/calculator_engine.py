@@ -1,47 +1,235 @@
+import ast
+import hashlib
 import math
 import json
 import os
+import threading
+from functools import lru_cache
 from noms_library import get_applicable_noms
+from legal_justification import render_legal_justification
+
+try:
+    import numpy as np
+except ImportError:  # Modo batch degrada a evaluación escalar fila por fila
+    np = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+RULES_PATH = os.path.join(BASE_DIR, "data", "rules_matrix.json")
+
+# Funciones auxiliares disponibles para las expresiones de la matriz de reglas
+_EVAL_GLOBALS = {"__builtins__": {}, "math": math, "ceil": math.ceil}
+
+
+class CompiledExpression:
+    """
+    Expresión de la matriz de reglas compilada una sola vez.
+    Guarda el code object y los nombres de variables que referencia, para que
+    la evaluación solo enlace esas variables del contexto.
+    """
+    __slots__ = ("source", "code", "tree", "names", "error")
+
+    def __init__(self, source):
+        self.source = source
+        self.code = None
+        self.tree = None
+        self.names = ()
+        self.error = None
+
+        if source == "always":
+            return
+
+        try:
+            tree = ast.parse(source, mode="eval")
+            for node in ast.walk(tree):
+                # Bloquear acceso a dunders (__import__, __builtins__, __class__...)
+                if isinstance(node, ast.Name) and node.id.startswith("__"):
+                    raise ValueError(f"nombre no permitido '{node.id}'")
+                if isinstance(node, ast.Attribute) and node.attr.startswith("_"):
+                    raise ValueError(f"atributo no permitido '{node.attr}'")
+            self.code = compile(tree, "<rules_matrix>", "eval")
+            self.tree = tree.body
+            self.names = tuple(sorted({
+                node.id for node in ast.walk(tree)
+                if isinstance(node, ast.Name) and node.id not in _EVAL_GLOBALS
+            }))
+        except Exception as e:
+            self.error = e
+
+    def evaluate(self, context):
+        """Evalúa la expresión enlazando solo las variables que referencia."""
+        if self.error is not None:
+            raise self.error
+        if self.code is None:
+            return True
+
+        scope = dict(_EVAL_GLOBALS)
+        for name in self.names:
+            if name in context:
+                scope[name] = context[name]
+        return eval(self.code, scope)
+
+
+class _NotVectorizable(Exception):
+    """La expresión usa una construcción sin equivalente vectorial."""
+
+
+_VECTOR_COMPARE = {
+    ast.Eq: lambda a, b: a == b,
+    ast.NotEq: lambda a, b: a != b,
+    ast.Lt: lambda a, b: a < b,
+    ast.LtE: lambda a, b: a <= b,
+    ast.Gt: lambda a, b: a > b,
+    ast.GtE: lambda a, b: a >= b,
+}
+
+_VECTOR_BINOP = {
+    ast.Add: lambda a, b: a + b,
+    ast.Sub: lambda a, b: a - b,
+    ast.Mult: lambda a, b: a * b,
+    ast.Div: lambda a, b: a / b,
+    ast.FloorDiv: lambda a, b: a // b,
+    ast.Mod: lambda a, b: a % b,
+}
+
+
+def _vector_truthy(value):
+    """Equivalente vectorial de bool(x) elemento a elemento."""
+    arr = np.asarray(value)
+    if arr.dtype.kind in "US":
+        return arr != ""
+    if arr.dtype.kind == "O":
+        raise _NotVectorizable("columna con tipos mixtos")
+    return arr.astype(bool)
+
+
+def _vector_eval(node, columns):
+    """
+    Evalúa el AST de una expresión sobre columnas NumPy completas.
+    Soporta el subconjunto usado por rules_matrix.json (comparaciones, and/or/not,
+    'in' contra listas literales, ternarios, aritmética y ceil).
+    """
+    if isinstance(node, ast.Constant):
+        return node.value
+    if isinstance(node, ast.Name):
+        if node.id not in columns:
+            raise _NotVectorizable(f"columna '{node.id}' no disponible")
+        return columns[node.id]
+    if isinstance(node, ast.BoolOp):
+        parts = [_vector_truthy(_vector_eval(v, columns)) for v in node.values]
+        combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+        result = parts[0]
+        for part in parts[1:]:
+            result = combine(result, part)
+        return result
+    if isinstance(node, ast.UnaryOp):
+        operand = _vector_eval(node.operand, columns)
+        if isinstance(node.op, ast.Not):
+            return np.logical_not(_vector_truthy(operand))
+        if isinstance(node.op, ast.USub):
+            return -np.asarray(operand)
+        raise _NotVectorizable(type(node.op).__name__)
+    if isinstance(node, ast.Compare):
+        result = None
+        left = _vector_eval(node.left, columns)
+        for op, comparator in zip(node.ops, node.comparators):
+            if isinstance(op, (ast.In, ast.NotIn)):
+                if not isinstance(comparator, (ast.List, ast.Tuple, ast.Set)):
+                    raise _NotVectorizable("'in' solo contra listas literales")
+                values = [_vector_eval(elt, columns) for elt in comparator.elts]
+                part = np.isin(np.asarray(left), values)
+                if isinstance(op, ast.NotIn):
+                    part = np.logical_not(part)
+                right = None
+            elif type(op) in _VECTOR_COMPARE:
+                right = _vector_eval(comparator, columns)
+                part = np.asarray(_VECTOR_COMPARE[type(op)](np.asarray(left), right))
+            else:
+                raise _NotVectorizable(type(op).__name__)
+            result = part if result is None else np.logical_and(result, part)
+            left = right
+        return result
+    if isinstance(node, ast.IfExp):
+        test = _vector_truthy(_vector_eval(node.test, columns))
+        return np.where(test, _vector_eval(node.body, columns), _vector_eval(node.orelse, columns))
+    if isinstance(node, ast.BinOp) and type(node.op) in _VECTOR_BINOP:
+        return _VECTOR_BINOP[type(node.op)](
+            np.asarray(_vector_eval(node.left, columns)), _vector_eval(node.right, columns)
+        )
+    if isinstance(node, ast.Call) and len(node.args) == 1 and not node.keywords:
+        func = node.func
+        is_ceil = (isinstance(func, ast.Name) and func.id == "ceil") or (
+            isinstance(func, ast.Attribute) and func.attr == "ceil"
+            and isinstance(func.value, ast.Name) and func.value.id == "math"
+        )
+        if is_ceil:
+            return np.ceil(_vector_eval(node.args[0], columns))
+    raise _NotVectorizable(type(node).__name__)
+
+
+@lru_cache(maxsize=512)
+def compile_expression(source):
+    """Compila (y cachea) una expresión de la matriz de reglas."""
+    return CompiledExpression(source)
+
 
 class CivilProtectionCalculator:
-    def __init__(self):
+    def __init__(self, rules_data: dict = None):
         # Cargar Matriz de Reglas (Arquitectura Dinámica)
-        self.output_item_counter = 1
-        self.rules_data = self._load_rules()
+        # rules_data permite inyectar una matriz ya parseada (ej. recarga en caliente)
+        if rules_data is None:
+            try:
+                rules_data = self._load_rules()
+            except Exception as e:
+                print(f"[ERROR CRÍTICO] Falló carga de reglas: {e}. Usando backup de memoria.")
+                rules_data = {"rules": [], "constants": {}}
+        self.rules_data = rules_data
         self.constants = self.rules_data.get("constants", {})
         self.rules = self.rules_data.get("rules", [])
+        self.rules_fingerprint = hashlib.sha256(
+            json.dumps(self.rules_data, sort_keys=True, ensure_ascii=False).encode('utf-8')
+        ).hexdigest()[:16]
+        # Compilar triggers y fórmulas una sola vez por carga de reglas
+        self.compiled_rules = self._compile_rules(self.rules)
 
     def _load_rules(self):
-        """Carga el cerebro normativo desde JSON."""
-        try:
-            base_dir = os.path.dirname(os.path.abspath(__file__))
-            path = os.path.join(base_dir, "data", "rules_matrix.json")
-            with open(path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except Exception as e:
-            print(f"[ERROR CRÍTICO] Falló carga de reglas: {e}. Usando backup de memoria.")
-            return {"rules": [], "constants": {}}
+        """Carga el cerebro normativo desde JSON (los errores se manejan en __init__)."""
+        with open(RULES_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _compile_rules(self, rules):
+        """
+        Compilador de Reglas.
+        Parsea y valida cada trigger_logic / calculation_formula una sola vez.
+        Retorna tuplas (regla, trigger compilado, fórmula compilada o None).
+        """
+        compiled = []
+        for rule in rules:
+            trigger = compile_expression(rule['trigger_logic'])
+            formula = None
+            if 'calculation_formula' in rule and rule['calculation_formula'] != "1":
+                formula = compile_expression(rule['calculation_formula'])
+
+            for expr in (trigger, formula):
+                if expr is not None and expr.error is not None:
+                    print(f"[Engine Warning] Regla {rule.get('id', '?')} inválida '{expr.source}': {expr.error}")
+
+            compiled.append((rule, trigger, formula))
+        return compiled
 
     def _safe_eval(self, expression, context):
         """
         Motor de Inferencia Seguro.
         Evalúa expresiones lógicas (strings) usando el contexto de datos del inmueble.
+        Acepta el string original o una CompiledExpression ya compilada.
         """
-        if expression == "always":
-            return True
-        
+        compiled = expression if isinstance(expression, CompiledExpression) else compile_expression(expression)
+
         try:
-            # Sandbox seguro: solo permitimos variables del contexto y math basic
-            # Nota: En producción real, usar librerías como 'simpleeval' es mejor.
-            # Aquí usamos eval con scope restringido por eficiencia e innovación nativa.
-            allowed_names = {k: v for k, v in context.items()}
-            allowed_names['math'] = math
-            allowed_names['ceil'] = math.ceil
-            
-            return eval(expression, {"__builtins__": {}}, allowed_names)
+            # Sandbox seguro: sin builtins, sin dunders, solo variables referenciadas y math basic
+            return compiled.evaluate(context)
         except Exception as e:
             # Si falla la regla, asumimos False para no romper el flujo (Fail Safe)
-            print(f"[Engine Warning] Error evaluando regla '{expression}': {e}")
+            print(f"[Engine Warning] Error evaluando regla '{compiled.source}': {e}")
             return False
 
     def analyze_requirements(self, data: dict):
@@ -62,40 +250,57 @@ class CivilProtectionCalculator:
         }
 
     def _generate_strict_legal_justification(self, data):
-        """Generador Jurídico (Mantenido híbrido por complejidad semántica)"""
-        reasons = []
-        if data.get("trabajadores", 0) > 25: reasons.append(f"PLANTILLA > 25 TRABAJADORES")
-        if data.get("m2_construccion", 0) > 250: reasons.append(f"SUPERFICIE > 250 M²")
-        if data.get("has_gas"): reasons.append("INSTALACIÓN DE GAS")
-        if data.get("has_special_inst"): reasons.append("INSTALACIONES ESPECIALES")
-        if data.get("has_pool"): reasons.append("RIESGO ACUÁTICO (ALBERCA)")
-        
-        reasons_text = " Y ".join(reasons)
-        municipio = data.get("municipio", "Local")
-        return (f"EL INMUEBLE ESTÁ OBLIGADO A PRESENTAR UN PROGRAMA INTERNO DE PROTECCIÓN CIVIL "
-                f"POR FACTORES DE RIESGO: {reasons_text}. CONFROME A LEY GENERAL DE PC ART. 39 Y REGLAMENTO DE {municipio.upper()}.")
+        """Generador Jurídico (plantillas compartidas con AIService, ver legal_justification)"""
+        return render_legal_justification(data)
+
+    @staticmethod
+    def _budget_item(rule, qty, counter):
+        """Item de presupuesto generado por una regla de la matriz."""
+        out_def = rule['output_item']
+        # Interpolación simple de strings si es necesario (ej. factor riesgo)
+        return {
+            "id": f"auto_{counter}",
+            "categoria": rule['category'],
+            "concepto": out_def['concept_template'],
+            "cantidad": qty,
+            "precio_unitario": float(out_def['unit_price']),
+            "norma": out_def['norma']
+        }
+
+    @staticmethod
+    def _honorarios_item(m2, counter):
+        """Honorarios Profesionales Base (escalan con la superficie)."""
+        return {
+            "id": f"auto_{counter}",
+            "categoria": "Servicios Profesionales",
+            "concepto": "Elaboración de Carpeta Técnica PIPC (Análisis Integral de Riesgos)",
+            "cantidad": 1,
+            "precio_unitario": 8000.00 + (m2 * 3.50),
+            "norma": "LGPC Art. 39"
+        }
 
     def analyze_full_compliance(self, data: dict):
         """
         MOTOR DE INFERENCIA V3.0
         Ejecuta todas las reglas de la matriz contra los datos del usuario.
+        No muta estado de la instancia: es seguro compartirla entre threads.
         """
         budget_items = []
-        self.output_item_counter = 1
+        item_counter = 1
         
         # 1. Preparar Contexto de Datos (Normalización)
         context = data.copy()
         context['tipo_inmueble'] = context.get('tipo_inmueble', 'Otro')
         context['m2_construccion'] = float(context.get('m2_construccion', 0))
         
-        # 2. Iterar Reglas (Motor Dinámico)
-        for rule in self.rules:
+        # 2. Iterar Reglas (Motor Dinámico, expresiones pre-compiladas)
+        for rule, trigger, formula in self.compiled_rules:
             # A. Evaluar Trigger
-            if self._safe_eval(rule['trigger_logic'], context):
+            if self._safe_eval(trigger, context):
                 # B. Calcular Cantidad
                 qty = 1
-                if 'calculation_formula' in rule and rule['calculation_formula'] != "1":
-                    raw_qty = self._safe_eval(rule['calculation_formula'], context)
+                if formula is not None:
+                    raw_qty = self._safe_eval(formula, context)
                     qty = int(raw_qty) if raw_qty else 1
                 
                 # C. Validar Mínimos (ej. niveles)
@@ -104,34 +309,13 @@ class CivilProtectionCalculator:
                     if qty < min_val: qty = min_val
                 
                 # D. Generar Item de Presupuesto
-                out_def = rule['output_item']
-                concept = out_def['concept_template']
-                # Interpolación simple de strings si es necesario (ej. factor riesgo)
-                
-                item = {
-                    "id": f"auto_{self.output_item_counter}",
-                    "categoria": rule['category'],
-                    "concepto": concept,
-                    "cantidad": qty,
-                    "precio_unitario": float(out_def['unit_price']),
-                    "norma": out_def['norma']
-                }
-                budget_items.append(item)
-                self.output_item_counter += 1
+                budget_items.append(self._budget_item(rule, qty, item_counter))
+                item_counter += 1
 
         # 3. Lógica Estática Remanente (Aranceles Complejos y Honorarios)
         # (Se mantiene aquí para no sobrecomplicar el JSON V1, pero se puede migrar luego)
         # Cálculo de Honorarios Profesionales Base
-        m2 = context['m2_construccion']
-        honorarios = 8000.00 + (m2 * 3.50)
-        budget_items.append({
-            "id": f"auto_{self.output_item_counter}",
-            "categoria": "Servicios Profesionales",
-            "concepto": "Elaboración de Carpeta Técnica PIPC (Análisis Integral de Riesgos)",
-            "cantidad": 1,
-            "precio_unitario": honorarios,
-            "norma": "LGPC Art. 39"
-        })
+        budget_items.append(self._honorarios_item(context['m2_construccion'], item_counter))
         
         # 4. Retorno Estructurado
         basic_res = self._legacy_basic_calc(context) # Para compatibilidad visual UI
@@ -148,7 +332,242 @@ class CivilProtectionCalculator:
             "presupuesto_inicial": budget_items
         }
 
+    # ==================== MODO BATCH (PORTAFOLIOS) ====================
+
+    @staticmethod
+    def _batch_columns(batch):
+        """
+        Normaliza la entrada batch a columnas.
+        Acepta lista de dicts, arreglo estructurado NumPy o mapping de columnas.
+        Retorna (n, columnas como listas Python, máscaras de presencia por columna).
+        """
+        if np is not None and isinstance(batch, np.ndarray) and batch.dtype.names:
+            columns = {name: batch[name].tolist() for name in batch.dtype.names}
+            n = len(batch)
+            present = {}
+        elif hasattr(batch, "keys"):
+            # dict de columnas o DataFrame (pandas expone keys() y tolist())
+            columns = {k: (batch[k].tolist() if hasattr(batch[k], "tolist") else list(batch[k])) for k in batch.keys()}
+            lengths = {len(v) for v in columns.values()}
+            if len(lengths) > 1:
+                raise ValueError("Todas las columnas del batch deben tener la misma longitud")
+            n = lengths.pop() if lengths else 0
+            present = {}
+        else:
+            rows = list(batch)
+            n = len(rows)
+            keys = []
+            for row in rows:
+                keys.extend(k for k in row if k not in keys)
+            columns, present = {}, {}
+            for key in keys:
+                mask = [key in row for row in rows]
+                sample = next(row[key] for row in rows if key in row)
+                # Relleno neutro del mismo tipo; las filas sin la clave se evalúan en modo escalar
+                filler = type(sample)() if isinstance(sample, (bool, int, float, str)) else None
+                columns[key] = [row[key] if has else filler for row, has in zip(rows, mask)]
+                if not all(mask):
+                    present[key] = mask
+
+        # Misma normalización que analyze_full_compliance
+        tipo_mask = present.pop('tipo_inmueble', None)
+        tipos = columns.get('tipo_inmueble', ['Otro'] * n)
+        if tipo_mask:
+            tipos = [t if has else 'Otro' for t, has in zip(tipos, tipo_mask)]
+        columns['tipo_inmueble'] = tipos
+
+        m2_mask = present.pop('m2_construccion', None)
+        m2_values = columns.get('m2_construccion', [0] * n)
+        columns['m2_construccion'] = [
+            float(v) if m2_mask is None or m2_mask[i] else 0.0 for i, v in enumerate(m2_values)
+        ]
+        return n, columns, present
+
+    def _batch_eval(self, expr, n, columns, arrays, present):
+        """
+        Evalúa una expresión compilada sobre todas las filas.
+        Usa operaciones vectoriales cuando es posible y cae al camino escalar
+        (idéntico a _safe_eval) para filas con datos faltantes o tipos no vectorizables.
+        """
+        if expr.error is not None:
+            print(f"[Engine Warning] Error evaluando regla '{expr.source}': {expr.error}")
+            return [False] * n
+        if expr.code is None:
+            return [True] * n
+
+        results = None
+        if np is not None and n:
+            try:
+                with np.errstate(all='ignore'):
+                    vector = _vector_eval(expr.tree, arrays)
+                results = np.broadcast_to(np.asarray(vector), (n,)).tolist()
+            except Exception:
+                results = None
+
+        if results is None:
+            fallback_rows = range(n)
+            results = [False] * n
+        else:
+            masks = [present[name] for name in expr.names if name in present]
+            fallback_rows = [i for i in range(n) if not all(m[i] for m in masks)] if masks else []
+
+        for i in fallback_rows:
+            context = {k: v[i] for k, v in columns.items() if k not in present or present[k][i]}
+            try:
+                results[i] = expr.evaluate(context)
+            except Exception:
+                results[i] = False
+        return results
+
+    def analyze_batch(self, batch):
+        """
+        MOTOR DE INFERENCIA EN LOTE (Portafolios de inmuebles)
+        Evalúa cada regla como operación vectorial sobre todas las filas a la vez.
+        El presupuesto por fila es idéntico al de analyze_full_compliance.
+
+        Args:
+            batch: lista de dicts, arreglo estructurado NumPy o mapping {columna: valores}
+
+        Returns:
+            dict con presupuesto por inmueble y totales del portafolio
+        """
+        n, columns, present = self._batch_columns(batch)
+
+        arrays = {}
+        if np is not None:
+            for key, values in columns.items():
+                arr = np.asarray(values)
+                if arr.dtype.kind != "O" and arr.shape == (n,):
+                    arrays[key] = arr
+
+        budgets = [[] for _ in range(n)]
+        reglas_activadas = {}
+
+        for rule, trigger, formula in self.compiled_rules:
+            fired = self._batch_eval(trigger, n, columns, arrays, present)
+            raw_qty = self._batch_eval(formula, n, columns, arrays, present) if formula is not None else None
+
+            rule_id = rule.get('id', rule['category'])
+            min_ref = rule.get('min_value_ref')
+            min_values = columns.get(min_ref) if min_ref else None
+            min_mask = present.get(min_ref) if min_ref else None
+            template = self._budget_item(rule, 1, 0)
+
+            fired_rows = [i for i, hit in enumerate(fired) if hit]
+            for i in fired_rows:
+                qty = 1
+                if raw_qty is not None:
+                    qty = int(raw_qty[i]) if raw_qty[i] else 1
+                if min_ref:
+                    min_val = min_values[i] if min_values is not None and (min_mask is None or min_mask[i]) else 0
+                    if qty < min_val:
+                        qty = min_val
+                item = dict(template)
+                item["id"] = f"auto_{len(budgets[i]) + 1}"
+                item["cantidad"] = qty
+                budgets[i].append(item)
+            if fired_rows:
+                reglas_activadas[rule_id] = len(fired_rows)
+
+        resultados = []
+        total_portafolio = 0.0
+        por_categoria = {}
+        for i, items in enumerate(budgets):
+            items.append(self._honorarios_item(columns['m2_construccion'][i], len(items) + 1))
+            total = 0.0
+            for item in items:
+                importe = item['cantidad'] * item['precio_unitario']
+                total += importe
+                por_categoria[item['categoria']] = por_categoria.get(item['categoria'], 0.0) + importe
+            total_portafolio += total
+            resultados.append({"presupuesto_inicial": items, "total_estimado": total})
+
+        return {
+            "budget_matrix_version": self.rules_data.get("_meta", {}).get("version", "Unknown"),
+            "resultados": resultados,
+            "portafolio": {
+                "total_inmuebles": n,
+                "total_inversion": total_portafolio,
+                "por_categoria": por_categoria,
+                "reglas_activadas": reglas_activadas
+            }
+        }
+
+
+class RuleEngineRegistry:
+    """
+    Motor de reglas compartido por worker con recarga en caliente.
+    Revisa la firma (mtime, tamaño) de rules_matrix.json en cada acceso; si cambió
+    y el contenido (hash) es distinto, compila un motor nuevo y lo intercambia
+    atómicamente. Si el archivo nuevo es inválido se conserva el motor vigente.
+    """
+
+    def __init__(self, path: str = RULES_PATH):
+        self.path = path
+        self.reload_count = 0
+        self._lock = threading.Lock()
+        self._engine = None
+        self._signature = None
+        self._content_hash = None
+
+    def _stat_signature(self):
+        try:
+            st = os.stat(self.path)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def get(self) -> "CivilProtectionCalculator":
+        """Retorna el motor vigente, recargándolo si el archivo cambió."""
+        engine = self._engine
+        if engine is not None and self._stat_signature() == self._signature:
+            return engine
+
+        with self._lock:
+            signature = self._stat_signature()
+            if self._engine is None or signature != self._signature:
+                self._reload(signature)
+            return self._engine
+
+    def _reload(self, signature):
+        """Compila la matriz desde disco y hace el swap (llamar con el lock tomado)."""
+        try:
+            with open(self.path, 'rb') as f:
+                raw = f.read()
+            content_hash = hashlib.sha256(raw).hexdigest()
+            if self._engine is not None and content_hash == self._content_hash:
+                # Solo cambió el mtime (touch), el motor vigente sigue siendo válido
+                self._signature = signature
+                return
+            engine = CivilProtectionCalculator(rules_data=json.loads(raw.decode('utf-8')))
+        except Exception as e:
+            if self._engine is not None:
+                print(f"[Engine Warning] Recarga de reglas fallida, se conserva versión anterior: {e}")
+                self._signature = signature
+                return
+            print(f"[ERROR CRÍTICO] Falló carga de reglas: {e}. Usando backup de memoria.")
+            engine = CivilProtectionCalculator(rules_data={"rules": [], "constants": {}})
+            content_hash = None
+
+        if self._engine is not None:
+            self.reload_count += 1
+            print(f"[Engine] Matriz de reglas recargada ({len(engine.rules)} reglas, "
+                  f"versión {engine.rules_data.get('_meta', {}).get('version', 'Unknown')})")
+        # Asignación de referencia: los requests en curso conservan el motor anterior
+        self._engine = engine
+        self._signature = signature
+        self._content_hash = content_hash
+
+
+_registry = RuleEngineRegistry()
+
+
+def get_engine() -> CivilProtectionCalculator:
+    """Motor de reglas compartido del proceso (recarga si cambió rules_matrix.json)."""
+    return _registry.get()
+
+
 if __name__ == "__main__":
-    eng = CivilProtectionCalculator()
+    eng = get_engine()
     print("Motor Iniciado. Reglas cargadas:", len(eng.rules))
 
@@ -22,8 +22,9 @@ from faker import Faker
 
 # App imports
 from main import app
-from database import Base, get_db
-from auth import create_access_token, get_password_hash
+from database import Base, get_db, UserCRUD
+from auth import create_access_token, principal_cache
+from auth.hash_handler import hash_password
 
 
 # ==================== DATABASE FIXTURES ====================
@@ -50,8 +51,10 @@ def test_db() -> Generator[Session, None, None]:
     # Crear sessionmaker
     TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
     
-    # Crear sesión
+    # Crear sesión (cada BD reinicia los ids: la caché de principales no debe cruzar tests)
     db = TestingSessionLocal()
+    principal_cache.clear()
+    UserCRUD.invalidate_total()
     
     try:
         yield db
@@ -217,6 +220,55 @@ def admin_auth_headers(created_admin: dict) -> dict:
     }
 
 
+@pytest.fixture
+def db_user(test_db: Session, user_data: dict) -> dict:
+    """
+    Fixture de usuario insertado directo en la BD de testing.
+    No pasa por /auth/register (validación de rol ni rate limit de 3/hora por IP).
+
+    Args:
+        test_db: Fixture de base de datos
+        user_data: Fixture de datos de usuario
+
+    Returns:
+        dict: Usuario creado con access_token
+    """
+    from database import User
+
+    user = User(
+        email=user_data["email"],
+        name=user_data["name"],
+        password_hash=hash_password(user_data["password"]),
+        role="consultor",
+        is_active=1
+    )
+    test_db.add(user)
+    test_db.commit()
+
+    return {
+        **user_data,
+        "role": user.role,
+        "access_token": create_access_token({"sub": str(user.id), "email": user.email, "role": user.role}),
+        "user_id": user.id
+    }
+
+
+@pytest.fixture
+def db_auth_headers(db_user: dict) -> dict:
+    """
+    Fixture de headers de autenticación del usuario de db_user.
+
+    Args:
+        db_user: Fixture de usuario insertado en la BD
+
+    Returns:
+        dict: Headers con Authorization Bearer token
+    """
+    return {
+        "Authorization": f"Bearer {db_user['access_token']}"
+    }
+
+
 # ==================== ANALYSIS DATA FIXTURES ====================
 
 @pytest.fixture
@@ -2,7 +2,7 @@
 Sistema de Base de Datos para Historial de Análisis
 Usando SQLAlchemy ORM con PostgreSQL (adaptado desde SQLite)
 """
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, ForeignKey, Index
+from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, ForeignKey, Index, func
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from sqlalchemy.dialects.postgresql import JSONB
@@ -10,6 +10,8 @@ from sqlalchemy.types import JSON
 from datetime import datetime
 import json
 import os
+import time
+import threading
 from config import settings
 
 # Configuración de SQLAlchemy
@@ -170,6 +172,29 @@ class AnalysisCRUD:
         db.refresh(analysis)
         return analysis
     
+    @staticmethod
+    def create_analyses_bulk(db, user_id: int, records: list):
+        """
+        Crea varios análisis con un solo commit (usado por /analyze/batch).
+        Cada record es un dict con input_data, report_data y opcionalmente pdf_path / custom_label.
+        """
+        analyses = [
+            Analysis(
+                user_id=user_id,
+                municipio=record["input_data"].get("municipio", ""),
+                estado=record["input_data"].get("estado", ""),
+                tipo_inmueble=record["input_data"].get("tipo_inmueble", ""),
+                custom_label=record.get("custom_label"),
+                input_data=record["input_data"],
+                report_data=record["report_data"],
+                pdf_path=record.get("pdf_path")
+            )
+            for record in records
+        ]
+        db.add_all(analyses)
+        db.commit()
+        return analyses
+    
     @staticmethod
     def get_analysis(db, analysis_id: int):
         """Obtiene un análisis por ID"""
@@ -202,7 +227,13 @@ class AnalysisCRUD:
         """Elimina un análisis por ID"""
         analysis = db.query(Analysis).filter(Analysis.id == analysis_id).first()
         if analysis:
-            # Eliminar archivo PDF si existe
+            # Eliminar el PDF del blob store y el archivo legado si existe
+            if analysis.pdf_path:
+                try:
+                    from blob_store import blob_store
+                    blob_store.delete(analysis.pdf_path)
+                except Exception as e:
+                    print(f"[WARN] Error eliminando PDF del blob store: {e}")
             if analysis.pdf_path and os.path.exists(analysis.pdf_path):
                 try:
                     os.remove(analysis.pdf_path)
@@ -219,6 +250,58 @@ class AnalysisCRUD:
         """Cuenta total de análisis de un usuario"""
         return db.query(Analysis).filter(Analysis.user_id == user_id).count()
 
+
+# Vigencia del total de usuarios en /admin/users (un COUNT(*) sobre toda la tabla)
+USERS_TOTAL_CACHE_TTL = int(os.getenv("USERS_TOTAL_CACHE_TTL", "60"))
+
+
+class UserCRUD:
+    """Consultas de usuarios para administración"""
+    
+    _total_cache = (None, 0.0)  # (total, expira_en)
+    _total_lock = threading.Lock()
+    
+    @staticmethod
+    def list_users_with_counts(db, limit: int = 100, offset: int = 0, after_id: int = None):
+        """
+        Página de usuarios (ordenada por id) con su número de análisis, en una sola consulta.
+        
+        Con after_id usa paginación keyset (id > after_id, sin escanear las filas previas);
+        si no, offset. La página de ids se resuelve primero y solo esos usuarios se unen
+        (LEFT JOIN agrupado) con analyses, usando el índice (user_id, created_at).
+        """
+        page = db.query(User.id).order_by(User.id)
+        if after_id is not None:
+            page = page.filter(User.id > after_id)
+        else:
+            page = page.offset(offset)
+        page = page.limit(limit).subquery()
+        
+        columns = (User.id, User.email, User.name, User.role, User.is_active, User.created_at)
+        return db.query(*columns, func.count(Analysis.id).label("analyses_count"))\
+            .join(page, page.c.id == User.id)\
+            .outerjoin(Analysis, Analysis.user_id == User.id)\
+            .group_by(*columns)\
+            .order_by(User.id)\
+            .all()
+    
+    @classmethod
+    def count_users(cls, db, max_age: int = USERS_TOTAL_CACHE_TTL):
+        """Total de usuarios, en caché hasta `max_age` segundos (aproximado entre recálculos)."""
+        with cls._total_lock:
+            total, expires_at = cls._total_cache
+            if total is not None and time.monotonic() < expires_at:
+                return total
+        total = db.query(func.count(User.id)).scalar()
+        with cls._total_lock:
+            cls._total_cache = (total, time.monotonic() + max_age)
+        return total
+    
+    @classmethod
+    def invalidate_total(cls):
+        with cls._total_lock:
+            cls._total_cache = (None, 0.0)
+
 # Inicializar DB al importar el módulo (Solo si no es importado por alembic o test runner de manera especial)
 if __name__ != "__main__":
     pass 
@@ -0,0 +1,129 @@
+"""
+Plantillas HTML Precompiladas (estilo Jinja, sin dependencias)
+Cada plantilla se compila UNA vez al importar: el texto se parte en literales y
+campos {{ nombre }} / {{ nombre|filtro }}, y se genera una función Python que
+arma el resultado con un solo "".join (sin re-parsear ni concatenar con +=).
+
+- Autoescape: {{ nombre }} escapa HTML; {{ nombre|safe }} inserta tal cual
+- Filtros numéricos: {{ total|money }} -> 1,234.50 | {{ m2|thousands }} -> 1,234
+- Las llaves sueltas (CSS, JS) no necesitan escaparse: solo {{ ... }} es campo
+
+Ver html_report_generator.py y tests/bench_html_report.py
+"""
+import re
+from html import escape
+from functools import lru_cache
+
+_FIELD = re.compile(r"{{\s*(\w+)\s*(?:\|\s*(\w+)\s*)?}}")
+
+# Los textos de un reporte se repiten mucho (títulos de normas, artículos, fundamentos)
+_escape_text = lru_cache(maxsize=4096)(escape)
+
+
+def autoescape(value) -> str:
+    if type(value) is str:
+        return _escape_text(value)
+    if type(value) in (int, float):
+        return str(value)
+    return escape(str(value))
+
+
+FILTERS = {
+    "e": autoescape,
+    "safe": str,
+    "money": lambda value: f"{value:,.2f}",
+    "thousands": lambda value: f"{value:,}"
+}
+
+
+class Template:
+    """
+    Plantilla compilada.
+
+    render(**contexto) para documentos; render_many(filas) para filas repetidas, donde
+    cada fila es una tupla con los valores en el orden de `fields` (sin armar dicts).
+    cache_size > 0 memoiza el render por valores de los campos (LRU): para fragmentos
+    que se repiten entre reportes, como las tarjetas de las normas del catálogo.
+    """
+
+    def __init__(self, source: str, name: str = "<plantilla>", cache_size: int = 0):
+        literals, fields = [], []
+        position = 0
+        for match in _FIELD.finditer(source):
+            literals.append(source[position:match.start()])
+            field, filter_name = match.group(1), match.group(2) or "e"
+            if filter_name not in FILTERS:
+                raise ValueError(f"Filtro desconocido en {name}: {filter_name}")
+            fields.append((field, filter_name))
+            position = match.end()
+        literals.append(source[position:])
+
+        self.name = name
+        self.source = source
+        self.fields = tuple(dict.fromkeys(field for field, _ in fields))
+        namespace = {"E": _escape_text, "S": str, **{f"F_{key}": fn for key, fn in FILTERS.items()}}
+        exec(compile(self._codegen(literals, fields), name, "exec"), namespace)
+        self._render = namespace["render"]
+        self._render_many = namespace["render_many"]
+        if cache_size:
+            self._render = self._cached(self._render, cache_size)
+
+    @staticmethod
+    def _cached(render, cache_size: int):
+        cached = lru_cache(maxsize=cache_size)(render)
+
+        def render_cached(*values):
+            try:
+                return cached(*values)
+            except TypeError:  # Valores no hashables (listas, dicts del JSON): sin caché
+                return render(*values)
+
+        render_cached.cache_info = cached.cache_info
+        return render_cached
+
+    def _codegen(self, literals: list, fields: list) -> str:
+        """
+        Código de render (un solo f-string) y render_many (una lista plana de partes y
+        un solo join: sin un string intermedio por fila). Literales como constantes,
+        campos como argumentos posicionales.
+        """
+        formatted, parts = [_literal(literals[0])], [repr(literals[0])]
+        for (field, filter_name), literal in zip(fields, literals[1:]):
+            if filter_name == "e":
+                # Camino rápido en línea para textos (escape con caché) y enteros (no requieren escape)
+                formatted.append(f"{{E({field}) if {field}.__class__ is str else {field} "
+                                 f"if {field}.__class__ is int else F_e({field})}}")
+                parts.append(f"E({field}) if {field}.__class__ is str else F_e({field})")
+            elif filter_name == "safe":
+                formatted.append(f"{{{field}}}")
+                parts.append(f"S({field})")
+            else:
+                formatted.append(f"{{F_{filter_name}({field})}}")
+                parts.append(f"F_{filter_name}({field})")
+            formatted.append(_literal(literal))
+            parts.append(repr(literal))
+        args = ", ".join(self.fields)
+        row = f"({args},)" if len(self.fields) == 1 else f"({args})"
+        parts = [part for part in parts if part != "''"]
+        return (
+            f"def render({args}):\n"
+            f"    return f{''.join(formatted)!r}\n"
+            f"def render_many(rows):\n"
+            f"    out = []\n"
+            f"    extend = out.extend\n"
+            f"    for {row} in rows:\n"
+            f"        extend(({', '.join(parts)},))\n"
+            f"    return ''.join(out)\n"
+        )
+
+    def render(self, **context) -> str:
+        return self._render(*[context[field] for field in self.fields])
+
+    def render_many(self, rows) -> str:
+        """Renderiza una fila por tupla (valores en el orden de `fields`) y las une en un solo string."""
+        return self._render_many(rows)
+
+
+def _literal(text: str) -> str:
+    """Texto literal dentro del f-string generado (las llaves se duplican)."""
+    return text.replace("{", "{{").replace("}", "}}")
@@ -0,0 +1,110 @@
+"""
+Caché HTTP de Reportes (ETag / GET Condicional)
+El historial vuelve a abrir los mismos reportes una y otra vez, y su contenido
+no cambia mientras no cambie el análisis:
+
+- ETags fuertes: /preview-html por (id del análisis, updated_at, versión de
+  plantillas); /download por nombre de archivo (cada render produce un PDF con
+  nombre único e inmutable)
+- If-None-Match -> 304 sin cuerpo (después de validar ownership)
+- HTMLReportCache: HTML ya renderizado por revisión del análisis (LRU acotada
+  por entradas y por tamaño total)
+"""
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+
+HTML_CACHE_MAX_ENTRIES = int(os.getenv("HTML_REPORT_CACHE_MAX_ENTRIES", "128"))
+HTML_CACHE_MAX_BYTES = int(os.getenv("HTML_REPORT_CACHE_MAX_MB", "32")) * 1024 * 1024
+
+# Contenido privado (requiere autenticación); el navegador siempre revalida con If-None-Match
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts) -> str:
+    """ETag fuerte (entre comillas) derivado de las partes que definen el contenido."""
+    digest = hashlib.sha256("\x1f".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Comparación débil de If-None-Match (RFC 9110 §13.1.2): lista de ETags o '*'."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return etag in (tag[2:] if tag.startswith("W/") else tag for tag in candidates)
+
+
+def cache_headers(etag: str) -> dict:
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+
+class HTMLReportCache:
+    """
+    HTML renderizado (ya codificado en UTF-8) por análisis; solo se conserva la última
+    revisión de cada uno.
+
+    Entradas: analysis_id -> (revision, html_bytes)
+    """
+
+    def __init__(self, max_entries: int = HTML_CACHE_MAX_ENTRIES, max_bytes: int = HTML_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, analysis_id: int, revision: str):
+        with self._lock:
+            entry = self._entries.get(analysis_id)
+            if entry is None or entry[0] != revision:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(analysis_id)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, analysis_id: int, revision: str, html: bytes):
+        size = len(html)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(analysis_id, None)
+            if previous is not None:
+                self._size -= len(previous[1])
+            self._entries[analysis_id] = (revision, html)
+            self._size += size
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+                self.evictions += 1
+
+    def discard(self, analysis_id: int):
+        with self._lock:
+            entry = self._entries.pop(analysis_id, None)
+            if entry is not None:
+                self._size -= len(entry[1])
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "size_bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0
+            }
+
+
+# Instancia compartida por worker de gunicorn
+html_report_cache = HTMLReportCache()
@@ -0,0 +1,141 @@
+"""
+Motor de Justificación Jurídica Pre-compilado
+Texto determinista de obligatoriedad del PIPC, compartido por AIService (modo
+mock / fallback y causales del prompt) y CivilProtectionCalculator, para que el
+dictamen y el resumen ejecutivo no puedan divergir.
+
+- Plantillas por estado construidas una sola vez desde legal_db.json (state_laws);
+  se reconstruyen solas si legal_db.json cambia (versión de noms_library).
+- Las causales de riesgo se codifican como bitmask; cada combinación posible tiene
+  su fragmento pre-unido en una tabla de lookup (256 entradas).
+- Render = concatenación de piezas pre-calculadas (str.format sobre textos largos
+  con acentos es el costo dominante). Ver tests/bench_legal_justification.py
+"""
+import re
+import threading
+
+import noms_library
+
+RISK_TRABAJADORES = 1 << 0
+RISK_SUPERFICIE = 1 << 1
+RISK_AFORO = 1 << 2
+RISK_NIVELES = 1 << 3
+RISK_GAS = 1 << 4
+RISK_INST_ESPECIALES = 1 << 5
+RISK_ALBERCA = 1 << 6
+RISK_AEREO = 1 << 7
+
+# Fragmentos en el orden en que aparecen en el texto: (bit, texto, (campo, default) | None)
+_FRAGMENTS = (
+    (RISK_TRABAJADORES, "PLANTILLA DE TRABAJADORES SUPERIOR A 25 PERSONAS (%s)", ("trabajadores", 0)),
+    (RISK_SUPERFICIE, "SUPERFICIE CONSTRUIDA SUPERIOR A 250 M² (%s M²)", ("m2_construccion", 0)),
+    (RISK_AFORO, "AFORO DE VISITANTES SUPERIOR A 50 PERSONAS (%s)", ("aforo", 0)),
+    (RISK_NIVELES, "NIVELES ESTRUCTURALES MAYOR A 2 (%s)", ("niveles", 1)),
+    (RISK_GAS, "INSTALACIÓN DE GAS L.P./NATURAL", None),
+    (RISK_INST_ESPECIALES, "INSTALACIONES ESPECIALES (DICTAMEN ELÉCTRICO/GAS)", None),
+    (RISK_ALBERCA, "RIESGO ACUÁTICO (ALBERCA/CUERPO DE AGUA)", None),
+    (RISK_AEREO, "GIRO DE ALTO RIESGO POR INFRAESTRUCTURA DE TRANSPORTE AÉREO", None),
+)
+SIN_CAUSALES = "GIRO REGULADO POR LEY DE ESTABLECIMIENTOS MERCANTILES"
+
+
+def _build_causales(mask: int):
+    """(plantilla %s ya unida, campos a interpolar) para una combinación de causales."""
+    selected = [(text, field) for bit, text, field in _FRAGMENTS if mask & bit]
+    if not selected:
+        return SIN_CAUSALES, ()
+    return ", ".join(text for text, _ in selected), tuple(field for _, field in selected if field)
+
+
+# mask -> (plantilla, campos)
+_CAUSALES = tuple(_build_causales(mask) for mask in range(1 << len(_FRAGMENTS)))
+
+_HEAD = (
+    "EL INMUEBLE ESTÁ OBLIGADO A PRESENTAR UN PROGRAMA INTERNO DE PROTECCIÓN CIVIL (PIPC) "
+    "DERIVADO DE SUS CARACTERÍSTICAS FÍSICAS Y OPERATIVAS: "
+)
+_STATE_CLAUSE = (
+    ". ESTA CONDICIÓN ACTIVA LA OBLIGATORIEDAD PREVISTA EN EL ARTÍCULO 39 DE LA LEY GENERAL DE PROTECCIÓN CIVIL; "
+    "{art} DE LA {ley} Y SU REGLAMENTO ESTATAL; "
+    "ASÍ COMO LAS DISPOSICIONES DEL REGLAMENTO DE PROTECCIÓN CIVIL DEL MUNICIPIO DE "
+)
+
+# Estado no catalogado (legal_db 'default' es la Ley General, ya citada en el texto)
+_DEFAULT_LAW = {"ley": "LEY DE PROTECCIÓN CIVIL DEL ESTADO", "art": "ARTÍCULO 58"}
+# Nombres alternos con que llega el estado
+_STATE_ALIASES = {"México": "Estado de México", "CDMX": "Ciudad de México"}
+
+_ART_PREFIX = re.compile(r"^\s*Art(?:ículo|\.)?\s*", re.IGNORECASE)
+
+
+def risk_mask(data: dict) -> int:
+    """Bitmask de causales de riesgo (mismos umbrales que el motor de reglas)."""
+    mask = 0
+    if (data.get("trabajadores") or 0) > 25: mask |= RISK_TRABAJADORES
+    if (data.get("m2_construccion") or 0) > 250: mask |= RISK_SUPERFICIE
+    if (data.get("aforo") or 0) > 50: mask |= RISK_AFORO
+    if (data.get("niveles") or 1) > 2: mask |= RISK_NIVELES
+    if data.get("has_gas"): mask |= RISK_GAS
+    if data.get("has_special_inst"): mask |= RISK_INST_ESPECIALES
+    if data.get("has_pool"): mask |= RISK_ALBERCA
+    tipo = data.get("tipo_inmueble") or ""
+    if "Aeropuerto" in tipo or "Hangar" in tipo: mask |= RISK_AEREO
+    return mask
+
+
+def _state_clause(law: dict) -> str:
+    """Texto fijo entre las causales y el municipio, con la ley estatal ya resuelta."""
+    art = _ART_PREFIX.sub("ARTÍCULO ", law.get("art_pipc") or law.get("art") or "")
+    return _STATE_CLAUSE.format(art=art.upper(), ley=law["ley"].upper())
+
+
+class JustificationEngine:
+    """Plantillas pre-compiladas por estado para una versión de legal_db.json."""
+
+    def __init__(self, state_laws: dict, version: str = None):
+        self.version = version
+        self._clauses = {
+            estado: _state_clause(law)
+            for estado, law in state_laws.items()
+            if estado != "default" and law.get("ley")
+        }
+        for alias, estado in _STATE_ALIASES.items():
+            if estado in self._clauses:
+                self._clauses.setdefault(alias, self._clauses[estado])
+        self._default = _state_clause(_DEFAULT_LAW)
+
+    @staticmethod
+    def causales(data: dict) -> str:
+        """Causales de riesgo en texto (para el prompt de la IA)."""
+        template, fields = _CAUSALES[risk_mask(data)]
+        if not fields:
+            return template
+        return template % tuple([data.get(field, default) for field, default in fields])
+
+    def render(self, data: dict) -> str:
+        """Párrafo de justificación jurídica estricta (sin Atlas, referencias precisas)."""
+        municipio = data.get("municipio") or "el municipio"
+        return (_HEAD + self.causales(data) + self._clauses.get(data.get("estado"), self._default)
+                + municipio.upper() + ".")
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_justification_engine() -> JustificationEngine:
+    """Motor vigente (se reconstruye si legal_db.json cambió en disco)."""
+    global _engine
+    noms_library._check_legal_db()
+    version = noms_library.LEGAL_DB_VERSION
+    engine = _engine
+    if engine is None or engine.version != version:
+        with _engine_lock:
+            engine = _engine
+            if engine is None or engine.version != version:
+                engine = _engine = JustificationEngine(noms_library.STATE_LAWS, version)
+    return engine
+
+
+def render_legal_justification(data: dict) -> str:
+    return get_justification_engine().render(data)
@@ -2,7 +2,7 @@ import os
 import json
 import datetime
 import random # Placeholder para simulación sin API Keys
-from noms_library import auto_register_municipality
+from municipality_auto_registry import auto_register_municipality
 
 class LegalSearchAgent:
     def __init__(self, inbox_path="data/inbox_updates"):
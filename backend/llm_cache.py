@@ -0,0 +1,179 @@
+"""
+Caché Persistente de Respuestas de IA (por Huella del Prompt)
+enrich_chapter_structure / research_municipal_regulations repiten prompts casi
+idénticos para el mismo (estado, municipio) y generate_legal_justification para
+inmuebles con las mismas causales. Cada llamada es lenta y se paga.
+
+La llave es el hash de modelo + temperatura + max_tokens + mensajes normalizados
+(espacios colapsados: los prompts son f-strings indentadas). Respaldo en SQLite
+(LLM_CACHE_DB) compartido entre workers y reinicios, con TTL, límite de entradas
+(se desalojan las menos usadas) y contadores de hit-rate por método.
+
+Stale-while-revalidate: una entrada vencida hace menos de LLM_CACHE_STALE_TTL
+segundos se sirve de inmediato y ai_client la refresca en background.
+"""
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from contextlib import closing, contextmanager
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+LLM_CACHE_DB = os.getenv("LLM_CACHE_DB", os.path.join(BASE_DIR, "data", "llm_cache.sqlite"))  # Vacío = desactivada
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(30 * 86400)))
+LLM_CACHE_STALE_TTL = int(os.getenv("LLM_CACHE_STALE_TTL", str(7 * 86400)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+LLM_CACHE_SERVE_STALE = os.getenv("LLM_CACHE_SERVE_STALE", "true").lower() == "true"
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+class LLMCache:
+    """
+    Caché SQLite de respuestas de Chat Completions.
+
+    get() retorna (contenido, vencida) o None; las métricas se llevan por etiqueta (método).
+    """
+
+    def __init__(self, db_path: str = LLM_CACHE_DB, ttl_seconds: int = LLM_CACHE_TTL,
+                 stale_ttl_seconds: int = LLM_CACHE_STALE_TTL, max_entries: int = LLM_CACHE_MAX_ENTRIES,
+                 serve_stale: bool = LLM_CACHE_SERVE_STALE):
+        self.db_path = db_path or None
+        self.ttl_seconds = ttl_seconds
+        self.stale_ttl_seconds = stale_ttl_seconds if serve_stale else 0
+        self.max_entries = max_entries
+        self._db_ready = False
+        self._lock = threading.Lock()
+        self._counters = {}
+
+    @staticmethod
+    def make_key(model: str, temperature, max_tokens, messages: list) -> str:
+        """Huella del prompt: modelo + parámetros + mensajes con espacios normalizados."""
+        normalized = [
+            {"role": m.get("role"), "content": _WHITESPACE.sub(" ", str(m.get("content", ""))).strip()}
+            for m in messages
+        ]
+        payload = json.dumps(
+            {"model": model, "temperature": temperature, "max_tokens": max_tokens, "messages": normalized},
+            sort_keys=True, ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    # --- SQLite ---
+
+    @contextmanager
+    def _connect(self):
+        """Conexión en una transacción (commit o rollback) que siempre se cierra al salir."""
+        if not self._db_ready:
+            with self._lock:
+                if not self._db_ready:
+                    os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+                    with closing(sqlite3.connect(self.db_path, timeout=5)) as conn, conn:
+                        conn.execute(
+                            "CREATE TABLE IF NOT EXISTS llm_cache ("
+                            "key TEXT PRIMARY KEY, label TEXT NOT NULL, model TEXT, content TEXT NOT NULL, "
+                            "created_at REAL NOT NULL, last_access REAL NOT NULL)"
+                        )
+                        conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_access ON llm_cache (last_access)")
+                    self._db_ready = True
+        with closing(sqlite3.connect(self.db_path, timeout=5)) as conn, conn:
+            yield conn
+
+    def _count(self, label: str, counter: str):
+        with self._lock:
+            entry = self._counters.setdefault(label, {"hits": 0, "stale_hits": 0, "misses": 0})
+            entry[counter] += 1
+
+    # --- API pública ---
+
+    def get(self, key: str, label: str = "chat"):
+        """
+        Busca una respuesta. Returns:
+            (contenido, vencida) | None. vencida=True: servir y refrescar en background
+        """
+        if not self.db_path:
+            return None
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                row = conn.execute("SELECT content, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+                if row:
+                    conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+        except sqlite3.Error as e:
+            print(f"⚠️ Error leyendo caché de IA: {e}")
+            return None
+
+        age = now - row[1] if row else None
+        if row is None or age > self.ttl_seconds + self.stale_ttl_seconds:
+            self._count(label, "misses")
+            return None
+        if age > self.ttl_seconds:
+            self._count(label, "stale_hits")
+            return row[0], True
+        self._count(label, "hits")
+        return row[0], False
+
+    def put(self, key: str, content: str, label: str = "chat", model: str = None):
+        """Guarda una respuesta y desaloja las menos usadas si se excede max_entries."""
+        if not self.db_path:
+            return
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, label, model, content, created_at, last_access) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", (key, label, model, content, now, now)
+                )
+                conn.execute(
+                    "DELETE FROM llm_cache WHERE created_at < ?",
+                    (now - self.ttl_seconds - self.stale_ttl_seconds,)
+                )
+                conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN ("
+                    "SELECT key FROM llm_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+        except sqlite3.Error as e:
+            print(f"⚠️ Error escribiendo caché de IA: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._counters.clear()
+        if not self.db_path:
+            return
+        try:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM llm_cache")
+        except sqlite3.Error as e:
+            print(f"⚠️ Error limpiando caché de IA: {e}")
+
+    def stats(self) -> dict:
+        """Entradas en disco + hit-rate por método."""
+        entries = 0
+        if self.db_path:
+            try:
+                with self._connect() as conn:
+                    entries = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            except sqlite3.Error as e:
+                print(f"⚠️ Error leyendo caché de IA: {e}")
+        with self._lock:
+            methods = {}
+            for label, c in self._counters.items():
+                lookups = c["hits"] + c["stale_hits"] + c["misses"]
+                methods[label] = dict(c, hit_rate=round((c["hits"] + c["stale_hits"]) / lookups, 3) if lookups else 0.0)
+        return {
+            "enabled": self.db_path is not None,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "stale_ttl_seconds": self.stale_ttl_seconds,
+            "methods": methods
+        }
+
+
+# Instancia compartida por el proceso (la usa ai_client)
+llm_cache = LLMCache()
@@ -16,6 +16,7 @@ DOCUMENTACIÓN DE ENDPOINTS:
   
   📊 Análisis:
   - POST /analyze - Generar nuevo análisis ✅ Asociado al usuario
+  - POST /analyze/batch - Análisis en lote (NDJSON en streaming) ✅ Asociado al usuario
   - POST /save-analysis - Guardar análisis ✅ Asociado al usuario
   
   📜 Historial:
@@ -24,16 +25,22 @@ DOCUMENTACIÓN DE ENDPOINTS:
   - DELETE /analysis/{id} - Eliminar análisis ✅ Validación de ownership
   
   📥 Descargas:
-  - GET  /download/{filename} - Descargar PDF ✅ Validación de ownership
+  - GET  /render-jobs/{job_id} - Estado del render del PDF ✅ Validación de ownership
+  - GET  /download/{filename} - Descargar PDF ✅ Validación de ownership (202 si aún se renderiza)
   
   📄 Reportes HTML:
   - POST /generate-html-report - Generar reporte HTML ✅ Requiere autenticación
   - GET  /preview-html/{id} - Preview de reporte ✅ Validación de ownership
 
 👑 ENDPOINTS DE ADMINISTRACIÓN (Solo rol: admin):
-  - GET  /admin/users - Listar todos los usuarios del sistema
+  - GET  /admin/users - Listar usuarios con su conteo de análisis (paginación keyset con after_id)
   - PUT  /admin/users/{id}/role - Cambiar rol de usuario (admin/consultor/cliente)
   - PUT  /admin/users/{id}/status - Activar/desactivar usuario
+  - GET  /admin/cache/stats - Métricas de la caché de análisis (hits/misses)
+  - GET  /admin/research-queue/stats - Cola de investigación municipal (profundidad/throughput)
+  - GET  /admin/ai/stats - Latencia de las llamadas a la IA y hit-rate de su caché
+  - GET  /admin/pdf-renderer/stats - Pool de procesos de render de PDFs (cola y métricas por worker)
+  - GET  /admin/auth/stats - Pool de hashing de contraseñas (bcrypt): cola, rechazos y latencia
 
 ROLES Y PERMISOS:
 ------------------
@@ -66,11 +73,21 @@ SEGURIDAD:
 from fastapi import FastAPI, Depends, HTTPException, status, Request
 from fastapi.middleware.cors import CORSMiddleware
 from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, EmailStr
-from typing import Optional
-from calculator_engine import CivilProtectionCalculator
-from report_generator import generate_pdf_report
+from typing import Optional, List
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from calculator_engine import get_engine
+from render_queue import render_queue, DONE, ERROR
+from pdf_renderer import pdf_renderer, RendererSaturated
+from pdf_signature import stamp_signature
+from blob_store import blob_store, iter_bytes
+from http_cache import make_etag, etag_matches, cache_headers, html_report_cache
+from analysis_cache import analysis_cache
+from research_queue import research_queue
+from ai_client import ai_client
+from llm_cache import llm_cache
+from noms_library import get_legal_version
 import os
 from dotenv import load_dotenv
 import sentry_sdk
@@ -81,16 +98,20 @@ import time
 
 # Imports de Autenticación
 from auth import (
-    hash_password,
-    verify_password,
+    needs_rehash,
+    password_hasher,
+    HasherSaturated,
     create_access_token,
     create_refresh_token,
     verify_token,
     get_current_user,
     get_current_active_user,
-    require_role
+    require_role,
+    principal_cache,
+    verified_token_cache,
+    TokenContextMiddleware
 )
-from database import get_db, User, Analysis, SessionLocal
+from database import get_db, User, Analysis, SessionLocal, UserCRUD
 from sqlalchemy.orm import Session
 
 # Imports de Seguridad (Rate Limiting y Sanitización)
@@ -147,6 +168,23 @@ def on_startup():
     print("[STARTUP] Inicializando base de datos...")
     init_db()
     print("[STARTUP] Base de datos lista.")
+    from state_registry import get_state_registry
+    print(f"[STARTUP] Registro estatal precargado ({get_state_registry().load_all()} estados).")
+    research_queue.start()
+    print(f"[STARTUP] Cola de investigación municipal activa ({research_queue.stats()['depth']} pendientes).")
+    pdf_renderer.start()
+    print(f"[STARTUP] Renderizador de PDFs: {pdf_renderer.processes} procesos.")
+
+@app.on_event("shutdown")
+def on_shutdown():
+    """Esperar a que terminen los renders de PDF en curso"""
+    # Primero el pool de procesos: al terminar cada render, la cola todavía acepta su
+    # cierre (_finish_pdf -> blob store); después se drena la cola
+    pdf_renderer.shutdown(wait=True)
+    render_queue.shutdown(wait=True)
+    password_hasher.shutdown(wait=True)
+    research_queue.stop()
+    ai_client.close()
 
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
@@ -171,6 +209,9 @@ async def log_requests(request: Request, call_next):
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, custom_rate_limit_handler)
 
+# Verificar el Bearer token una sola vez por request (rate limiter + dependencies leen request.state)
+app.add_middleware(TokenContextMiddleware)
+
 # ==================== CORS RESTRICTIVO (MODO DEV RELAJADO) ====================
 # Leer orígenes permitidos desde .env (NO usar wildcard en producción)
 allowed_origins_str = os.getenv("ALLOWED_ORIGINS", "http://localhost:3000")
@@ -252,6 +293,14 @@ class UserResponse(BaseModel):
 
 # ==================== ENDPOINTS DE AUTENTICACIÓN ====================
 
+def _hasher_busy_response(e: HasherSaturated) -> HTTPException:
+    """503 con Retry-After cuando el pool de bcrypt no admite más trabajo."""
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="El servicio de autenticación está saturado, intenta de nuevo en unos segundos",
+        headers={"Retry-After": str(e.retry_after)}
+    )
+
 @app.post("/auth/register", response_model=TokenResponse, status_code=status.HTTP_201_CREATED)
 @limiter.limit(get_rate_limit("register"))
 def register(request: Request, user_data: RegisterRequest, db: Session = Depends(get_db)):
@@ -275,8 +324,11 @@ def register(request: Request, user_data: RegisterRequest, db: Session = Depends
             detail="Email ya registrado"
         )
     
-    # Hash de password
-    hashed_pass = hash_password(password_clean)
+    # Hash de password (pool acotado de bcrypt)
+    try:
+        hashed_pass = password_hasher.hash(password_clean)
+    except HasherSaturated as e:
+        raise _hasher_busy_response(e)
     
     # Crear usuario
     new_user = User(
@@ -290,6 +342,7 @@ def register(request: Request, user_data: RegisterRequest, db: Session = Depends
     db.add(new_user)
     db.commit()
     db.refresh(new_user)
+    UserCRUD.invalidate_total()
     
     # Generar tokens
     token_data = {"sub": str(new_user.id), "email": new_user.email, "role": new_user.role}
@@ -330,8 +383,13 @@ def login(request: Request, credentials: LoginRequest, db: Session = Depends(get
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Verificar password
-    if not verify_password(credentials.password, user.password_hash):
+    # Verificar password (pool acotado de bcrypt)
+    try:
+        password_ok = password_hasher.verify(credentials.password, user.password_hash)
+    except HasherSaturated as e:
+        raise _hasher_busy_response(e)
+    
+    if not password_ok:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Email o contraseña incorrectos",
@@ -345,6 +403,14 @@ def login(request: Request, credentials: LoginRequest, db: Session = Depends(get
             detail="Usuario desactivado. Contacte al administrador."
         )
     
+    # Rehash transparente si cambió BCRYPT_ROUNDS (si el pool está saturado, queda para el próximo login)
+    if needs_rehash(user.password_hash):
+        try:
+            user.password_hash = password_hasher.hash(credentials.password)
+            db.commit()
+        except HasherSaturated:
+            pass
+    
     # Generar tokens
     token_data = {"sub": str(user.id), "email": user.email, "role": user.role}
     access_token = create_access_token(token_data)
@@ -427,6 +493,9 @@ class UpdateStatusRequest(BaseModel):
     """Modelo para activar/desactivar usuario"""
     is_active: bool
 
+# Máximo de usuarios por página en /admin/users
+ADMIN_USERS_MAX_PAGE = 500
+
 class UserListResponse(BaseModel):
     """Modelo para respuesta de lista de usuarios"""
     id: int
@@ -441,6 +510,8 @@ class UserListResponse(BaseModel):
 def get_all_users(
     limit: int = 100,
     offset: int = 0,
+    after_id: Optional[int] = None,
+    include_total: bool = True,
     current_user: User = Depends(require_role(["admin"]))
 ):
     """
@@ -449,34 +520,39 @@ def get_all_users(
     
     Permite a los administradores ver todos los usuarios registrados,
     su rol, estado y cantidad de análisis realizados.
+    
+    Paginación: ordenada por id. Con `after_id` (cursor keyset, usar `next_after_id`
+    de la respuesta anterior) se ignora `offset`. `total` sale de una caché de
+    USERS_TOTAL_CACHE_TTL segundos; `include_total=false` lo omite.
     """
+    limit = max(1, min(limit, ADMIN_USERS_MAX_PAGE))
     try:
         db = SessionLocal()
         
-        # Obtener usuarios con paginación
-        users = db.query(User).offset(offset).limit(limit).all()
-        total = db.query(User).count()
-        
-        # Preparar respuesta con conteo de análisis
-        users_list = []
-        for user in users:
-            analyses_count = db.query(Analysis).filter(Analysis.user_id == user.id).count()
-            users_list.append({
-                "id": user.id,
-                "email": user.email,
-                "name": user.name,
-                "role": user.role,
-                "is_active": bool(user.is_active),
-                "created_at": user.created_at.isoformat(),
-                "analyses_count": analyses_count
-            })
+        # Usuarios de la página con su conteo de análisis (una sola consulta agrupada)
+        rows = UserCRUD.list_users_with_counts(db, limit=limit, offset=offset, after_id=after_id)
+        total = UserCRUD.count_users(db) if include_total else None
         
         db.close()
         
+        users_list = [
+            {
+                "id": row.id,
+                "email": row.email,
+                "name": row.name,
+                "role": row.role,
+                "is_active": bool(row.is_active),
+                "created_at": row.created_at.isoformat(),
+                "analyses_count": row.analyses_count
+            }
+            for row in rows
+        ]
+        
         return {
             "status": "success",
             "total": total,
             "count": len(users_list),
+            "next_after_id": users_list[-1]["id"] if len(users_list) == limit else None,
             "users": users_list
         }
         
@@ -529,6 +605,7 @@ def update_user_role(
         old_role = user.role
         user.role = request.role
         db.commit()
+        principal_cache.invalidate(user_id)
         db.refresh(user)
         db.close()
         
@@ -586,6 +663,7 @@ def update_user_status(
         
         user.is_active = 1 if request.is_active else 0
         db.commit()
+        principal_cache.invalidate(user_id)
         db.refresh(user)
         db.close()
         
@@ -610,6 +688,80 @@ def update_user_status(
             "message": f"Error actualizando estado: {str(e)}"
         }
 
+@app.get("/admin/cache/stats")
+def get_cache_stats(
+    current_user: User = Depends(require_role(["admin"]))
+):
+    """
+    Métricas de la caché de resultados de análisis, de la caché de reportes HTML
+    renderizados, de la caché de principales y de tokens verificados (hits, misses, evictions).
+    SOLO ADMIN.
+    """
+    return {
+        "status": "success",
+        "analysis_cache": analysis_cache.stats(),
+        "html_report_cache": html_report_cache.stats(),
+        "principal_cache": principal_cache.stats(),
+        "verified_token_cache": verified_token_cache.stats(),
+        "pdf_blob_store": blob_store.describe()
+    }
+
+@app.get("/admin/ai/stats")
+def get_ai_stats(
+    current_user: User = Depends(require_role(["admin"]))
+):
+    """
+    Latencia por tipo de llamada a la IA (promedio, máxima, última), errores y reintentos,
+    y hit-rate por método de la caché de respuestas.
+    SOLO ADMIN.
+    """
+    return {
+        "status": "success",
+        "ai_calls": ai_client.stats(),
+        "llm_cache": llm_cache.stats()
+    }
+
+@app.get("/admin/pdf-renderer/stats")
+def get_pdf_renderer_stats(
+    current_user: User = Depends(require_role(["admin"]))
+):
+    """
+    Pool de procesos de render de PDFs: renders en curso/en espera, rechazos por
+    saturación (503) y métricas por worker (renders, errores, latencia).
+    SOLO ADMIN.
+    """
+    return {
+        "status": "success",
+        "pdf_renderer": pdf_renderer.stats()
+    }
+
+@app.get("/admin/auth/stats")
+def get_auth_stats(
+    current_user: User = Depends(require_role(["admin"]))
+):
+    """
+    Pool de hashing de contraseñas (bcrypt): operaciones en curso/en espera,
+    rechazos por saturación (503) y latencia.
+    SOLO ADMIN.
+    """
+    return {
+        "status": "success",
+        "password_hasher": password_hasher.stats()
+    }
+
+@app.get("/admin/research-queue/stats")
+def get_research_queue_stats(
+    current_user: User = Depends(require_role(["admin"]))
+):
+    """
+    Profundidad y throughput de la cola de investigación de municipios nuevos.
+    SOLO ADMIN.
+    """
+    return {
+        "status": "success",
+        "research_queue": research_queue.stats()
+    }
+
 # ==================== ENDPOINTS DE ANÁLISIS ====================
 
 
@@ -630,36 +782,41 @@ class AnalysisRequest(BaseModel):
     has_special_inst: bool = False # [NUEVO]
     has_pool: bool = False         # [NUEVO]
 
-@app.post("/analyze")
-@limiter.limit(get_rate_limit("analyze"))
-def analyze_compliance(
-    request: Request,
-    data: AnalysisRequest,
-    current_user: User = Depends(get_current_active_user)
-):
+def _build_full_report(data: AnalysisRequest, ai) -> tuple:
     """
-    Analiza cumplimiento de protección civil.
-    REQUIERE AUTENTICACIÓN: Solo usuarios autenticados pueden generar análisis.
+    Pipeline común de /analyze y /analyze/batch:
+    sanitización, motor de reglas, árbol normativo y capa de IA.
     
-    RATE LIMIT: 10 requests/hora por usuario autenticado
-    """
-    from ai_service import AIService
-    ai = AIService()
+    Si el mismo input ya se analizó con las mismas reglas y marco legal,
+    se reutiliza el resultado. El PDF no: lleva fecha y hora de generación
+    (pie de página y QR), así que cada dictamen se renderiza de nuevo.
     
+    Returns:
+        (input_dict, full_report)
+    """
     # Sanitizar y validar inputs antes de procesar
-    input_dict = data.dict()
+    input_dict = data.dict(exclude={"generate_pdf"})
     sanitized_data = sanitize_analysis_input(input_dict)
     
     # Asegurarse de que los campos sanitizados se usen
     input_dict.update(sanitized_data)
     
     # 1. Llamar al motor de cálculo avanzado (Lógica Cuantitativa)
-    engine = CivilProtectionCalculator()
+    # Instancia compartida por worker (se recarga sola si cambia rules_matrix.json)
+    engine = get_engine()
     # Mockups para lógica extra (Inferencia Inteligente)
     # Si el usuario no lo especifica, lo inferimos por el tipo
     input_dict["has_cocina"] = True if any(x in data.tipo_inmueble for x in ["Restaurante", "Hotel", "Hospital"]) else False
     input_dict["has_site"] = True if any(x in data.tipo_inmueble for x in ["Oficina", "Call center", "Hotel", "Hospital"]) else False
     
+    # [CACHÉ] Mismo input + mismas reglas + mismo marco legal => mismo dictamen
+    cache_key = analysis_cache.make_key(
+        input_dict, engine.rules_fingerprint, get_legal_version(input_dict.get("estado", ""))
+    )
+    cached = analysis_cache.get(cache_key)
+    if cached is not None:
+        return input_dict, cached["report"]
+    
     # Usar el método avanzado
     full_report = engine.analyze_full_compliance(input_dict)
 
@@ -668,17 +825,16 @@ def analyze_compliance(
     full_report.update(input_dict)
 
     # 2. Agregar Capa de Inteligencia Artificial (Lógica Cualitativa)
-    justificacion_legal = ai.generate_legal_justification(input_dict)
-    
     # [NUEVO] Enriquecimiento Estructural de la Guía Capitular (Task Step 2322)
     # Buscamos la guía en el checklist generado previamente
     checklist = full_report.get("checklist", [])
     guide_idx = next((i for i, item in enumerate(checklist) if item.get('is_pipc_guide')), -1)
+    base_structure = checklist[guide_idx]['guide_content'] if guide_idx != -1 else None
+    
+    # Justificación + enriquecimiento son independientes: se piden a la IA en paralelo
+    justificacion_legal, enriched_structure = ai.generate_report_sections(input_dict, base_structure)
     
     if guide_idx != -1:
-        base_structure = checklist[guide_idx]['guide_content']
-        # START AI ENRICHMENT
-        enriched_structure = ai.enrich_chapter_structure(base_structure, data.estado, data.municipio)
         # UPDATE REPORT
         checklist[guide_idx]['guide_content'] = enriched_structure
         checklist[guide_idx]['titulo'] += " (AMPLIADO POR IA)"
@@ -695,12 +851,100 @@ def analyze_compliance(
     if "resumen_ejecutivo" in full_report:
         full_report["resumen_ejecutivo"]["legal_justification_strict"] = justificacion_legal
     
-    # 3. Generar PDF (Nombre temporal - ¡Mejorado con UUID en Phase 1.clean!)
+    analysis_cache.put(cache_key, full_report)
+    return input_dict, full_report
+
+def _store_pdf(filename: str, pdf: bytes) -> bool:
+    """Write-through al blob store (historial). False si no hay persistencia o falló."""
+    if not blob_store.persistent:
+        return False
+    try:
+        blob_store.put(filename, pdf)
+        return True
+    except Exception as e:
+        print(f"⚠️ No se pudo guardar el PDF en el blob store ({filename}): {e}")
+        return False
+
+def _finish_pdf(pdf: bytes, filename: str):
+    """
+    Cierre del job de render: guarda los bytes en el blob store. Retorna los bytes
+    para que el job los conserve solo si no quedaron en el blob store.
+    """
+    return None if _store_pdf(filename, pdf) else pdf
+
+def _enqueue_pdf(input_dict: dict, full_report: dict, filename: str, owner_id: int,
+                 ready_pdf: bytes = None, wait: float = 0) -> dict:
+    """
+    Encola el PDF y retorna el snapshot del job. Si ya se tienen los bytes (firma
+    incremental) solo se persisten; si no, FPDF corre en el pool de procesos (fuera
+    del GIL del servidor).
+    wait: segundos a esperar lugar en el pool antes de rechazar (lotes).
+    
+    Raises:
+        RendererSaturated: El pool de render está lleno (responder 503)
+    """
+    if ready_pdf is not None:
+        return render_queue.submit(_finish_pdf, filename, ready_pdf, filename, owner_id=owner_id)
+    future = pdf_renderer.submit(input_dict, full_report, wait=wait)
+    return render_queue.track(filename, future, _finish_pdf, filename, owner_id=owner_id)
+
+def _saturated_response(e: RendererSaturated) -> HTTPException:
+    """503 con Retry-After cuando el pool de render no admite más trabajo."""
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="El generador de PDFs está saturado, intenta de nuevo en unos segundos",
+        headers={"Retry-After": str(e.retry_after)}
+    )
+
+def _pdf_available(filename: str) -> bool:
+    """El PDF se puede descargar: en memoria (job de render), en el blob store o archivo legado en disco."""
+    if not filename:
+        return False
+    job = render_queue.get_by_filename(filename)
+    if job and job["pdf"] is not None:
+        return True
+    try:
+        if blob_store.exists(filename):
+            return True
+    except Exception:
+        pass
+    return os.path.exists(filename)
+
+@app.post("/analyze")
+@limiter.limit(get_rate_limit("analyze"))
+def analyze_compliance(
+    request: Request,
+    data: AnalysisRequest,
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Analiza cumplimiento de protección civil.
+    REQUIERE AUTENTICACIÓN: Solo usuarios autenticados pueden generar análisis.
+    
+    RATE LIMIT: 10 requests/hora por usuario autenticado
+    503 + Retry-After: el pool de render de PDFs está saturado
+    """
+    from ai_service import AIService
+    
+    # Backpressure: rechazar antes de gastar motor + IA si no hay lugar para el PDF
+    try:
+        pdf_renderer.check_capacity()
+    except RendererSaturated as e:
+        raise _saturated_response(e)
+    
+    ai = AIService()
+    input_dict, full_report = _build_full_report(data, ai)
+    
+    # 3. Encolar PDF (Nombre temporal - ¡Mejorado con UUID en Phase 1.clean!)
+    # El render corre en background; el cliente consulta /render-jobs/{job_id}
     import uuid
     filename = f"Dictamen_{data.municipio}_{uuid.uuid4().hex[:8]}.pdf"
     
     # Pasar el reporte completo para que incluya presupuesto
-    generate_pdf_report(input_dict, full_report, filename)
+    try:
+        job = _enqueue_pdf(input_dict, full_report, filename, current_user.id)
+    except RendererSaturated as e:
+        raise _saturated_response(e)
     
     # 4. [PROTEGIDO] Auto-guardar en Historial del USUARIO AUTENTICADO
     try:
@@ -724,9 +968,153 @@ def analyze_compliance(
         "status": "success",
         "data": full_report, # Retorna todo: basic, checklist, presupuesto
         "download_url": f"/download/{filename}",
-        "pdf_filename": filename  # [NUEVO] Para que el frontend pueda saber el nombre
+        "pdf_filename": filename,  # [NUEVO] Para que el frontend pueda saber el nombre
+        "render_job": {
+            "job_id": job["job_id"],
+            "status": job["status"],
+            "status_url": f"/render-jobs/{job['job_id']}"
+        }
     }
 
+# ==================== ANÁLISIS EN LOTE (MULTI-SITIO) ====================
+
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "500"))
+BATCH_MAX_WORKERS = int(os.getenv("BATCH_MAX_WORKERS", "4"))
+BATCH_PDF_WAIT_SECONDS = float(os.getenv("BATCH_PDF_WAIT_SECONDS", "300"))
+
+class BatchAnalysisItem(AnalysisRequest):
+    generate_pdf: bool = False  # Por defecto solo datos (sin PDF)
+
+class BatchAnalysisRequest(BaseModel):
+    items: List[BatchAnalysisItem]
+
+@app.post("/analyze/batch")
+@limiter.limit(get_rate_limit("analyze_batch"))
+def analyze_batch_endpoint(
+    request: Request,
+    batch: BatchAnalysisRequest,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Analiza múltiples inmuebles en una sola petición.
+    REQUIERE AUTENTICACIÓN: Los análisis se asocian al usuario autenticado.
+    
+    Cada inmueble se procesa en paralelo (motor + árbol normativo + IA) y su resultado
+    se emite como una línea NDJSON en cuanto está listo (no en orden de envío, usar "index").
+    La última línea es un resumen (con los ids guardados); el historial se guarda con un
+    solo bulk insert al terminar, o al cortarse el stream con lo ya procesado.
+    
+    RATE LIMIT: 5 requests/hora por usuario autenticado (máx. BATCH_MAX_ITEMS inmuebles)
+    """
+    import json
+    import uuid
+    from ai_service import AIService
+    from database import AnalysisCRUD
+    
+    items = batch.items
+    if not items:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="El lote no contiene inmuebles"
+        )
+    if len(items) > BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"El lote excede el máximo de {BATCH_MAX_ITEMS} inmuebles"
+        )
+    
+    # Capturar datos del usuario antes de que se cierre la sesión del request
+    user_id = current_user.id
+    ai = AIService()
+    
+    def process_item(item: BatchAnalysisItem):
+        # Dentro del lote se espera lugar en el pool de render (hasta BATCH_PDF_WAIT_SECONDS)
+        # en vez de fallar el inmueble; la espera va antes del motor + IA para no tirar ese trabajo
+        try:
+            if item.generate_pdf:
+                pdf_renderer.check_capacity(wait=BATCH_PDF_WAIT_SECONDS)
+            input_dict, full_report = _build_full_report(item, ai)
+            filename, job = None, None
+            if item.generate_pdf:
+                filename = f"Dictamen_{item.municipio}_{uuid.uuid4().hex[:8]}.pdf"
+                job = _enqueue_pdf(input_dict, full_report, filename, user_id, wait=BATCH_PDF_WAIT_SECONDS)
+        except RendererSaturated as e:
+            raise _saturated_response(e)
+        return input_dict, full_report, filename, job
+    
+    def result_line(index: int, future, records: list) -> dict:
+        try:
+            input_dict, full_report, filename, job = future.result()
+        except HTTPException as e:
+            return {"type": "result", "index": index, "status": "error", "message": e.detail}
+        except Exception as e:
+            return {"type": "result", "index": index, "status": "error", "message": str(e)}
+        records.append({
+            "input_data": input_dict,
+            "report_data": full_report,
+            "pdf_path": filename
+        })
+        return {
+            "type": "result",
+            "index": index,
+            "status": "success",
+            "data": full_report,
+            "download_url": f"/download/{filename}" if filename else None,
+            "pdf_filename": filename,
+            "render_job": {
+                "job_id": job["job_id"],
+                "status_url": f"/render-jobs/{job['job_id']}"
+            } if job else None
+        }
+    
+    def save_records(records: list) -> list:
+        """
+        Un solo bulk insert para todo el lote; retorna los ids guardados.
+        Usa la sesión del request: get_db se cierra después de enviar la respuesta completa.
+        """
+        if not records:
+            return []
+        try:
+            return [analysis.id for analysis in AnalysisCRUD.create_analyses_bulk(db, user_id, records)]
+        except Exception as e:
+            db.rollback()
+            print(f"⚠️ Warning: No se pudo guardar el lote en historial: {e}")
+            return []
+    
+    def stream_results():
+        records = []
+        pool = ThreadPoolExecutor(max_workers=min(BATCH_MAX_WORKERS, len(items)))
+        futures = {pool.submit(process_item, item): index for index, item in enumerate(items)}
+        pending = set(futures)
+        try:
+            for future in as_completed(futures):
+                pending.discard(future)
+                line = result_line(futures[future], future, records)
+                yield json.dumps(line, ensure_ascii=False, default=str) + "\n"
+        finally:
+            # Cliente desconectado o error en el stream: no arrancar más inmuebles, pero
+            # guardar los que ya terminaron (sus PDFs ya están en la cola de render)
+            for future in pending:
+                future.cancel()
+            pool.shutdown(wait=True)
+            for future in pending:
+                if not future.cancelled():
+                    result_line(futures[future], future, records)
+            saved_ids = save_records(records)
+        
+        summary = {
+            "type": "summary",
+            "total": len(items),
+            "succeeded": len(records),
+            "failed": len(items) - len(records),
+            "saved": len(saved_ids),
+            "saved_ids": saved_ids
+        }
+        yield json.dumps(summary) + "\n"
+    
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
 @app.get("/")
 def read_root():
     return {"message": "CivilProtect AI Engine Operational"}
@@ -734,6 +1122,31 @@ def read_root():
 class SignReportRequest(BaseModel):
     report_data: dict
     signature_image: str
+    pdf_filename: Optional[str] = None  # PDF ya generado (/analyze): se firma sin re-maquetar
+
+def _load_owned_pdf(filename: str, user_id: int):
+    """Bytes de un PDF ya generado si pertenece al usuario (job de render, blob store o disco legado)."""
+    job = render_queue.get_by_filename(filename)
+    if job and job["owner_id"] == user_id:
+        if job["status"] not in (DONE, ERROR):
+            job = render_queue.wait(job["job_id"], timeout=30)
+        if job and job["pdf"] is not None:
+            return job["pdf"]
+    else:
+        from database import SessionLocal, Analysis
+        db = SessionLocal()
+        analysis = db.query(Analysis).filter(Analysis.pdf_path == filename).first()
+        db.close()
+        if not analysis or analysis.user_id != user_id:
+            return None
+    try:
+        pdf = blob_store.get(filename)
+    except Exception:
+        pdf = None
+    if pdf is None and os.path.exists(filename):
+        with open(filename, "rb") as f:
+            pdf = f.read()
+    return pdf
 
 @app.post("/sign-report")
 def sign_report_endpoint(
@@ -742,7 +1155,9 @@ def sign_report_endpoint(
 ):
     """
     Recibe un reporte existente y una firma en Base64.
-    Regenera el PDF incluyendo la firma y lo registra en el historial del usuario.
+    Con pdf_filename (PDF propio ya generado) la firma se estampa como revisión
+    incremental de ese PDF; si no, o si no se puede, regenera el PDF completo con la
+    firma. El PDF firmado se registra en el historial del usuario.
     """
     try:
         analysis_data = data.report_data
@@ -775,7 +1190,21 @@ def sign_report_endpoint(
         filename = f"Dictamen_Firmado_{municipio}_{uuid.uuid4().hex[:8]}.pdf"
         
         # Pasar correctamente input_data (con firma) y results (analysis_data)
-        generate_pdf_report(input_data, analysis_data, filename)
+        # Firma incremental sobre el PDF existente (costo de una imagen, no de todo el layout)
+        signed_pdf = None
+        if data.pdf_filename:
+            source_pdf = _load_owned_pdf(data.pdf_filename, current_user.id)
+            if source_pdf is not None:
+                try:
+                    signed_pdf = stamp_signature(source_pdf, data.signature_image)
+                except Exception as e:
+                    print(f"⚠️ No se pudo firmar {data.pdf_filename} de forma incremental, re-render completo: {e}")
+        
+        # Si no, render en el mismo pool de procesos que /analyze; se espera a que termine
+        job = _enqueue_pdf(input_data, analysis_data, filename, current_user.id, ready_pdf=signed_pdf)
+        job = render_queue.wait(job["job_id"])
+        if job["status"] == ERROR:
+            raise RuntimeError(job["error"])
         
         # [CRITICAL STEP] Guardar en DB para pasar validación de ownership en /download
         from database import SessionLocal, AnalysisCRUD
@@ -799,6 +1228,8 @@ def sign_report_endpoint(
             "download_url": f"/download/{filename}",
             "pdf_filename": filename
         }
+    except RendererSaturated as e:
+        raise _saturated_response(e)
     except Exception as e:
         import traceback
         error_detail = traceback.format_exc()
@@ -806,46 +1237,122 @@ def sign_report_endpoint(
         print(f"📋 TRACEBACK:\n{error_detail}")
         return {"status": "error", "message": str(e)}
 
+@app.get("/render-jobs/{job_id}")
+def get_render_job(
+    job_id: str,
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Estado del render en background de un PDF (polling).
+    REQUIERE AUTENTICACIÓN Y OWNERSHIP: Solo el dueño del análisis puede consultar su job.
+    
+    status: pending | running | done | error
+    """
+    job = render_queue.get(job_id)
+    if not job or job["owner_id"] != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job de renderizado no encontrado"
+        )
+    
+    return {
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "pdf_filename": job["filename"],
+        "download_url": f"/download/{job['filename']}" if job["status"] == DONE else None,
+        "error": job["error"]
+    }
+
 @app.get("/download/{filename}")
 def download_file(
     filename: str,
+    request: Request,
     current_user: User = Depends(get_current_active_user)
 ):
     """
-    Descarga un archivo PDF generado.
+    Descarga un archivo PDF generado (streaming).
     REQUIERE AUTENTICACIÓN Y OWNERSHIP: Solo el propietario del análisis puede descargar el PDF.
+    
+    Fuente: bytes en memoria del job de render > blob store > archivo legado en disco.
+    Ownership: por el job de render mientras exista (TTL), si no por el historial.
+    Cada render tiene nombre único e inmutable: ETag por nombre, If-None-Match -> 304.
     """
-    from fastapi.responses import FileResponse
+    from fastapi.responses import FileResponse, Response
     from database import SessionLocal, Analysis
+    from urllib.parse import quote
+    
+    # Mismo Content-Disposition que FileResponse (RFC 5987 si el municipio lleva acentos)
+    quoted = quote(filename)
+    etag = make_etag("pdf", filename)
+    headers = {"Content-Disposition": (
+        f'attachment; filename="{filename}"' if quoted == filename
+        else f"attachment; filename*=utf-8''{quoted}"
+    ), **cache_headers(etag)}
+    not_modified = etag_matches(request.headers.get("if-none-match"), etag)
     
     try:
-        # Verificar que el archivo existe
-        path = filename
-        if not os.path.exists(path):
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Archivo no encontrado"
+        # Si el PDF sigue en la cola de render, indicar al cliente que reintente
+        job = render_queue.get_by_filename(filename)
+        if job and job["owner_id"] == current_user.id and job["status"] != DONE:
+            if job["status"] == ERROR:
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail=f"Error al generar el PDF: {job['error']}"
+                )
+            return JSONResponse(
+                status_code=status.HTTP_202_ACCEPTED,
+                content={"status": job["status"], "job_id": job["job_id"]},
+                headers={"Retry-After": "1"}
             )
         
+        # Job terminado del usuario: el job ya identifica al dueño (el registro en el
+        # historial puede no existir todavía, p. ej. a mitad de un /analyze/batch)
+        owned_job = job is not None and job["owner_id"] == current_user.id
+        
+        # PDF recién renderizado en memoria
+        if owned_job and job["pdf"] is not None:
+            if not_modified:
+                return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers(etag))
+            headers["Content-Length"] = str(len(job["pdf"]))
+            return StreamingResponse(iter_bytes(job["pdf"]), media_type="application/pdf", headers=headers)
+        
         # ✅ VALIDAR OWNERSHIP: Verificar que el PDF pertenece al usuario
-        db = SessionLocal()
-        analysis = db.query(Analysis).filter(Analysis.pdf_path == filename).first()
-        db.close()
+        if not owned_job:
+            db = SessionLocal()
+            analysis = db.query(Analysis.user_id).filter(Analysis.pdf_path == filename).first()
+            db.close()
+            
+            if not analysis:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Análisis asociado al PDF no encontrado"
+                )
+            
+            if analysis.user_id != current_user.id:
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="No tienes permiso para descargar este archivo"
+                )
         
-        if not analysis:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Análisis asociado al PDF no encontrado"
-            )
+        # El navegador ya tiene este PDF (ownership ya validado)
+        if not_modified:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers(etag))
         
-        if analysis.user_id != current_user.id:
+        # Si todo está bien, permitir descarga
+        try:
+            chunks = blob_store.stream(filename)
+        except ValueError:
+            chunks = None
+        if chunks is not None:
+            return StreamingResponse(chunks, media_type="application/pdf", headers=headers)
+        
+        # PDFs generados antes del blob store (escritos en el directorio de trabajo)
+        if not os.path.exists(filename):
             raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="No tienes permiso para descargar este archivo"
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Archivo no encontrado"
             )
-        
-        # Si todo está bien, permitir descarga
-        return FileResponse(path, media_type='application/pdf', filename=filename)
+        return FileResponse(filename, media_type='application/pdf', filename=filename, headers=cache_headers(etag))
         
     except HTTPException:
         raise
@@ -944,7 +1451,7 @@ def get_history(
                 "custom_label": a.custom_label,
                 "pdf_path": a.pdf_path,
                 "created_at": a.created_at.isoformat(),
-                "has_pdf": bool(a.pdf_path and os.path.exists(a.pdf_path))
+                "has_pdf": _pdf_available(a.pdf_path)
             })
         
         return {
@@ -972,7 +1479,6 @@ def get_analysis(
     Incluye input_data y report_data deserializados.
     """
     from database import SessionLocal, AnalysisCRUD
-    import json
     
     try:
         db = SessionLocal()
@@ -1002,8 +1508,8 @@ def get_analysis(
                 "estado": analysis.estado,
                 "tipo_inmueble": analysis.tipo_inmueble,
                 "custom_label": analysis.custom_label,
-                "input_data": json.loads(analysis.input_data),
-                "report_data": json.loads(analysis.report_data),
+                "input_data": analysis.input_data,
+                "report_data": analysis.report_data,
                 "pdf_path": analysis.pdf_path,
                 "created_at": analysis.created_at.isoformat()
             }
@@ -1055,6 +1561,7 @@ def delete_analysis(
         db.close()
         
         if success:
+            html_report_cache.discard(analysis_id)
             return {
                 "status": "success",
                 "message": "Análisis eliminado correctamente"
@@ -1164,48 +1671,77 @@ def generate_html_report_endpoint(
 @app.get("/preview-html/{analysis_id}")
 def preview_html_report(
     analysis_id: int,
+    request: Request,
     current_user: User = Depends(get_current_active_user)
 ):
     """
     Genera y muestra un reporte HTML de un análisis guardado.
     REQUIERE AUTENTICACIÓN Y OWNERSHIP: Solo el propietario puede visualizar el reporte.
-    Se puede abrir directamente en el navegador.
+    Se puede abrir directamente en el navegador. El HTML se envía en chunks (streaming).
+    
+    ETag por (id, updated_at, versión de plantillas): If-None-Match -> 304 solo con la
+    consulta de metadata; el HTML de cada revisión se renderiza una vez (html_report_cache).
     """
-    from database import SessionLocal, AnalysisCRUD
-    from html_report_generator import generate_html_report
-    from fastapi.responses import HTMLResponse
-    import json
+    from database import SessionLocal, Analysis
+    from html_report_generator import iter_html_report, TEMPLATE_VERSION
+    from fastapi.responses import HTMLResponse, Response
+    from itertools import chain
     
+    db = SessionLocal()
     try:
-        db = SessionLocal()
-        analysis = AnalysisCRUD.get_analysis(db, analysis_id)
-        db.close()
+        # Solo metadata: el JSON del reporte se lee únicamente si hay que renderizar
+        meta = db.query(Analysis.user_id, Analysis.created_at, Analysis.updated_at)\
+            .filter(Analysis.id == analysis_id).first()
         
-        if not analysis:
+        if not meta:
             return HTMLResponse(
                 content="<h1>Análisis no encontrado</h1>",
                 status_code=404
             )
         
         # ✅ VALIDAR OWNERSHIP: Solo el propietario puede ver el reporte
-        if analysis.user_id != current_user.id:
+        if meta.user_id != current_user.id:
             return HTMLResponse(
                 content="<h1>Acceso Denegado</h1><p>No tienes permiso para ver este análisis.</p>",
                 status_code=403
             )
         
-        input_data = json.loads(analysis.input_data)
-        report_data = json.loads(analysis.report_data)
+        # La revisión (ETag) cambia si cambia el análisis o el diseño del reporte
+        etag = make_etag("html", analysis_id, meta.updated_at or meta.created_at, TEMPLATE_VERSION)
+        headers = cache_headers(etag)
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        
+        html = html_report_cache.get(analysis_id, etag)
+        if html is not None:
+            return Response(content=html, media_type="text/html; charset=utf-8", headers=headers)
         
-        html_content = generate_html_report(input_data, report_data)
+        # Columnas JSON: SQLAlchemy ya las entrega como dicts
+        input_data, report_data = db.query(Analysis.input_data, Analysis.report_data)\
+            .filter(Analysis.id == analysis_id).one()
         
-        return HTMLResponse(content=html_content)
+        # El primer chunk se arma antes de responder; iter_html_report resuelve todos los
+        # datos (tarjetas, importes) antes de producirlo: los errores de datos siguen siendo un 500
+        chunks = iter_html_report(input_data, report_data)
+        first_chunk = next(chunks)
+        
+        def stream_and_cache():
+            parts = []
+            for chunk in chain([first_chunk], chunks):
+                data = chunk.encode("utf-8")
+                parts.append(data)
+                yield data
+            html_report_cache.put(analysis_id, etag, b"".join(parts))
+        
+        return StreamingResponse(stream_and_cache(), media_type="text/html; charset=utf-8", headers=headers)
         
     except Exception as e:
         return HTMLResponse(
             content=f"<h1>Error: {str(e)}</h1>",
             status_code=500
         )
+    finally:
+        db.close()
 
 if __name__ == "__main__":
     import uvicorn
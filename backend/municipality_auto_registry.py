@@ -1,16 +1,36 @@
 """
 Sistema de Auto-Registro de Municipios
 Auto-populate de la base de datos estatal conforme se van analizando municipios.
-Thread-safe, no bloqueante, incremental.
+Thread-safe, multi-proceso, no bloqueante, incremental.
+
+Almacenamiento append-only: cada municipio nuevo se agrega como una línea a
+data/states_db/{estado}.municipios.jsonl (con flock, seguro entre workers de gunicorn).
+El JSON base del estado solo se reescribe al compactar (escritura atómica), cada
+COMPACT_EVERY registros. state_registry fusiona JSON base + log al leer.
 """
 import json
 import os
+import threading
 import unicodedata
+import datetime
+from contextlib import contextmanager
 from pathlib import Path
-from threading import Lock
 
-# Thread-safety lock para escritura concurrente
-_write_lock = Lock()
+try:
+    import fcntl
+except ImportError:  # Windows (desarrollo local): solo exclusión dentro del proceso
+    fcntl = None
+
+LOG_SUFFIX = ".municipios.jsonl"
+COMPACT_EVERY = int(os.getenv("MUNICIPALITY_LOG_COMPACT_EVERY", "50"))
+RESEARCH_WAIT_SECONDS = 60
+
+# Thread-safety lock para escritura concurrente (solo se toma para escribir, nunca durante la IA)
+_write_lock = threading.Lock()
+
+# Investigaciones en curso: (slug, municipio) -> Event. Deduplica requests concurrentes
+_in_flight = {}
+_in_flight_lock = threading.Lock()
 
 def slugify(value):
     """Normaliza strings para nombres de archivo: 'Ciudad de México' -> 'ciudad_de_mexico'"""
@@ -18,82 +38,206 @@ def slugify(value):
     value = unicodedata.normalize('NFKD', value).encode('ascii', 'ignore').decode('ascii')
     return value.replace(' ', '_')
 
+def read_municipality_log(log_path):
+    """
+    Lee los registros del log append-only: {municipio: datos}.
+    Ignora líneas incompletas (escritura en curso de otro proceso).
+    """
+    records = {}
+    try:
+        with open(log_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                records.setdefault(record["municipio"], record["data"])
+    except OSError:
+        pass
+    return records
+
+@contextmanager
+def _locked(f):
+    """Lock exclusivo entre procesos (flock) + entre threads sobre el archivo abierto."""
+    with _write_lock:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield f
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+def _write_json_atomic(path, data):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=4)
+    os.replace(tmp_path, path)
+
+def _read_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def _base_state_structure(estado_nombre):
+    return {
+        "_meta": {
+            "estado": estado_nombre,
+            "last_updated": "Auto-generado",
+            "auto_populated": True
+        },
+        "state_law": {
+            "ley_nombre": f"Ley de Protección Civil del Estado de {estado_nombre}",
+            "art_obligatorio": "Art. Variable",
+            "reglamento_nombre": f"Reglamento de la Ley de Protección Civil de {estado_nombre}",
+            "art_reglamento": "Art. Variable"
+        },
+        "municipios": {}
+    }
+
+def _is_registered(json_path, log_path, municipio_nombre):
+    try:
+        if municipio_nombre in _read_json(json_path).get("municipios", {}):
+            return True
+    except (OSError, ValueError):
+        pass
+    return municipio_nombre in read_municipality_log(log_path)
+
+def compact_state(estado_nombre, base_dir):
+    """
+    Incorpora el log append-only al JSON base del estado (escritura atómica) y vacía el log.
+    Los municipios ya presentes en el JSON base (ej. editados a mano) tienen prioridad.
+    """
+    slug = slugify(estado_nombre)
+    states_db_dir = os.path.join(base_dir, "data", "states_db")
+    json_path = os.path.join(states_db_dir, f"{slug}.json")
+    log_path = os.path.join(states_db_dir, f"{slug}{LOG_SUFFIX}")
+    if not os.path.exists(log_path):
+        return 0
+
+    with open(log_path, 'r+', encoding='utf-8') as log_file, _locked(log_file):
+        records = read_municipality_log(log_path)
+        if not records:
+            return 0
+        try:
+            state_data = _read_json(json_path)
+        except (OSError, ValueError):
+            state_data = _base_state_structure(estado_nombre)
+        municipios = state_data.setdefault("municipios", {})
+        for municipio, data in records.items():
+            municipios.setdefault(municipio, data)
+        _write_json_atomic(json_path, state_data)
+        log_file.truncate(0)
+    return len(records)
+
+class ResearchUnavailable(Exception):
+    """La IA no produjo una investigación real (solo la estructura genérica de fallback)."""
+
+
+def research_municipality(estado_nombre, municipio_nombre):
+    """
+    Investiga con IA la normativa del municipio (llamada lenta, sin locks).
+    Returns:
+        dict: Datos "Nivel Oro" listos para register_municipality
+    Raises:
+        ResearchUnavailable: La IA respondió con el fallback genérico (no se debe
+            registrar; la cola de investigación reintenta o marca el trabajo en error)
+    """
+    from ai_service import AIService
+    ai = AIService()
+
+    print(f"🔍 Investigando normativa para {municipio_nombre}, {estado_nombre}...")
+    municipal_regs = ai.research_municipal_regulations(estado_nombre, municipio_nombre)
+    if municipal_regs.get("_fallback"):
+        raise ResearchUnavailable(
+            f"Sin investigación de IA para {municipio_nombre}, {estado_nombre}: {municipal_regs['_fallback']}"
+        )
+
+    # Estructura ENRIQUECIDA POR IA
+    return {
+        "reglamento": municipal_regs.get("reglamento", f"Reglamento de PC de {municipio_nombre}"),
+        "bando": municipal_regs.get("bando", f"Bando Municipal de {municipio_nombre}"),
+        "art_inspeccion": municipal_regs.get("art_inspeccion", "Art. Variable"),
+        "art_bando": municipal_regs.get("art_bando", "Orden Público"),
+        "_ai_researched": True,
+        "_research_timestamp": str(datetime.datetime.now())
+    }
+
+def register_municipality(estado_nombre, municipio_nombre, data, base_dir):
+    """
+    Agrega el municipio al log del estado (sección crítica corta, sin IA).
+    Returns:
+        bool: True si se agregó, False si otro proceso ya lo había registrado
+    """
+    slug = slugify(estado_nombre)
+    states_db_dir = os.path.join(base_dir, "data", "states_db")
+    Path(states_db_dir).mkdir(parents=True, exist_ok=True)
+    json_path = os.path.join(states_db_dir, f"{slug}.json")
+    log_path = os.path.join(states_db_dir, f"{slug}{LOG_SUFFIX}")
+
+    with open(log_path, 'a', encoding='utf-8') as log_file, _locked(log_file):
+        # Crear estructura base si no existe el estado (una sola vez)
+        if not os.path.exists(json_path):
+            _write_json_atomic(json_path, _base_state_structure(estado_nombre))
+        # Re-verificar bajo lock: otro worker pudo registrarlo mientras investigábamos
+        if _is_registered(json_path, log_path, municipio_nombre):
+            return False
+        line = json.dumps({"municipio": municipio_nombre, "data": data}, ensure_ascii=False)
+        log_file.write(line + "\n")
+        log_file.flush()
+
+    if len(read_municipality_log(log_path)) >= COMPACT_EVERY:
+        compact_state(estado_nombre, base_dir)
+    return True
+
 def auto_register_municipality(estado_nombre, municipio_nombre, base_dir):
     """
     Auto-registra un municipio en la DB estatal si no existe.
     **AHORA CON INVESTIGACIÓN AUTOMÁTICA DE IA**
     Crea el archivo JSON del estado si no existe.
-    Thread-safe y no bloqueante.
-    
+    La investigación con IA corre fuera de cualquier lock; requests concurrentes
+    por el mismo municipio esperan a una sola investigación.
+
     Args:
         estado_nombre (str): Nombre del estado (ej. "Morelos")
         municipio_nombre (str): Nombre del municipio (ej. "Cuautla")
         base_dir (str): Directorio base del backend
-    
+
     Returns:
         bool: True si se registró exitosamente, False si ya existía o hubo error
     """
+    from state_registry import get_state_registry  # Import tardío (state_registry importa slugify)
+
     try:
-        with _write_lock:  # Evita corrupción por escritura concurrente
-            # 1. Construir ruta del archivo
-            slug = slugify(estado_nombre)
-            states_db_dir = os.path.join(base_dir, "data", "states_db")
-            Path(states_db_dir).mkdir(parents=True, exist_ok=True)
-            
-            json_path = os.path.join(states_db_dir, f"{slug}.json")
-            
-            # 2. Cargar o crear estructura base
-            if os.path.exists(json_path):
-                with open(json_path, 'r', encoding='utf-8') as f:
-                    state_data = json.load(f)
-            else:
-                # Crear estructura base si no existe el estado
-                state_data = {
-                    "_meta": {
-                        "estado": estado_nombre,
-                        "last_updated": "Auto-generado",
-                        "auto_populated": True
-                    },
-                    "state_law": {
-                        "ley_nombre": f"Ley de Protección Civil del Estado de {estado_nombre}",
-                        "art_obligatorio": "Art. Variable",
-                        "reglamento_nombre": f"Reglamento de la Ley de Protección Civil de {estado_nombre}",
-                        "art_reglamento": "Art. Variable"
-                    },
-                    "municipios": {}
-                }
-            
-            # 3. Verificar si el municipio ya existe
-            if municipio_nombre in state_data.get("municipios", {}):
-                return False  # Ya existe, no hacer nada
-            
-            # 4. [NUEVO] INVESTIGACIÓN CON IA DE LA NORMATIVA ESPECÍFICA
-            from ai_service import AIService
-            ai = AIService()
-            
-            print(f"🔍 Investigando normativa para {municipio_nombre}, {estado_nombre}...")
-            municipal_regs = ai.research_municipal_regulations(estado_nombre, municipio_nombre)
-            
-            # 5. Agregar municipio con estructura ENRIQUECIDA POR IA
-            if "municipios" not in state_data:
-                state_data["municipios"] = {}
-            
-            state_data["municipios"][municipio_nombre] = {
-                "reglamento": municipal_regs.get("reglamento", f"Reglamento de PC de {municipio_nombre}"),
-                "bando": municipal_regs.get("bando", f"Bando Municipal de {municipio_nombre}"),
-                "art_inspeccion": municipal_regs.get("art_inspeccion", "Art. Variable"),
-                "art_bando": municipal_regs.get("art_bando", "Orden Público"),
-                "_ai_researched": True,
-                "_research_timestamp": str(__import__('datetime').datetime.now())
-            }
-            
-            # 6. Guardar archivo actualizado
-            with open(json_path, 'w', encoding='utf-8') as f:
-                json.dump(state_data, f, ensure_ascii=False, indent=4)
-            
+        # 1. Verificar si el municipio ya existe (registro en memoria, O(1))
+        if get_state_registry(base_dir).has_municipality(estado_nombre, municipio_nombre):
+            return False  # Ya existe, no hacer nada
+
+        # 2. Deduplicar: si otro thread ya lo está investigando, esperar su resultado
+        key = (slugify(estado_nombre), municipio_nombre)
+        with _in_flight_lock:
+            event = _in_flight.get(key)
+            owner = event is None
+            if owner:
+                event = _in_flight[key] = threading.Event()
+        if not owner:
+            event.wait(RESEARCH_WAIT_SECONDS)
+            return False
+
+        try:
+            # 3. [NUEVO] INVESTIGACIÓN CON IA DE LA NORMATIVA ESPECÍFICA (sin locks)
+            data = research_municipality(estado_nombre, municipio_nombre)
+
+            # 4. Append al log (sección crítica corta)
+            if not register_municipality(estado_nombre, municipio_nombre, data, base_dir):
+                return False
+
             print(f"✅ Auto-registrado CON IA: {municipio_nombre}, {estado_nombre}")
             return True
-            
+        finally:
+            with _in_flight_lock:
+                _in_flight.pop(key, None)
+            event.set()
+
     except Exception as e:
         # NO FALLAR si hay error de escritura (permisos, disco lleno, etc)
         print(f"⚠ Warning: No se pudo auto-registrar {municipio_nombre}: {e}")
@@ -104,15 +248,5 @@ def get_municipality_count(estado_nombre, base_dir):
     Retorna el número de municipios registrados para un estado.
     Útil para estadísticas y monitoreo.
     """
-    try:
-        slug = slugify(estado_nombre)
-        json_path = os.path.join(base_dir, "data", "states_db", f"{slug}.json")
-        
-        if os.path.exists(json_path):
-            with open(json_path, 'r', encoding='utf-8') as f:
-                state_data = json.load(f)
-                return len(state_data.get("municipios", {}))
-    except:
-        pass
-    
-    return 0
+    from state_registry import get_state_registry  # Import tardío (state_registry importa slugify)
+    return get_state_registry(base_dir).municipality_count(estado_nombre)
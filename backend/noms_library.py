@@ -1,6 +1,11 @@
 import json
 import os
-from municipality_auto_registry import auto_register_municipality, slugify
+import copy
+import hashlib
+import threading
+from collections import OrderedDict
+from research_queue import research_queue
+from state_registry import get_state_registry
 
 # --- 1. CARGA DE BASE DE DATOS (JSON) ---
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -17,6 +22,16 @@ def load_legal_db():
 
 LEGAL_DB = load_legal_db()
 
+def _file_fingerprint(path):
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()[:16]
+    except OSError:
+        return "missing"
+
+# Versión del marco legal base (cambia si se edita legal_db.json)
+LEGAL_DB_VERSION = _file_fingerprint(DB_PATH)
+
 # Asignación de bases de datos
 STATE_LAWS = LEGAL_DB.get("state_laws", {})
 RISK_CONFIG = LEGAL_DB.get("risk_config", {})
@@ -153,49 +168,172 @@ def get_pipc_guide(estado: str) -> list:
 
     return guia_dinamica
 
+# --- 3. RECARGA EN CALIENTE DE legal_db.json ---
+def _stat_signature(path):
+    """Firma barata de un archivo (mtime, tamaño) o None si no existe."""
+    try:
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+_legal_db_lock = threading.Lock()
+_legal_db_signature = _stat_signature(DB_PATH)
+
+def reload_legal_db():
+    """
+    Recarga legal_db.json sin reiniciar el proceso.
+    Si el archivo nuevo no trae leyes estatales, se conservan las anteriores;
+    las NOMs inyectadas por hotfix se mantienen.
+    """
+    global LEGAL_DB, LEGAL_DB_VERSION, STATE_LAWS, RISK_CONFIG, PIPC_GUIDE_STRUCTURE, SPECIFIC_NOMS
+    db = load_legal_db()
+    specific_noms = db.get("specific_noms", {})
+    for nom_key, nom_data in SPECIFIC_NOMS.items():
+        specific_noms.setdefault(nom_key, nom_data)
+
+    LEGAL_DB = db
+    LEGAL_DB_VERSION = _file_fingerprint(DB_PATH)
+    STATE_LAWS = db.get("state_laws") or STATE_LAWS
+    RISK_CONFIG = db.get("risk_config", {})
+    PIPC_GUIDE_STRUCTURE = db.get("guide_structure", [])
+    SPECIFIC_NOMS = specific_noms
+    print(f"[LEGAL DB] legal_db.json recargado (versión {LEGAL_DB_VERSION})")
+
+def _check_legal_db():
+    """Recarga legal_db.json si cambió en disco desde la última lectura."""
+    global _legal_db_signature
+    current = _stat_signature(DB_PATH)
+    if current == _legal_db_signature:
+        return
+    with _legal_db_lock:
+        if current != _legal_db_signature:
+            reload_legal_db()
+            _legal_db_signature = current
+
 # --- HELPER: CARGA DINÁMICA DE ESTADOS (SCALABLE ARCHITECTURE) ---
 def get_state_db(estado_nombre):
     """
-    Carga bajo demanda el archivo JSON específico del estado desde data/states_db/
-    Retorna un dict vacío si no existe, garantizando fallback.
+    Datos del estado desde el registro en memoria de data/states_db/
+    (precargado al arranque, se recarga solo si su archivo cambia).
+    Retorna un dict vacío si no existe, garantizando fallback. Solo lectura.
     """
-    try:
-        slug = slugify(estado_nombre)
-        json_path = os.path.join(BASE_DIR, "data", "states_db", f"{slug}.json")
-        
-        if os.path.exists(json_path):
-            with open(json_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-    except Exception as e:
-        print(f"Warning: Could not load state db for {estado_nombre}: {e}")
+    return get_state_registry(BASE_DIR).get(estado_nombre)
+
+def get_legal_version(estado_nombre) -> str:
+    """
+    Versión del marco legal aplicable a un estado: legal_db.json + firma de
+    data/states_db/{estado}.json y su log de municipios (cambia con cada auto-registro).
+    """
+    _check_legal_db()
+    signature = get_state_registry(BASE_DIR).signature(estado_nombre)
+    if signature is None:
+        return f"{LEGAL_DB_VERSION}:none"
+    return f"{LEGAL_DB_VERSION}:" + "-".join(str(part) for part in signature)
+
+# --- 4. ÁRBOL NORMATIVO (MEMOIZADO) ---
+TREE_CACHE_MAX_ENTRIES = int(os.getenv("LEGAL_TREE_CACHE_MAX_ENTRIES", "1024"))
+_tree_cache = OrderedDict()  # (estado, municipio, noms) -> (firma, árbol)
+_tree_cache_lock = threading.Lock()
+
+def _readonly(self, *args, **kwargs):
+    raise TypeError("El árbol normativo en caché es de solo lectura (usar copy.deepcopy para modificarlo)")
+
+class _FrozenList(list):
+    """Lista de solo lectura compartida por la caché; copy/deepcopy/pickle la devuelven mutable."""
+    append = extend = insert = pop = remove = clear = sort = reverse = _readonly
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _readonly
+
+    def __copy__(self):
+        return list(self)
+
+    def __deepcopy__(self, memo):
+        return [copy.deepcopy(v, memo) for v in self]
+
+    def __reduce__(self):
+        return (list, (list(self),))
+
+class _FrozenDict(dict):
+    """Dict de solo lectura compartido por la caché; copy/deepcopy/pickle lo devuelven mutable."""
+    update = pop = popitem = clear = setdefault = _readonly
+    __setitem__ = __delitem__ = __ior__ = _readonly
+
+    def __copy__(self):
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        return {k: copy.deepcopy(v, memo) for k, v in self.items()}
+
+    def __reduce__(self):
+        return (dict, (dict(self),))
+
+def _freeze(obj):
+    if isinstance(obj, dict):
+        return _FrozenDict((k, _freeze(v)) for k, v in obj.items())
+    if isinstance(obj, list):
+        return _FrozenList(_freeze(v) for v in obj)
+    return obj
+
+def _checkout(tree):
+    """Copy-on-write: lista y niveles nuevos (se pueden reasignar claves), contenido anidado compartido."""
+    return [dict(level) for level in tree]
+
+def _technical_noms(profile: dict) -> list:
+    """Selección de NOMs técnicas (Nivel 4) según los flags de infraestructura del perfil."""
+    # 4. NIVEL TÉCNICO (NOMs) - SELECCIÓN EXHAUSTIVA
+    universales = [
+        "NOM-001-SEDE-2012", # Diseño Eléctrico
+        "NOM-029-STPS-2011", # Mantenimiento Eléctrico [CORRECCION]
+        "NOM-001-STPS-2008", # Edificios (Escaleras/Rampas)
+        "NOM-002-STPS-2010", # Incendios
+        "NOM-003-SEGOB-2011", # Señales
+        "NOM-030-STPS-2009", # Seguridad y Salud [CORRECCION]
+        "NOM-008-SEGOB-2015",
+        "NOM-017-STPS-2008",
+        "NOM-022-STPS-2015",
+        "NOM-154-SCFI-2005"
+    ]
     
-    return {}
+    # Agregar condicionales de infraestructura
+    if profile.get("has_cocina") or profile.get("has_gas", True):
+        universales.append("NOM-004-SEDG-2004")
+    if profile.get("has_elevators") or profile.get("niveles", 1) > 2:
+        universales.append("NOM-207-SCFI-2018")
+    if profile.get("is_industrial") or profile.get("has_chemicals", False) or profile.get("has_substation", False):
+        universales.append("NOM-005-STPS-1998")
+        universales.append("NOM-018-STPS-2015")
+    if profile.get("has_pressure") or profile.get("has_machine_room", False):
+        universales.append("NOM-020-STPS-2011")
+    if profile.get("has_heights", False): # Nuevo trigger detectado en JSON
+        universales.append("NOM-009-STPS-2011")
+    if profile.get("has_pool"):
+        universales.append("NOM-245-SSA1-2010")
+    if profile.get("has_special_inst"):
+        universales.append("NOM-020-STPS-2011") # Recipientes Sujetos a Presión
 
-def get_applicable_noms(profile: dict):
+    return universales
+
+def _build_legal_tree(estado: str, municipio: str, universales: list) -> tuple:
     """
-    Construye el 'Arbol Normativo Completo' con 5 NIVELES (Científico-Legal).
-    Nivel 1: Constitución/Leyes Federales
-    Nivel 2: Leyes Estatales (Dinámico por Estado)
-    Nivel 3: Reglamento Municipal (Dinámico HI-FI o Fallback)
-    Nivel 4: Normatividad Técnica (NOMs)
-    Nivel 5: Estructura de Guía PIPC (Entregables)
+    Construye el árbol normativo (sin caché).
+    
+    Returns:
+        (final_list, cacheable)
     """
     final_list = []
-    estado = profile.get("estado", "default")
-    municipio = profile.get("municipio", "Local")
 
     # Obtener leyes específicas por estado (Base Federal + Override Estatal Dinámico)
     # 1. Cargar DB Estatal Dinámica (Nueva Arquitectura)
-    state_db_dynamic = get_state_db(estado)
+    registry = get_state_registry(BASE_DIR)
+    state_db_dynamic = registry.get(estado)
     
-    # [NUEVO] Auto-Registro Inteligente: Si el municipio no existe, lo crea automáticamente
-    # Este proceso es no bloqueante y thread-safe
+    # [NUEVO] Auto-Registro Inteligente: Si el municipio no existe, se encola su investigación
+    # (research_queue). Este request usa el fallback Nivel Plata; al terminar la IA, el
+    # municipio queda en el log del estado y el siguiente análisis obtiene Nivel Oro.
     if municipio and estado and municipio != "Local":
-        mun_exists = municipio in state_db_dynamic.get("municipios", {})
+        mun_exists = registry.has_municipality(estado, municipio)
         if not mun_exists:
-            auto_register_municipality(estado, municipio, BASE_DIR)
-            # Recargar DB después del registro
-            state_db_dynamic = get_state_db(estado)
+            research_queue.enqueue(estado, municipio, BASE_DIR)
     
     # 2. Cargar DB Legacy (Fallback)
     leyes_estatales_legacy = STATE_LAWS.get(estado, STATE_LAWS.get("default", {}))
@@ -255,36 +393,6 @@ def get_applicable_noms(profile: dict):
     })
 
     # 4. NIVEL TÉCNICO (NOMs) - SELECCIÓN EXHAUSTIVA
-    universales = [
-        "NOM-001-SEDE-2012", # Diseño Eléctrico
-        "NOM-029-STPS-2011", # Mantenimiento Eléctrico [CORRECCION]
-        "NOM-001-STPS-2008", # Edificios (Escaleras/Rampas)
-        "NOM-002-STPS-2010", # Incendios
-        "NOM-003-SEGOB-2011", # Señales
-        "NOM-030-STPS-2009", # Seguridad y Salud [CORRECCION]
-        "NOM-008-SEGOB-2015",
-        "NOM-017-STPS-2008",
-        "NOM-022-STPS-2015",
-        "NOM-154-SCFI-2005"
-    ]
-    
-    # Agregar condicionales de infraestructura
-    if profile.get("has_cocina") or profile.get("has_gas", True):
-        universales.append("NOM-004-SEDG-2004")
-    if profile.get("has_elevators") or profile.get("niveles", 1) > 2:
-        universales.append("NOM-207-SCFI-2018")
-    if profile.get("is_industrial") or profile.get("has_chemicals", False) or profile.get("has_substation", False):
-        universales.append("NOM-005-STPS-1998")
-        universales.append("NOM-018-STPS-2015")
-    if profile.get("has_pressure") or profile.get("has_machine_room", False):
-        universales.append("NOM-020-STPS-2011")
-    if profile.get("has_heights", False): # Nuevo trigger detectado en JSON
-        universales.append("NOM-009-STPS-2011")
-    if profile.get("has_pool"):
-        universales.append("NOM-245-SSA1-2010")
-    if profile.get("has_special_inst"):
-        universales.append("NOM-020-STPS-2011") # Recipientes Sujetos a Presión
-
     checks_nom = []
     
     for nom_key in universales:
@@ -309,4 +417,47 @@ def get_applicable_noms(profile: dict):
         "guide_content": guia_pipc_aplicable
     })
 
-    return final_list
+    # Solo se memoiza si el municipio ya está registrado (mientras se investiga se sirve Nivel Plata)
+    cacheable = bool(mun_data) or not (municipio and estado and municipio != "Local")
+    return final_list, cacheable
+
+def get_applicable_noms(profile: dict):
+    """
+    Construye el 'Arbol Normativo Completo' con 5 NIVELES (Científico-Legal).
+    Nivel 1: Constitución/Leyes Federales
+    Nivel 2: Leyes Estatales (Dinámico por Estado)
+    Nivel 3: Reglamento Municipal (Dinámico HI-FI o Fallback)
+    Nivel 4: Normatividad Técnica (NOMs)
+    Nivel 5: Estructura de Guía PIPC (Entregables)
+    
+    El árbol depende solo de (estado, municipio, NOMs técnicas aplicables), así que se
+    memoiza en memoria. Se invalida cuando cambia el archivo del estado o legal_db.json.
+    Cada llamada recibe una lista nueva con niveles copiados (se pueden reasignar claves
+    como 'guide_content' o 'titulo'); el contenido anidado es compartido y de solo lectura.
+    """
+    estado = profile.get("estado", "default")
+    municipio = profile.get("municipio", "Local")
+    universales = _technical_noms(profile)
+
+    _check_legal_db()
+    key = (estado, municipio, tuple(universales))
+    # Firma previa al build: si el auto-registro modifica el archivo, la siguiente llamada reconstruye
+    signature = (LEGAL_DB_VERSION, get_state_registry(BASE_DIR).signature(estado))
+
+    with _tree_cache_lock:
+        cached = _tree_cache.get(key)
+        if cached is not None and cached[0] == signature:
+            _tree_cache.move_to_end(key)
+            return _checkout(cached[1])
+
+    final_list, cacheable = _build_legal_tree(estado, municipio, universales)
+    tree = _freeze(final_list)
+
+    if cacheable:
+        with _tree_cache_lock:
+            _tree_cache[key] = (signature, tree)
+            _tree_cache.move_to_end(key)
+            while len(_tree_cache) > TREE_CACHE_MAX_ENTRIES:
+                _tree_cache.popitem(last=False)
+
+    return _checkout(tree)
@@ -0,0 +1,192 @@
+"""
+Renderizador de PDFs en Pool de Procesos
+FPDF es Python puro y CPU-bound: con gunicorn --workers 1 --threads 8, los renders
+concurrentes de /analyze y /sign-report compiten por un solo GIL. Este servicio
+envuelve generate_pdf_report en un ProcessPoolExecutor para escalar con los cores.
+
+- Workers "tibios": el initializer precarga fuentes, logo y plantillas de página
+- Payload serializado (JSON de input_data + results) -> bytes del PDF
+- Profundidad acotada (PDF_RENDER_MAX_PENDING): al saturarse, submit() lanza
+  RendererSaturated con un Retry-After estimado (los endpoints responden 503);
+  con wait > 0 (lotes) espera a que se libere un lugar antes de rechazar
+- Métricas por proceso worker (renders, errores, latencia) en stats()
+"""
+import os
+import json
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, Future
+
+PDF_RENDER_PROCESSES = int(os.getenv("PDF_RENDER_PROCESSES", "0")) or os.cpu_count() or 2
+PDF_RENDER_MAX_PENDING = int(os.getenv("PDF_RENDER_MAX_PENDING", "0")) or PDF_RENDER_PROCESSES * 4
+
+
+class RendererSaturated(Exception):
+    """Cola del renderizador llena; reintentar después de `retry_after` segundos."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Renderizador de PDFs saturado, reintentar en {retry_after}s")
+        self.retry_after = retry_after
+
+
+# --- Lado worker (proceso hijo) ---
+
+def _warm_worker():
+    """Initializer: fuentes, logo decodificado y plantillas listos antes del primer render."""
+    import warnings
+    import report_generator
+    warnings.simplefilter("ignore", DeprecationWarning)  # Aliases Arial -> Helvetica de fpdf2
+    report_generator.PDFReport()
+    report_generator.chrome_templates.warm()
+
+
+def _render_payload(payload: str) -> tuple:
+    """(pdf | None, pid, ms, error | None) para un payload JSON {"input_data", "results"}."""
+    from report_generator import generate_pdf_report
+    start = time.perf_counter()
+    try:
+        data = json.loads(payload)
+        pdf = generate_pdf_report(data["input_data"], data["results"])
+        return pdf, os.getpid(), (time.perf_counter() - start) * 1000, None
+    except Exception as e:
+        return None, os.getpid(), (time.perf_counter() - start) * 1000, f"{type(e).__name__}: {e}"
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+# --- Lado servidor ---
+
+class PDFRenderer:
+    """
+    Pool de procesos para generate_pdf_report con admisión acotada.
+
+    Métricas por worker (pid): {"renders", "errors", "avg_ms", "max_ms", "last_ms"}
+    """
+
+    def __init__(self, processes: int = PDF_RENDER_PROCESSES, max_pending: int = PDF_RENDER_MAX_PENDING):
+        self.processes = processes
+        self.max_pending = max_pending
+        self._pool = None
+        self._pending = 0
+        self._rejected = 0
+        self._workers = {}
+        self._lock = threading.Lock()
+        self._capacity = threading.Condition(self._lock)
+
+    def _ensure_pool(self) -> ProcessPoolExecutor:
+        # spawn: el proceso del servidor tiene threads (cola de render, cliente IA); fork no es seguro
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.processes,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_warm_worker
+            )
+        return self._pool
+
+    def start(self):
+        """Levanta y calienta los workers (startup de la app) sin esperar."""
+        with self._lock:
+            pool = self._ensure_pool()
+        for _ in range(self.processes):
+            pool.submit(_ping)
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=not wait)
+
+    def _retry_after(self) -> int:
+        """Segundos estimados para que se libere lugar (cola / procesos * latencia media)."""
+        renders = sum(w["renders"] for w in self._workers.values())
+        avg_s = sum(w["total_ms"] for w in self._workers.values()) / renders / 1000 if renders else 1.0
+        return max(1, round(self._pending / self.processes * avg_s))
+
+    def submit(self, input_data: dict, results: dict, wait: float = 0) -> Future:
+        """
+        Encola un render. El Future resuelve a los bytes del PDF.
+        Con wait > 0 espera hasta `wait` segundos a que haya lugar.
+        Raises:
+            RendererSaturated: Ya hay max_pending renders en curso o en espera
+        """
+        payload = json.dumps({"input_data": input_data, "results": results}, ensure_ascii=False, default=str)
+        with self._lock:
+            self._check_capacity_locked(wait)
+            self._pending += 1
+            try:
+                inner = self._ensure_pool().submit(_render_payload, payload)
+            except Exception:
+                self._pending -= 1
+                raise
+
+        outer = Future()
+        inner.add_done_callback(lambda f: self._finish(f, outer))
+        return outer
+
+    def render(self, input_data: dict, results: dict, timeout: float = None) -> bytes:
+        """Render bloqueante (misma admisión que submit)."""
+        return self.submit(input_data, results).result(timeout)
+
+    def _finish(self, inner: Future, outer: Future):
+        with self._lock:
+            self._pending -= 1
+            self._capacity.notify_all()
+        try:
+            pdf, pid, elapsed_ms, error = inner.result()
+        except Exception as e:  # Worker muerto / pool cerrado
+            outer.set_exception(RuntimeError(f"Worker de render falló: {e}"))
+            return
+        self._record(pid, elapsed_ms, ok=error is None)
+        if error is not None:
+            outer.set_exception(RuntimeError(error))
+        else:
+            outer.set_result(pdf)
+
+    def _record(self, pid: int, elapsed_ms: float, ok: bool):
+        with self._lock:
+            entry = self._workers.setdefault(
+                pid, {"renders": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0, "last_ms": 0.0}
+            )
+            entry["renders"] += 1
+            entry["errors"] += 0 if ok else 1
+            entry["total_ms"] += elapsed_ms
+            entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+            entry["last_ms"] = elapsed_ms
+
+    def _check_capacity_locked(self, wait: float = 0):
+        if wait > 0:
+            self._capacity.wait_for(lambda: self._pending < self.max_pending, timeout=wait)
+        if self._pending >= self.max_pending:
+            self._rejected += 1
+            raise RendererSaturated(self._retry_after())
+
+    def check_capacity(self, wait: float = 0):
+        """Falla rápido (antes de hacer trabajo caro) si no hay lugar para otro render tras `wait` segundos."""
+        with self._lock:
+            self._check_capacity_locked(wait)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "processes": self.processes,
+                "pending": self._pending,
+                "max_pending": self.max_pending,
+                "rejected": self._rejected,
+                "workers": {
+                    str(pid): {
+                        "renders": w["renders"],
+                        "errors": w["errors"],
+                        "avg_ms": round(w["total_ms"] / w["renders"], 1),
+                        "max_ms": round(w["max_ms"], 1),
+                        "last_ms": round(w["last_ms"], 1)
+                    }
+                    for pid, w in self._workers.items()
+                }
+            }
+
+
+# Instancia compartida por worker de gunicorn (los procesos se crean al primer uso / startup)
+pdf_renderer = PDFRenderer()
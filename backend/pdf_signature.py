@@ -0,0 +1,206 @@
+"""
+Firma Incremental de Dictámenes PDF
+/sign-report ya no re-maqueta el documento completo para agregar la firma: toma el
+PDF generado para el análisis y le agrega una revisión (actualización incremental,
+PDF 1.7 §7.5.6). Los bytes originales quedan intactos; al final se escriben solo:
+
+- La imagen de firma (XObject + SMask) en la zona de firma de la portada
+- Un rectángulo blanco sobre la línea "____" (igual que el dictamen firmado completo)
+- La página de la firma con su /Contents ampliado ([q] + original + [Q firma]) y
+  sus /Resources
+- Nueva tabla xref + trailer con /Prev apuntando a la anterior
+
+El costo es proporcional a una imagen, no al documento: solo se descomprime el
+contenido de las páginas hasta encontrar la etiqueta de firma (normalmente la 1)
+y no se re-escriben las demás. Coordenadas en report_generator.SIGNATURE_BOX.
+"""
+import io
+import re
+
+from fpdf import FPDF
+from PyPDF2 import PdfReader
+from PyPDF2.generic import ArrayObject, DictionaryObject, IndirectObject, NameObject, NumberObject, StreamObject
+
+from report_generator import SIGNATURE_BOX, SIGNATURE_LABEL, SIGNATURE_LINE_BOX, decode_signature
+
+_STARTXREF = re.compile(rb"startxref\s+(\d+)\s+%%EOF\s*$")
+_PT_PER_MM = 72 / 25.4
+# Operador de texto de la etiqueta de firma tal como lo escribe FPDF (fuente core)
+_SIGNATURE_MARKER = f"({SIGNATURE_LABEL}) Tj".encode("latin-1")
+
+
+class IncrementalUpdate:
+    """Objetos nuevos / reemplazados que se agregan al final de un PDF existente."""
+
+    def __init__(self, data: bytes, reader: PdfReader):
+        match = _STARTXREF.search(data[-1024:])
+        if match is None:
+            raise ValueError("PDF sin startxref: no se puede agregar una revisión")
+        self._data = data
+        self._reader = reader
+        self._prev_xref = int(match.group(1))
+        self._next_number = int(reader.trailer["/Size"])
+        self._objects = {}
+
+    def add(self, obj) -> IndirectObject:
+        """Registra un objeto nuevo y retorna su referencia."""
+        number = self._next_number
+        self._next_number += 1
+        self._objects[number] = obj
+        return IndirectObject(number, 0, None)
+
+    def replace(self, number: int, obj):
+        """Nueva versión de un objeto existente (misma numeración)."""
+        self._objects[number] = obj
+
+    def import_object(self, obj, mapping: dict = None):
+        """Copia un objeto de otro documento, re-numerando sus referencias indirectas."""
+        mapping = {} if mapping is None else mapping
+        if isinstance(obj, IndirectObject):
+            if obj.idnum not in mapping:
+                target = obj.get_object()
+                ref = mapping[obj.idnum] = self.add(None)
+                self._objects[ref.idnum] = self.import_object(target, mapping)
+            return mapping[obj.idnum]
+        if isinstance(obj, StreamObject):
+            copy = StreamObject()
+            copy._data = obj._data
+            copy.update({key: self.import_object(value, mapping) for key, value in obj.items()})
+            return copy
+        if isinstance(obj, DictionaryObject):
+            return DictionaryObject({key: self.import_object(value, mapping) for key, value in obj.items()})
+        if isinstance(obj, ArrayObject):
+            return ArrayObject([self.import_object(value, mapping) for value in obj])
+        return obj
+
+    def write(self) -> bytes:
+        out = io.BytesIO()
+        out.write(self._data)
+        if not self._data.endswith(b"\n"):
+            out.write(b"\n")
+
+        offsets = {}
+        for number in sorted(self._objects):
+            offsets[number] = out.tell()
+            out.write(f"{number} 0 obj\n".encode())
+            self._objects[number].write_to_stream(out, None)
+            out.write(b"\nendobj\n")
+
+        xref = out.tell()
+        out.write(b"xref\n")
+        for start, numbers in _runs(sorted(offsets)):
+            out.write(f"{start} {len(numbers)}\n".encode())
+            for number in numbers:
+                out.write(f"{offsets[number]:010d} 00000 n \n".encode())
+
+        trailer = DictionaryObject({
+            NameObject(key): value for key, value in self._reader.trailer.items()
+            if key in ("/Root", "/Info", "/ID")
+        })
+        trailer[NameObject("/Size")] = NumberObject(self._next_number)
+        trailer[NameObject("/Prev")] = NumberObject(self._prev_xref)
+        out.write(b"trailer\n")
+        trailer.write_to_stream(out, None)
+        out.write(f"\nstartxref\n{xref}\n%%EOF\n".encode())
+        return out.getvalue()
+
+
+def _runs(numbers: list):
+    """Agrupa números de objeto consecutivos en subsecciones de xref."""
+    run = []
+    for number in numbers:
+        if run and number != run[-1] + 1:
+            yield run[0], run
+            run = []
+        run.append(number)
+    if run:
+        yield run[0], run
+
+
+def _raw_copy(dictionary: DictionaryObject) -> DictionaryObject:
+    """Copia superficial que conserva las referencias indirectas (sin resolverlas)."""
+    return DictionaryObject({key: dictionary.raw_get(key) for key in dictionary})
+
+
+def _content_stream(data: bytes) -> StreamObject:
+    stream = StreamObject()
+    stream._data = data
+    return stream
+
+
+def _pages(node: IndirectObject, media_box=None):
+    """Páginas en orden como (referencia, /MediaBox heredado del nodo /Pages)."""
+    obj = node.get_object()
+    media_box = obj.get("/MediaBox", media_box)
+    if obj.get("/Type") != "/Pages":
+        yield node, media_box
+        return
+    for kid in obj["/Kids"]:
+        yield from _pages(kid, media_box)
+
+
+def _signature_page(reader: PdfReader) -> tuple:
+    """Primera página que lleva la etiqueta de firma de la portada."""
+    for ref, media_box in _pages(reader.trailer["/Root"].raw_get("/Pages")):
+        contents = ref.get_object()["/Contents"]
+        streams = contents if isinstance(contents, ArrayObject) else [contents]
+        if any(_SIGNATURE_MARKER in stream.get_object().get_data() for stream in streams):
+            return ref, media_box
+    raise ValueError("El PDF no tiene zona de firma de portada")
+
+
+def _signature_overlay(signature: bytes, page_size_mm: tuple) -> PdfReader:
+    """Página suelta del mismo tamaño con solo la firma (FPDF codifica la imagen y su SMask)."""
+    overlay = FPDF(unit="mm", format=page_size_mm)
+    overlay.set_auto_page_break(False)
+    overlay.add_page()
+    line_x, line_y, line_w, line_h = SIGNATURE_LINE_BOX
+    overlay.set_fill_color(255, 255, 255)
+    overlay.rect(line_x, line_y, line_w, line_h, "F")
+    sig_x, sig_y, sig_w = SIGNATURE_BOX
+    overlay.image(io.BytesIO(signature), x=sig_x, y=sig_y, w=sig_w)
+    return PdfReader(io.BytesIO(bytes(overlay.output())))
+
+
+def stamp_signature(pdf: bytes, signature_b64: str) -> bytes:
+    """
+    Agrega la firma a la portada de un dictamen ya generado como nueva revisión.
+
+    Raises:
+        ValueError: No hay imagen de firma, el PDF no tiene zona de firma o no admite
+            actualización incremental
+    """
+    signature = decode_signature(signature_b64)
+    if not signature:
+        raise ValueError("Firma vacía o sin formato data URL base64")
+
+    reader = PdfReader(io.BytesIO(pdf))
+    update = IncrementalUpdate(pdf, reader)
+    page_ref, media_box = _signature_page(reader)
+    page = page_ref.get_object()
+
+    _, _, width, height = [float(v) for v in media_box]
+    overlay = _signature_overlay(signature, (width / _PT_PER_MM, height / _PT_PER_MM))
+    overlay_page = overlay.pages[0]
+
+    # XObjects de la firma con nombres propios (no chocan con /I1.. del documento)
+    resources = _raw_copy(page["/Resources"])
+    xobjects = _raw_copy(resources.get("/XObject", DictionaryObject()))
+    overlay_xobjects = overlay_page["/Resources"]["/XObject"]
+    overlay_content = overlay_page.get_contents().get_data()
+    for name in overlay_xobjects:
+        sig_name = f"/Sig{name[1:]}"
+        xobjects[NameObject(sig_name)] = update.import_object(overlay_xobjects.raw_get(name))
+        overlay_content = overlay_content.replace(f"{name} Do".encode(), f"{sig_name} Do".encode())
+    resources[NameObject("/XObject")] = xobjects
+
+    # El contenido original queda aislado entre q ... Q: la firma se dibuja con el estado gráfico inicial
+    contents = page.raw_get("/Contents")
+    original = list(contents) if isinstance(contents, ArrayObject) else [contents]
+    new_page = _raw_copy(page)
+    new_page[NameObject("/Contents")] = ArrayObject(
+        [update.add(_content_stream(b"q\n"))] + original + [update.add(_content_stream(b"\nQ\n" + overlay_content))]
+    )
+    new_page[NameObject("/Resources")] = resources
+    update.replace(page_ref.idnum, new_page)
+    return update.write()
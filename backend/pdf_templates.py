@@ -0,0 +1,206 @@
+"""
+Plantillas de Página Pre-renderizadas para FPDF
+Los elementos fijos del dictamen (banda azul del encabezado, "LY" en dos colores,
+bloque de título, barras separadoras, leyenda del pie) se dibujan UNA vez por
+worker en un documento borrador; se guardan los operadores PDF resultantes y en
+cada documento nuevo solo se estampan (sin medir textos, partir líneas ni
+convertir colores). Solo los campos variables se dibujan por reporte.
+
+- El bloque estampado va entre q ... Q: el estado gráfico del PDF vuelve a lo que
+  FPDF cree tener, y después se aplica el estado final del borrador con los
+  setters públicos (mismo resultado que dibujar en vivo).
+- Los índices de fuente (/F1, /F2...) dependen del orden de registro: todos los
+  documentos registran primero TEMPLATE_FONTS (register_template_fonts).
+- El logo se decodifica una sola vez: cada documento arranca con una copia de la
+  caché de imágenes prototipo (new_image_cache).
+- Depende de internos de fpdf2 (_out, _resource_catalog, ImageCache, preload_image),
+  probados con la versión fijada en requirements.txt. Si faltan o cambian, las
+  plantillas se desactivan solas y los elementos fijos se dibujan en vivo.
+
+Ver tests/bench_pdf_templates.py
+"""
+import re
+import threading
+
+from fpdf import FPDF, FPDF_VERSION
+
+try:
+    from fpdf.enums import PDFResourceType
+    from fpdf.image_datastructures import ImageCache
+    from fpdf.image_parsing import preload_image
+    TEMPLATES_SUPPORTED = True
+except ImportError as e:
+    print(f"⚠️ fpdf2 {FPDF_VERSION} sin los internos de las plantillas de página, se dibuja en vivo: {e}")
+    TEMPLATES_SUPPORTED = False
+
+# Fuentes core usadas por las plantillas, en orden fijo de registro
+TEMPLATE_FONTS = (("helvetica", "B"), ("helvetica", ""), ("helvetica", "I"))
+
+_FONT_REF = re.compile(rb"/F(\d+) ")
+# Valores centinela del borrador: lo que la plantilla no toca no se re-aplica al estampar
+_SENTINEL_RGB = (1, 2, 3)
+_SENTINEL_LINE_WIDTH = 0.0123
+
+
+def register_template_fonts(pdf: FPDF):
+    """Registra las fuentes de las plantillas (antes que cualquier otra) para fijar sus índices."""
+    for family, style in TEMPLATE_FONTS:
+        pdf.set_font(family, style)
+
+
+class PageTemplate:
+    """
+    Bloque estático ya convertido a operadores PDF.
+
+    draw(pdf) dibuja el bloque con la API normal de FPDF; document_factory() crea el
+    documento borrador (misma clase y márgenes que los reportes reales).
+    """
+
+    def __init__(self, draw, document_factory):
+        scratch = document_factory()
+        scratch.set_auto_page_break(False)
+        scratch.add_page()
+        # Estado desconocido: obliga al borrador a emitir todos los operadores que usa
+        scratch.set_draw_color(*_SENTINEL_RGB)
+        scratch.set_fill_color(*_SENTINEL_RGB)
+        scratch.set_text_color(*_SENTINEL_RGB)
+        scratch.set_line_width(_SENTINEL_LINE_WIDTH)
+        sentinel = {
+            "draw_color": scratch.draw_color,
+            "fill_color": scratch.fill_color,
+            "text_color": scratch.text_color,
+            "line_width": scratch.line_width
+        }
+        scratch.font_family = ""
+        scratch.current_font_is_set_on_page = False
+
+        contents = scratch.pages[scratch.page].contents
+        start = len(contents)
+        draw(scratch)
+        self.stream = b"q\n" + bytes(contents[start:]) + b"Q"
+        self.fonts = sorted({int(i) for i in _FONT_REF.findall(self.stream)})
+
+        # Estado final: solo lo que la plantilla cambió
+        self.font = (scratch.font_family, scratch.font_style, scratch.font_size_pt) if scratch.font_family else None
+        self.end_state = {
+            attr: getattr(scratch, attr) for attr, value in sentinel.items()
+            if getattr(scratch, attr) != value
+        }
+        self.xy = (scratch.x, scratch.y)
+
+        # Estampado de prueba: si los internos de fpdf2 cambiaron, falla aquí y no a
+        # mitad de un reporte real
+        check = document_factory()
+        check.set_auto_page_break(False)
+        check.add_page()
+        self.stamp(check)
+
+    def stamp(self, pdf: FPDF):
+        """Estampa el bloque en la página actual y deja a FPDF en el estado final del borrador."""
+        pdf._out(self.stream)
+        for font_index in self.fonts:
+            pdf._resource_catalog.add(PDFResourceType.FONT, font_index, pdf.page)
+        if self.font:
+            pdf.set_font(*self.font)
+        for attr, value in self.end_state.items():
+            getattr(pdf, f"set_{attr}")(value)
+        pdf.set_xy(*self.xy)
+
+
+class TemplateRegistry:
+    """
+    Plantillas por nombre, construidas la primera vez que se estampan (una vez por worker).
+    Si una plantilla no se puede construir con esta versión de fpdf2, `enabled` pasa a
+    False y stamp() dibuja en vivo.
+    """
+
+    def __init__(self, document_factory):
+        self._document_factory = document_factory
+        self._draws = {}
+        self._templates = {}
+        self._lock = threading.Lock()
+        self.enabled = TEMPLATES_SUPPORTED
+
+    def register(self, name: str, draw):
+        self._draws[name] = draw
+
+    def get(self, name: str) -> PageTemplate:
+        template = self._templates.get(name)
+        if template is None:
+            with self._lock:
+                template = self._templates.get(name)
+                if template is None:
+                    template = self._templates[name] = PageTemplate(self._draws[name], self._document_factory)
+        return template
+
+    def _template(self, name: str):
+        """Plantilla construida o None si las plantillas están desactivadas."""
+        if not self.enabled:
+            return None
+        try:
+            return self.get(name)
+        except Exception as e:
+            self.enabled = False
+            print(f"⚠️ fpdf2 {FPDF_VERSION}: plantilla '{name}' no disponible, se dibuja en vivo: "
+                  f"{type(e).__name__}: {e}")
+            return None
+
+    def warm(self):
+        """Construye todas las plantillas registradas (initializer de workers de render)."""
+        for name in self._draws:
+            if self._template(name) is None:
+                return
+
+    def stamp(self, pdf: FPDF, name: str):
+        template = self._template(name)
+        if template is None:
+            self.draw(pdf, name)
+        else:
+            template.stamp(pdf)
+
+    def draw(self, pdf: FPDF, name: str):
+        """Dibujo en vivo (sin plantilla), para comparar / depurar."""
+        self._draws[name](pdf)
+
+
+_prototype = None
+_prototype_lock = threading.Lock()
+_image_cache_supported = TEMPLATES_SUPPORTED
+
+
+def new_image_cache(images: tuple = ()):
+    """
+    Caché de imágenes para un documento nuevo con las imágenes fijas ya decodificadas.
+    Las copias sin usar (usages == 0) no se escriben en el PDF.
+    Retorna None si esta versión de fpdf2 no lo soporta (el documento usa su caché normal).
+    """
+    global _image_cache_supported
+    if not _image_cache_supported:
+        return None
+    try:
+        return _copy_prototype(images)
+    except Exception as e:
+        _image_cache_supported = False
+        print(f"⚠️ fpdf2 {FPDF_VERSION}: sin caché de imágenes prototipo: {type(e).__name__}: {e}")
+        return None
+
+
+def _copy_prototype(images: tuple):
+    global _prototype
+    if _prototype is None:
+        with _prototype_lock:
+            if _prototype is None:
+                prototype = ImageCache()
+                for name in images:
+                    preload_image(prototype, name)
+                if any("usages" not in info for info in prototype.images.values()):
+                    raise TypeError("ImageCache sin contador 'usages'")
+                _prototype = prototype
+    cache = ImageCache(image_filter=_prototype.image_filter)
+    for name, info in _prototype.images.items():
+        info = type(info)(info)
+        info["usages"] = 0
+        info.pop("obj_id", None)
+        cache.images[name] = info
+    cache.icc_profiles.update(_prototype.icc_profiles)
+    return cache
@@ -10,6 +10,8 @@ import logging
 from datetime import datetime
 import os
 
+from auth.token_context import request_claims
+
 # Configurar logging de intentos de abuso
 logging.basicConfig(
     level=logging.INFO,
@@ -28,18 +30,10 @@ def get_user_identifier(request: Request) -> str:
     Obtener identificador único para rate limiting.
     Prioriza user_id si está autenticado, sino usa IP.
     """
-    # Intentar obtener user_id del token JWT
-    auth_header = request.headers.get("Authorization")
-    if auth_header and auth_header.startswith("Bearer "):
-        token = auth_header.replace("Bearer ", "")
-        try:
-            from auth import verify_token
-            payload = verify_token(token)
-            user_id = payload.get("sub")
-            if user_id:
-                return f"user:{user_id}"
-        except:
-            pass  # Si el token es inválido, usar IP
+    # Intentar obtener user_id del token JWT (claims ya verificados en request.state)
+    payload = request_claims(request)
+    if payload and payload.get("sub"):
+        return f"user:{payload['sub']}"
     
     # Fallback a IP
     return f"ip:{get_remote_address(request)}"
@@ -78,6 +72,7 @@ def custom_rate_limit_handler(request: Request, exc: RateLimitExceeded):
 # Límites específicos por endpoint (constantes)
 RATE_LIMITS = {
     "analyze": "10/hour",           # Generar análisis
+    "analyze_batch": "5/hour",      # Análisis en lote (multi-sitio)
     "login": "5/15minute",          # Login
     "register": "3/hour",           # Registro
     "global_auth": "100/hour",      # Global para usuarios autenticados
@@ -0,0 +1,151 @@
+"""
+Cola de Renderizado de PDFs en Background
+Saca la generación de PDFs (FPDF + QR + firma) del request path.
+
+/analyze encola el render y responde de inmediato con un job id;
+un pool de workers produce el PDF y el estado se consulta por polling
+(GET /render-jobs/{job_id}). /download/{filename} sirve el PDF al terminar.
+
+Si render_fn retorna bytes, el job los conserva (job["pdf"]) hasta que expira:
+así el PDF se puede servir desde memoria sin pasar por el filesystem.
+"""
+import os
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+RENDER_WORKERS = int(os.getenv("PDF_RENDER_WORKERS", "2"))
+RENDER_JOB_TTL_SECONDS = int(os.getenv("PDF_RENDER_JOB_TTL", "3600"))
+
+# Estados de un job
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+ERROR = "error"
+
+
+class RenderQueue:
+    """
+    Cola local de renders con pool de workers.
+
+    Los jobs terminados se conservan RENDER_JOB_TTL_SECONDS para que el cliente
+    pueda consultar su estado; después se purgan (junto con los bytes del PDF, si
+    los hay; la copia persistente vive en el blob store).
+    """
+
+    def __init__(self, max_workers: int = RENDER_WORKERS, job_ttl: int = RENDER_JOB_TTL_SECONDS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pdf-render")
+        self._job_ttl = job_ttl
+        self._jobs = {}
+        self._by_filename = {}
+        self._lock = threading.Lock()
+
+    def submit(self, render_fn, filename: str, *args, owner_id: int = None) -> dict:
+        """
+        Encola un render. render_fn(*args) escribe el PDF en `filename` o retorna sus bytes.
+
+        Returns:
+            dict: Snapshot del job recién creado
+        """
+        snapshot = self._create_job(filename, owner_id)
+        self._executor.submit(self._run, snapshot["job_id"], render_fn, args)
+        return snapshot
+
+    def track(self, filename: str, future, finish_fn, *args, owner_id: int = None) -> dict:
+        """
+        Registra como job un render que corre en otro ejecutor (pool de procesos).
+        Al resolver `future`, un worker de la cola ejecuta finish_fn(pdf, *args)
+        (persistencia / caché); si el future falla, el job queda en ERROR.
+
+        Returns:
+            dict: Snapshot del job recién creado
+        """
+        snapshot = self._create_job(filename, owner_id)
+        job_id = snapshot["job_id"]
+
+        def on_done(f):
+            try:
+                self._executor.submit(self._run, job_id, lambda: finish_fn(f.result(), *args), ())
+            except RuntimeError as e:  # Cola cerrada (shutdown)
+                self._update(job_id, status=ERROR, error=str(e), finished_at=time.time())
+        future.add_done_callback(on_done)
+        return snapshot
+
+    def _create_job(self, filename: str, owner_id: int) -> dict:
+        job_id = uuid.uuid4().hex
+        job = {
+            "job_id": job_id,
+            "filename": filename,
+            "owner_id": owner_id,
+            "status": PENDING,
+            "error": None,
+            "pdf": None,
+            "created_at": time.time(),
+            "finished_at": None
+        }
+        with self._lock:
+            self._prune()
+            self._jobs[job_id] = job
+            self._by_filename[filename] = job_id
+            return dict(job)
+
+    def _run(self, job_id: str, render_fn, args: tuple):
+        self._update(job_id, status=RUNNING)
+        try:
+            result = render_fn(*args)
+        except Exception as e:
+            print(f"⚠️ Error renderizando PDF (job {job_id}): {e}")
+            self._update(job_id, status=ERROR, error=str(e), finished_at=time.time())
+        else:
+            pdf = bytes(result) if isinstance(result, (bytes, bytearray)) else None
+            self._update(job_id, status=DONE, pdf=pdf, finished_at=time.time())
+
+    def _update(self, job_id: str, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(fields)
+
+    def _prune(self):
+        """Purga jobs terminados más viejos que el TTL (llamar con el lock tomado)."""
+        cutoff = time.time() - self._job_ttl
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job["finished_at"] is not None and job["finished_at"] < cutoff
+        ]
+        for job_id in expired:
+            job = self._jobs.pop(job_id)
+            if self._by_filename.get(job["filename"]) == job_id:
+                del self._by_filename[job["filename"]]
+
+    def get(self, job_id: str):
+        """Snapshot del job o None si no existe / ya expiró."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def get_by_filename(self, filename: str):
+        """Snapshot del último job que produce `filename` (o None)."""
+        with self._lock:
+            job_id = self._by_filename.get(filename)
+            job = self._jobs.get(job_id) if job_id else None
+            return dict(job) if job else None
+
+    def wait(self, job_id: str, timeout: float = None) -> dict:
+        """Bloquea hasta que el job termine (uso en tests / scripts)."""
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            job = self.get(job_id)
+            if job is None or job["status"] in (DONE, ERROR):
+                return job
+            if deadline is not None and time.time() >= deadline:
+                return job
+            time.sleep(0.05)
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+
+# Instancia compartida por worker de gunicorn
+render_queue = RenderQueue()
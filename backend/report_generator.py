@@ -1,37 +1,139 @@
 from fpdf import FPDF
+import io
 import os
+import base64
 from datetime import datetime
+from functools import lru_cache
+
+import qrcode
+
+from pdf_templates import TemplateRegistry, new_image_cache, register_template_fonts
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+LOGO_PATH = os.path.join(BASE_DIR, 'logo_lunaya.png')
+HAS_LOGO = os.path.exists(LOGO_PATH)
+QR_CACHE_SIZE = int(os.getenv("PDF_QR_CACHE_SIZE", "256"))
+# Elementos fijos (encabezado, pie, portada) estampados desde plantillas pre-renderizadas
+USE_PAGE_TEMPLATES = os.getenv("PDF_PAGE_TEMPLATES", "true").lower() == "true"
+
+# Zona de firma de la portada (mm). pdf_signature.py firma sobre estas coordenadas, en
+# la página que lleva SIGNATURE_LABEL (la 1, o la 2 si la justificación legal es larga)
+COVER_QR_Y = 230
+SIGNATURE_LABEL = "Firma del Perito Responsable:"
+SIGNATURE_BOX = (135, COVER_QR_Y + 10, 30)                 # x, y, ancho de la imagen de firma
+SIGNATURE_LINE_BOX = (120, COVER_QR_Y + 30, 60, 4)         # x, y, ancho, alto de la línea "____"
+
+
+def decode_signature(signature_b64: str):
+    """Bytes de la imagen de firma (data URL base64) o None si no viene firma."""
+    if signature_b64 and 'base64,' in signature_b64:
+        return base64.b64decode(signature_b64.split('base64,')[1])
+    return None
+
+
+@lru_cache(maxsize=QR_CACHE_SIZE)
+def render_qr_png(payload: str) -> bytes:
+    """PNG del código QR de la portada (LRU por contenido: solo se repite con el mismo payload, p. ej. al re-maquetar)."""
+    qr = qrcode.QRCode(box_size=4, border=1)
+    qr.add_data(payload)
+    qr.make(fit=True)
+    buffer = io.BytesIO()
+    qr.make_image(fill_color="black", back_color="white").save(buffer)
+    return buffer.getvalue()
+
+
+# --- ELEMENTOS FIJOS (se dibujan una vez por worker, ver pdf_templates.py) ---
+
+def _draw_header_chrome(pdf):
+    # Fondo de encabezado
+    pdf.set_fill_color(30, 60, 100) # Azul Institucional
+    pdf.rect(0, 0, 210, 25, 'F')
+    
+    pdf.set_font('Arial', 'B', 14)
+    pdf.set_text_color(255)
+    pdf.set_y(8)
+    pdf.cell(0, 10, 'ANALISIS TÉCNICO DE OBLIGATORIEDAD EN MATERIA DE P.C.', 0, 1, 'C')
+    
+    pdf.set_font('Arial', '', 9)
+    pdf.cell(0, 5, 'Sistema Experto de Análisis Normativo (LY GIRRD PC AI V3.0)', 0, 1, 'C')
+    
+    pdf.ln(10)
+    pdf.set_text_color(0)
+
+def _draw_footer_chrome(pdf):
+    # Línea y leyenda; el número de página y la fecha van en footer() (variables)
+    pdf.set_y(-20)
+    pdf.set_draw_color(200, 200, 200)
+    pdf.line(10, pdf.get_y(), 200, pdf.get_y())
+    
+    pdf.set_font('Arial', 'I', 8)
+    pdf.set_text_color(100)
+    pdf.set_y(-14)
+    pdf.cell(0, 5, 'Este documento es una guía técnica pre-aprobatoria. No sustituye la revisión final de la autoridad. DR. JMND', 0, 0, 'C')
+
+def _draw_cover_chrome(pdf):
+    # Texto "LY" Aumentado 20% (Tamaño 55)
+    # Posición X = 12 + 20 + 2 = 34
+    pdf.set_xy(34, 15) # Subimos Y porque la letra es más grande
+    pdf.set_font('Helvetica', 'B', 55) 
+    
+    # Letra L en GRIS
+    pdf.set_text_color(100, 100, 100) 
+    pdf.cell(11, 20, "L", 0, 0, 'L') 
+    
+    # Letra Y en NARANJA
+    pdf.set_text_color(255, 140, 0) 
+    pdf.cell(15, 20, "Y", 0, 0, 'L')
+    
+    # 1. ENCABEZADO "PREMIUM"
+    # Bloque de Título Alineado a la Derecha - Ajustado al nuevo espacio
+    pdf.set_y(15) 
+    pdf.set_x(80) # Más a la izquierda para balancear
+    
+    pdf.set_font('Arial', 'B', 14) 
+    pdf.set_text_color(20, 40, 80) 
+    pdf.multi_cell(0, 7, 'ANALISIS TÉCNICO DE OBLIGATORIEDAD\nEN MATERIA DE P.C.', 0, 'R')
+    
+    pdf.set_y(pdf.get_y() + 2)
+    pdf.set_x(80)
+    pdf.set_font('Arial', '', 10)
+    pdf.set_text_color(100, 100, 100) # Gris elegante
+    pdf.cell(0, 6, 'Sistema Experto en análisis normativo para PIPC en GIRRD PC', 0, 1, 'R')
+    
+    # Barra separadora sutil
+    pdf.ln(8)
+    pdf.set_draw_color(20, 40, 80)
+    pdf.set_line_width(0.5)
+    pdf.line(12, pdf.get_y(), 198, pdf.get_y())
+    pdf.ln(10)
+
 
 class PDFReport(FPDF):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        register_template_fonts(self)
+        if USE_PAGE_TEMPLATES:
+            # Logo ya decodificado (una vez por worker); None si fpdf2 no lo soporta
+            image_cache = new_image_cache((LOGO_PATH,) if HAS_LOGO else ())
+            if image_cache is not None:
+                self.image_cache = image_cache
+
+    def _chrome(self, name):
+        if USE_PAGE_TEMPLATES:
+            chrome_templates.stamp(self, name)
+        else:
+            chrome_templates.draw(self, name)
+
     def header(self):
         # Skip header on first page (Cover Page handles its own header)
         if self.page_no() == 1:
             return
-
-        # Fondo de encabezado
-        self.set_fill_color(30, 60, 100) # Azul Institucional
-        self.rect(0, 0, 210, 25, 'F')
-        
-        self.set_font('Arial', 'B', 14)
-        self.set_text_color(255)
-        self.set_y(8)
-        self.cell(0, 10, 'ANALISIS TÉCNICO DE OBLIGATORIEDAD EN MATERIA DE P.C.', 0, 1, 'C')
-        
-        self.set_font('Arial', '', 9)
-        self.cell(0, 5, 'Sistema Experto de Análisis Normativo (LY GIRRD PC AI V3.0)', 0, 1, 'C')
-        
-        self.ln(10)
-        self.set_text_color(0)
+        self._chrome("header")
 
     def footer(self):
+        self._chrome("footer")
         self.set_y(-20)
-        self.set_draw_color(200, 200, 200)
-        self.line(10, self.get_y(), 200, self.get_y())
-        
-        self.set_font('Arial', 'I', 8)
-        self.set_text_color(100)
         self.cell(0, 6, f'Página {self.page_no()} | Generado el {datetime.now().strftime("%d/%m/%Y %H:%M:%S")}', 0, 1, 'C')
-        self.cell(0, 5, 'Este documento es una guía técnica pre-aprobatoria. No sustituye la revisión final de la autoridad. DR. JMND', 0, 0, 'C')
 
     def chapter_title(self, label, level='h1'):
         if level == 'h1':
@@ -190,7 +292,19 @@ class PDFReport(FPDF):
         self.set_fill_color(255, 255, 150)
         self.cell(35, 8, f"${total_general:,.2f}", 1, 1, 'C', 1)
 
-def generate_pdf_report(input_data: dict, results: dict, filename: str):
+
+chrome_templates = TemplateRegistry(PDFReport)
+chrome_templates.register("header", _draw_header_chrome)
+chrome_templates.register("footer", _draw_footer_chrome)
+chrome_templates.register("cover", _draw_cover_chrome)
+
+def generate_pdf_report(input_data: dict, results: dict, filename: str = None):
+    """
+    Genera el dictamen PDF.
+    Sin filename el documento se produce en memoria y se retornan sus bytes
+    (para StreamingResponse / blob store); con filename se escribe en disco y se
+    retorna la ruta.
+    """
     pdf = PDFReport()
     pdf.set_auto_page_break(auto=True, margin=15)
     
@@ -198,43 +312,10 @@ def generate_pdf_report(input_data: dict, results: dict, filename: str):
     pdf.add_page()
     # 0. LOGOTIPO + BRANDING "LY" (Ajuste Radical de Proporciones)
     # Logo Reducido al 50% (aprox 20mm)
-    if os.path.exists('logo_lunaya.png'):
-        pdf.image('logo_lunaya.png', x=12, y=12, w=20, link='https://lunaya.com.mx/')
+    if HAS_LOGO:
+        pdf.image(LOGO_PATH, x=12, y=12, w=20, link='https://lunaya.com.mx/')
     
-    # Texto "LY" Aumentado 20% (Tamaño 55)
-    # Posición X = 12 + 20 + 2 = 34
-    pdf.set_xy(34, 15) # Subimos Y porque la letra es más grande
-    pdf.set_font('Helvetica', 'B', 55) 
-    
-    # Letra L en GRIS
-    pdf.set_text_color(100, 100, 100) 
-    pdf.cell(11, 20, "L", 0, 0, 'L') 
-    
-    # Letra Y en NARANJA
-    pdf.set_text_color(255, 140, 0) 
-    pdf.cell(15, 20, "Y", 0, 0, 'L')
-    
-    # 1. ENCABEZADO "PREMIUM"
-    # Bloque de Título Alineado a la Derecha - Ajustado al nuevo espacio
-    pdf.set_y(15) 
-    pdf.set_x(80) # Más a la izquierda para balancear
-    
-    pdf.set_font('Arial', 'B', 14) 
-    pdf.set_text_color(20, 40, 80) 
-    pdf.multi_cell(0, 7, 'ANALISIS TÉCNICO DE OBLIGATORIEDAD\nEN MATERIA DE P.C.', 0, 'R')
-    
-    pdf.set_y(pdf.get_y() + 2)
-    pdf.set_x(80)
-    pdf.set_font('Arial', '', 10)
-    pdf.set_text_color(100, 100, 100) # Gris elegante
-    pdf.cell(0, 6, 'Sistema Experto en análisis normativo para PIPC en GIRRD PC', 0, 1, 'R')
-    
-    # Barra separadora sutil
-    pdf.ln(8)
-    pdf.set_draw_color(20, 40, 80)
-    pdf.set_line_width(0.5)
-    pdf.line(12, pdf.get_y(), 198, pdf.get_y())
-    pdf.ln(10)
+    pdf._chrome("cover")
 
     # 2. SECCIÓN: DATOS DEL INMUEBLE (Estilo Ficha Técnica Limpia)
     pdf.set_font('Arial', 'B', 11)
@@ -354,62 +435,37 @@ def generate_pdf_report(input_data: dict, results: dict, filename: str):
     
     # 5. CODIGO QR Y FIRMA (Footer de Portada)
     # Posicionamos al fondo
-    y_pos = 230 
+    y_pos = COVER_QR_Y
     pdf.set_y(y_pos)
     
-    import qrcode
-    import uuid
-    from datetime import datetime
-    # import os REMOVED to fix UnboundLocalError (already global)
-
-    unique_id = uuid.uuid4().hex[:8]
-    qr_filename = f"temp_qr_{unique_id}.png"
+    # QR e imagen de firma se pasan a FPDF como buffers en memoria (sin PNGs temporales)
+    qr_payload = f"ANALISIS TÉCNICO DE OBLIGATORIEDAD - {input_data.get('municipio')} - {datetime.now().isoformat()}"
     
-    qr = qrcode.QRCode(box_size=4, border=1)
-    qr.add_data(f"ANALISIS TÉCNICO DE OBLIGATORIEDAD - {input_data.get('municipio')} - {datetime.now().isoformat()}")
-    qr.make(fit=True)
-    qr_img = qr.make_image(fill_color="black", back_color="white")
+    # Posicionar QR a la izquierda
+    y_qr = pdf.get_y()
+    pdf.image(io.BytesIO(render_qr_png(qr_payload)), x=10, y=y_qr, w=35)
     
-    try:
-        qr_img.save(qr_filename)
-        # Posicionar QR a la izquierda
-        y_qr = pdf.get_y()
-        pdf.image(qr_filename, x=10, y=y_qr, w=35)
-        
-        # Firma alineada derecha - Harmonizada con QR (35mm alto)
-        # Etiqueta Arriba
-        pdf.set_y(y_qr + 5)
-        pdf.set_x(120)
-        pdf.set_font('Arial', 'B', 8)
-        pdf.cell(60, 4, "Firma del Perito Responsable:", 0, 1, 'C')
-
-        # [CRITICAL] FIRMA DIGITAL O LINEA
-        signature_b64 = input_data.get('signature_image')
-        
-        if signature_b64 and 'base64,' in signature_b64:
-            import base64
-            # Decodificar Base64
-            sig_data = signature_b64.split('base64,')[1]
-            sig_filename = f"temp_sig_{unique_id}.png"
-            with open(sig_filename, "wb") as fh:
-                fh.write(base64.b64decode(sig_data))
-            
-            # Dibujar imagen (ajustada para que parezca firma real)
-            # Posición: X=130 (centro de la zona de firma), Y=y_qr+10
-            pdf.image(sig_filename, x=135, y=y_qr + 10, w=30)
-            
-            # Limpiar archivo temp
-            if os.path.exists(sig_filename):
-                os.remove(sig_filename)
-        else:
-            # Línea de Firma Abajo (Solo si no hay firma digital)
-            pdf.set_y(y_qr + 30) # 25mm de separación visual
-            pdf.set_x(120)
-            pdf.cell(60, 4, "_______________________________________", 0, 1, 'C')
-
-    finally:
-            try: os.remove(qr_filename) 
-            except: pass
+    # Firma alineada derecha - Harmonizada con QR (35mm alto)
+    # Etiqueta Arriba
+    pdf.set_y(y_qr + 5)
+    pdf.set_x(120)
+    pdf.set_font('Arial', 'B', 8)
+    pdf.cell(60, 4, SIGNATURE_LABEL, 0, 1, 'C')
+
+    # [CRITICAL] FIRMA DIGITAL O LINEA
+    signature = decode_signature(input_data.get('signature_image'))
+    
+    if signature:
+        # Dibujar imagen (ajustada para que parezca firma real)
+        # Posición: X=135 (centro de la zona de firma), Y=y_qr+10
+        sig_x, sig_y, sig_w = SIGNATURE_BOX
+        pdf.image(io.BytesIO(signature), x=sig_x, y=sig_y, w=sig_w)
+    else:
+        # Línea de Firma Abajo (Solo si no hay firma digital)
+        line_x, line_y, line_w, line_h = SIGNATURE_LINE_BOX
+        pdf.set_y(line_y) # 25mm de separación visual
+        pdf.set_x(line_x)
+        pdf.cell(line_w, line_h, "_______________________________________", 0, 1, 'C')
             
     # --- SECCIONES ADICIONALES (Páginas 2...) ---
     
@@ -431,10 +487,15 @@ def generate_pdf_report(input_data: dict, results: dict, filename: str):
         total = sum([x['cantidad'] * x['precio_unitario'] for x in items])
         pdf.add_budget_section(items, total)
  
+    # Modo en memoria: fpdf2 retorna el documento como bytearray
+    if filename is None:
+        return bytes(pdf.output())
+
     # Directorio de salida
     if not os.path.exists("reports"):
         try: os.makedirs("reports")
         except: pass
             
     pdf.output(filename)
+    return filename
 
@@ -0,0 +1,251 @@
+"""
+Cola de Investigación Municipal (Asíncrona, Deduplicada, Persistente)
+El primer /analyze de un municipio desconocido ya no espera a la IA: recibe el
+fallback "Nivel Plata" y se encola un trabajo de investigación. Al terminar, el
+worker agrega el municipio al log del estado ("Nivel Oro") y state_registry /
+get_applicable_noms lo toman en el siguiente análisis.
+
+La cola vive en SQLite (RESEARCH_QUEUE_DB): sobrevive reinicios y se comparte
+entre workers de gunicorn. La llave primaria (estado, municipio) deduplica; la
+toma de trabajos es atómica (BEGIN IMMEDIATE) y el límite de llamadas por minuto
+a la API se cuenta sobre la misma tabla, así que es global entre procesos.
+"""
+import os
+import time
+import sqlite3
+import threading
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+QUEUE_DB_PATH = os.getenv("RESEARCH_QUEUE_DB") or os.path.join(BASE_DIR, "data", "research_queue.sqlite")
+RESEARCH_MAX_PER_MINUTE = int(os.getenv("RESEARCH_MAX_PER_MINUTE", "10"))
+RESEARCH_MAX_ATTEMPTS = int(os.getenv("RESEARCH_MAX_ATTEMPTS", "3"))
+RESEARCH_RETRY_AFTER = 600      # Segundos antes de re-encolar un municipio ya investigado / fallido
+STALE_RUNNING_SECONDS = 300     # Trabajo "running" de un worker que murió: se devuelve a la cola
+POLL_SECONDS = 5.0
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+ERROR = "error"
+
+
+def _default_research(estado_nombre, municipio_nombre):
+    from municipality_auto_registry import research_municipality
+    return research_municipality(estado_nombre, municipio_nombre)
+
+
+def _default_register(estado_nombre, municipio_nombre, data, base_dir):
+    from municipality_auto_registry import register_municipality
+    return register_municipality(estado_nombre, municipio_nombre, data, base_dir)
+
+
+class ResearchQueue:
+    """
+    Cola persistente de investigaciones municipales con un worker (thread) por proceso.
+
+    Filas: (estado, municipio) -> status, intentos, base_dir y tiempos de encolado/inicio/fin.
+    """
+
+    def __init__(self, db_path: str = QUEUE_DB_PATH, max_per_minute: int = RESEARCH_MAX_PER_MINUTE,
+                 research_fn=None, register_fn=None):
+        self.db_path = db_path
+        self.max_per_minute = max_per_minute
+        self._research = research_fn or _default_research
+        self._register = register_fn or _default_register
+        self._db_ready = False
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # --- SQLite ---
+
+    def _connect(self):
+        if not self._db_ready:
+            with self._lock:
+                if not self._db_ready:
+                    os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+                    with sqlite3.connect(self.db_path, timeout=10) as conn:
+                        conn.execute(
+                            "CREATE TABLE IF NOT EXISTS research_jobs ("
+                            "estado TEXT NOT NULL, municipio TEXT NOT NULL, base_dir TEXT NOT NULL, "
+                            "status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, error TEXT, "
+                            "enqueued_at REAL NOT NULL, started_at REAL, finished_at REAL, "
+                            "PRIMARY KEY (estado, municipio))"
+                        )
+                        conn.execute("CREATE INDEX IF NOT EXISTS idx_research_status ON research_jobs (status, enqueued_at)")
+                    self._db_ready = True
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    # --- API pública ---
+
+    def enqueue(self, estado_nombre, municipio_nombre, base_dir: str = BASE_DIR) -> bool:
+        """
+        Encola la investigación del municipio (no bloqueante). La procesa el worker
+        arrancado con start() (startup de la app) o run_pending().
+        Returns:
+            bool: True si se creó / re-activó el trabajo, False si ya estaba en cola o reciente
+        """
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                cur = conn.execute(
+                    "INSERT INTO research_jobs (estado, municipio, base_dir, status, enqueued_at) "
+                    "VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT (estado, municipio) DO UPDATE SET "
+                    "status = excluded.status, attempts = 0, error = NULL, "
+                    "base_dir = excluded.base_dir, enqueued_at = excluded.enqueued_at "
+                    "WHERE research_jobs.status IN (?, ?) AND research_jobs.finished_at < ?",
+                    (estado_nombre, municipio_nombre, base_dir, PENDING, now,
+                     DONE, ERROR, now - RESEARCH_RETRY_AFTER)
+                )
+                created = cur.rowcount > 0
+        except sqlite3.Error as e:
+            print(f"⚠️ No se pudo encolar la investigación de {municipio_nombre}: {e}")
+            return False
+
+        if created:
+            print(f"📥 Investigación encolada: {municipio_nombre}, {estado_nombre}")
+        self._wake.set()
+        return created
+
+    def start(self):
+        """Arranca el worker de este proceso (idempotente). Retoma trabajos pendientes tras un reinicio."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="municipal-research", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Detiene el worker. Un trabajo interrumpido se retoma tras STALE_RUNNING_SECONDS."""
+        self._stop.set()
+        self._wake.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def run_pending(self, limit: int = None) -> int:
+        """Procesa trabajos en este thread hasta vaciar la cola (o el límite de tasa). Retorna cuántos."""
+        processed = 0
+        while limit is None or processed < limit:
+            job, _ = self._claim()
+            if job is None:
+                break
+            self._process(job)
+            processed += 1
+        return processed
+
+    def stats(self) -> dict:
+        """Profundidad de la cola y throughput (trabajos terminados por minuto / hora)."""
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                counts = dict(conn.execute(
+                    "SELECT status, COUNT(*) FROM research_jobs GROUP BY status"
+                ).fetchall())
+                last_minute, last_hour, avg_duration = conn.execute(
+                    "SELECT SUM(finished_at >= ?), COUNT(*), AVG(finished_at - started_at) "
+                    "FROM research_jobs WHERE status = ? AND finished_at >= ?",
+                    (now - 60, DONE, now - 3600)
+                ).fetchone()
+        except sqlite3.Error as e:
+            print(f"⚠️ Error leyendo la cola de investigación: {e}")
+            counts, last_minute, last_hour, avg_duration = {}, 0, 0, None
+        return {
+            "depth": counts.get(PENDING, 0),
+            "running": counts.get(RUNNING, 0),
+            "done": counts.get(DONE, 0),
+            "failed": counts.get(ERROR, 0),
+            "completed_last_minute": last_minute or 0,
+            "completed_last_hour": last_hour or 0,
+            "avg_duration_seconds": round(avg_duration, 2) if avg_duration is not None else None,
+            "max_per_minute": self.max_per_minute,
+            "worker_alive": self._thread is not None and self._thread.is_alive()
+        }
+
+    # --- Worker ---
+
+    def _claim(self):
+        """
+        Toma atómicamente el trabajo pendiente más antiguo, respetando el límite por minuto.
+        Returns:
+            (job | None, segundos a esperar antes de reintentar)
+        """
+        now = time.time()
+        try:
+            conn = self._connect()
+        except sqlite3.Error as e:
+            print(f"⚠️ Cola de investigación no disponible: {e}")
+            return None, POLL_SECONDS
+        try:
+            conn.isolation_level = None
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "UPDATE research_jobs SET status = ? WHERE status = ? AND started_at < ?",
+                (PENDING, RUNNING, now - STALE_RUNNING_SECONDS)
+            )
+            started, oldest = conn.execute(
+                "SELECT COUNT(*), MIN(started_at) FROM research_jobs WHERE started_at >= ?", (now - 60,)
+            ).fetchone()
+            if started >= self.max_per_minute:
+                conn.execute("COMMIT")
+                return None, max(oldest + 60 - now, 0.1)
+            row = conn.execute(
+                "SELECT estado, municipio, base_dir, attempts FROM research_jobs "
+                "WHERE status = ? ORDER BY enqueued_at LIMIT 1", (PENDING,)
+            ).fetchone()
+            if row:
+                conn.execute(
+                    "UPDATE research_jobs SET status = ?, started_at = ?, attempts = attempts + 1 "
+                    "WHERE estado = ? AND municipio = ?", (RUNNING, now, row[0], row[1])
+                )
+            conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            print(f"⚠️ Error tomando trabajo de investigación: {e}")
+            return None, POLL_SECONDS
+        finally:
+            conn.close()
+        if row is None:
+            return None, POLL_SECONDS
+        return {"estado": row[0], "municipio": row[1], "base_dir": row[2], "attempts": row[3] + 1}, 0
+
+    def _finish(self, job, status, error=None):
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "UPDATE research_jobs SET status = ?, error = ?, finished_at = ? "
+                    "WHERE estado = ? AND municipio = ?",
+                    (status, error, time.time(), job["estado"], job["municipio"])
+                )
+        except sqlite3.Error as e:
+            print(f"⚠️ Error actualizando trabajo de investigación: {e}")
+
+    def _process(self, job):
+        """Investiga (fuera de locks) y agrega el municipio al log del estado."""
+        estado, municipio = job["estado"], job["municipio"]
+        try:
+            data = self._research(estado, municipio)
+            self._register(estado, municipio, data, job["base_dir"])
+        except Exception as e:
+            retry = job["attempts"] < RESEARCH_MAX_ATTEMPTS
+            print(f"⚠️ Falló la investigación de {municipio} (intento {job['attempts']}): {e}")
+            self._finish(job, PENDING if retry else ERROR, str(e))
+            return
+        print(f"✅ Investigación completada (Nivel Oro): {municipio}, {estado}")
+        self._finish(job, DONE)
+
+    def _run(self):
+        while not self._stop.is_set():
+            job, wait = self._claim()
+            if job is None:
+                self._wake.wait(wait)
+                self._wake.clear()
+                continue
+            self._process(job)
+
+
+# Instancia compartida por el proceso (main.py arranca el worker en el startup)
+research_queue = ResearchQueue()
@@ -0,0 +1,143 @@
+"""
+Registro en Memoria de data/states_db
+Carga todos los JSON estatales una sola vez (al arranque) y los indexa por slug
+del estado y nombre de municipio. Cada consulta compara la firma de los archivos
+(mtime, tamaño) y recarga solo ese estado si fue reescrito (auto-registro,
+aprobación de actualizaciones, edición manual o escritura de otro worker).
+
+Cada estado = JSON base + log append-only de municipios auto-registrados
+({slug}.municipios.jsonl, ver municipality_auto_registry).
+"""
+import os
+import json
+import threading
+
+from municipality_auto_registry import slugify, read_municipality_log, LOG_SUFFIX
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _stat_signature(path):
+    try:
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+
+class StateRegistry:
+    """
+    Índice slug -> {"data": dict, "signature": (mtime_ns, size, log_mtime_ns, log_size)}.
+
+    Los dicts retornados son compartidos: tratarlos como solo lectura.
+    """
+
+    def __init__(self, states_dir: str):
+        self.states_dir = states_dir
+        self._states = {}
+        self._slugs = {}  # nombre del estado -> slug (evita re-normalizar en cada request)
+        self._lock = threading.Lock()
+        self.reload_count = 0
+
+    def _slug(self, estado_nombre) -> str:
+        slug = self._slugs.get(estado_nombre)
+        if slug is None:
+            slug = self._slugs[estado_nombre] = slugify(estado_nombre)
+        return slug
+
+    def _path(self, slug: str) -> str:
+        return os.path.join(self.states_dir, f"{slug}.json")
+
+    def _log_path(self, slug: str) -> str:
+        return os.path.join(self.states_dir, f"{slug}{LOG_SUFFIX}")
+
+    def _signature(self, slug: str):
+        """Firma combinada JSON base + log (None si el estado no existe)."""
+        base = _stat_signature(self._path(slug))
+        if base is None:
+            return None
+        return base + (_stat_signature(self._log_path(slug)) or (0, 0))
+
+    def _load(self, slug: str, signature):
+        """Lee y parsea un estado: JSON base + log de municipios (llamar con el lock tomado)."""
+        try:
+            with open(self._path(slug), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            # Archivo a medio escribir o corrupto: conservar la versión anterior y reintentar después
+            print(f"Warning: Could not load state db {slug}: {e}")
+            return self._states.get(slug)
+        logged = read_municipality_log(self._log_path(slug))
+        if logged:
+            municipios = data.setdefault("municipios", {})
+            for municipio, mun_data in logged.items():
+                municipios.setdefault(municipio, mun_data)
+        entry = {"data": data, "signature": signature}
+        self._states[slug] = entry
+        self.reload_count += 1
+        return entry
+
+    def load_all(self) -> int:
+        """Precarga todos los estados del directorio. Retorna el número de estados indexados."""
+        try:
+            filenames = sorted(f for f in os.listdir(self.states_dir) if f.endswith(".json"))
+        except OSError:
+            filenames = []
+        with self._lock:
+            for filename in filenames:
+                slug = filename[:-len(".json")]
+                signature = self._signature(slug)
+                entry = self._states.get(slug)
+                if entry is None or entry["signature"] != signature:
+                    self._load(slug, signature)
+            return len(self._states)
+
+    def _entry(self, estado_nombre):
+        """Entrada vigente del estado (recarga incremental si su archivo cambió)."""
+        slug = self._slug(estado_nombre)
+        signature = self._signature(slug)
+        entry = self._states.get(slug)
+        if entry is not None and entry["signature"] == signature:
+            return entry
+        with self._lock:
+            entry = self._states.get(slug)
+            if signature is None:
+                self._states.pop(slug, None)
+                return None
+            if entry is None or entry["signature"] != signature:
+                entry = self._load(slug, signature)
+            return entry
+
+    def get(self, estado_nombre) -> dict:
+        """Datos del estado ({} si no existe el archivo)."""
+        entry = self._entry(estado_nombre)
+        return entry["data"] if entry else {}
+
+    def signature(self, estado_nombre):
+        """Firma de los archivos del estado, o None si no existe."""
+        entry = self._entry(estado_nombre)
+        return entry["signature"] if entry else None
+
+    def has_municipality(self, estado_nombre, municipio_nombre) -> bool:
+        return municipio_nombre in self.get(estado_nombre).get("municipios", {})
+
+    def municipality_count(self, estado_nombre) -> int:
+        return len(self.get(estado_nombre).get("municipios", {}))
+
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def get_state_registry(base_dir: str = BASE_DIR) -> StateRegistry:
+    """Registro compartido (uno por directorio data/states_db), precargado en el primer uso."""
+    states_dir = os.path.join(base_dir, "data", "states_db")
+    registry = _registries.get(states_dir)
+    if registry is None:
+        with _registries_lock:
+            registry = _registries.get(states_dir)
+            if registry is None:
+                registry = StateRegistry(states_dir)
+                registry.load_all()
+                _registries[states_dir] = registry
+    return registry
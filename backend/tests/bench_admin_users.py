@@ -0,0 +1,116 @@
+"""
+Benchmark de /admin/users con NUM_USERS usuarios y NUM_ANALYSES análisis (SQLite).
+Mide la consulta de una página de PAGE_SIZE usuarios con su conteo de análisis:
+  - ANTES: página con offset + COUNT(*) de analyses por usuario (N+1) + COUNT(*) de users
+  - DESPUÉS: UserCRUD.list_users_with_counts (una consulta agrupada) con offset y con
+    cursor keyset (after_id), y total de usuarios desde caché
+
+Uso: python tests/bench_admin_users.py [usuarios] [análisis]
+     (por omisión 100,000 y 10,000,000; generar la BD toma unos minutos)
+"""
+import os
+import sys
+import time
+import random
+import shutil
+import sqlite3
+import tempfile
+import statistics
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+DB_PATH = os.path.join(tempfile.mkdtemp(), "bench_admin_users.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench-key-not-a-real-key")
+os.environ.setdefault("JWT_SECRET_KEY", "bench-secret-key-not-for-production-000000")
+
+from database import Base, engine, SessionLocal, User, Analysis, UserCRUD
+
+# Configuración
+NUM_USERS = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+NUM_ANALYSES = int(sys.argv[2]) if len(sys.argv) > 2 else 10_000_000
+PAGE_SIZE = 100
+REPEATS = 20
+INSERT_BATCH = 200_000
+
+
+def build_database():
+    """Esquema e índices del modelo; filas insertadas con sqlite3 directo (mucho más rápido que el ORM)."""
+    Base.metadata.create_all(bind=engine)
+    conn = sqlite3.connect(DB_PATH)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.executemany(
+        "INSERT INTO users (id, email, name, password_hash, role, is_active, created_at) "
+        "VALUES (?, ?, ?, 'x', 'consultor', 1, '2026-01-01 00:00:00')",
+        ((i, f"perito{i}@example.com", f"Perito {i}") for i in range(1, NUM_USERS + 1))
+    )
+    rng = random.Random(7)
+    for start in range(0, NUM_ANALYSES, INSERT_BATCH):
+        conn.executemany(
+            "INSERT INTO analyses (user_id, municipio, estado, tipo_inmueble, input_data, report_data, created_at) "
+            "VALUES (?, 'Zapopan', 'Jalisco', 'Oficina', '{}', '{}', '2026-01-01 00:00:00')",
+            ((rng.randint(1, NUM_USERS),) for _ in range(min(INSERT_BATCH, NUM_ANALYSES - start)))
+        )
+        conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+
+
+def old_page(db, limit: int, offset: int):
+    """Lógica anterior del endpoint."""
+    users = db.query(User).offset(offset).limit(limit).all()
+    total = db.query(User).count()
+    counts = [db.query(Analysis).filter(Analysis.user_id == user.id).count() for user in users]
+    return total, counts
+
+
+def measure(label: str, fn) -> float:
+    fn()  # Calentamiento (caché de páginas de SQLite)
+    times = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    median = statistics.median(times)
+    print(f"{label:<44} mediana: {median:8.2f} ms | máx: {max(times):8.2f} ms")
+    return median
+
+
+def run_benchmark():
+    print("--- BENCHMARK /admin/users ---")
+    print(f"Usuarios: {NUM_USERS:,} | análisis: {NUM_ANALYSES:,} | página: {PAGE_SIZE}")
+    start = time.perf_counter()
+    build_database()
+    print(f"BD generada en {time.perf_counter() - start:.0f}s ({os.path.getsize(DB_PATH) / 1e9:.2f} GB)")
+
+    db = SessionLocal()
+    deep_offset = NUM_USERS - PAGE_SIZE
+    deep_after_id = deep_offset  # ids consecutivos: la misma página que el offset profundo
+
+    def new_page(**kwargs):
+        rows = UserCRUD.list_users_with_counts(db, limit=PAGE_SIZE, **kwargs)
+        return UserCRUD.count_users(db), rows
+
+    def new_page_uncached_total(**kwargs):
+        UserCRUD.invalidate_total()
+        return new_page(**kwargs)
+
+    assert old_page(db, PAGE_SIZE, deep_offset)[1] == [row.analyses_count for row in new_page(after_id=deep_after_id)[1]]
+
+    measure("ANTES primera página (N+1)", lambda: old_page(db, PAGE_SIZE, 0))
+    before = measure("ANTES página profunda (N+1, offset)", lambda: old_page(db, PAGE_SIZE, deep_offset))
+    measure("DESPUÉS primera página", lambda: new_page(offset=0))
+    measure("DESPUÉS página profunda (offset)", lambda: new_page(offset=deep_offset))
+    after = measure("DESPUÉS página profunda (keyset after_id)", lambda: new_page(after_id=deep_after_id))
+    measure("DESPUÉS keyset + total sin caché", lambda: new_page_uncached_total(after_id=deep_after_id))
+    db.close()
+    engine.dispose()
+    shutil.rmtree(os.path.dirname(DB_PATH), ignore_errors=True)
+
+    print(f"Speedup página profunda: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    run_benchmark()
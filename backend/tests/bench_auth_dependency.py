@@ -0,0 +1,148 @@
+"""
+Benchmark de la dependency de autenticación (auth/dependencies.py).
+Lanza NUM_REQUESTS requests autenticados concurrentes contra un endpoint mínimo y mide
+cuánto tiempo queda bloqueado el event loop (retraso de un tick de 1 ms) mientras
+get_current_user consulta al usuario. La base de datos simula DB_LATENCY_MS de round trip.
+  - ANTES: (versión previa, desde git) consulta síncrona dentro del async def
+  - DESPUÉS: consulta en el threadpool (run_in_threadpool)
+
+Uso: python tests/bench_auth_dependency.py
+"""
+import os
+import sys
+import time
+import types
+import asyncio
+import logging
+import tempfile
+import subprocess
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+os.environ.setdefault("JWT_SECRET_KEY", "bench-secret-key-not-for-production-000000")
+
+import httpx
+from fastapi import FastAPI, Depends
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from database import Base, User, get_db
+from auth import create_access_token
+from auth import dependencies
+
+# Configuración
+NUM_REQUESTS = 100
+DB_LATENCY_MS = 5
+TICK_MS = 1
+
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+
+def load_baseline():
+    """Dependency anterior: auth/dependencies.py antes del commit que agregó este benchmark."""
+    git = lambda *args: subprocess.run(
+        ["git", *args], capture_output=True, text=True, check=True, cwd=BACKEND_DIR
+    ).stdout.strip()
+    added = git("log", "--format=%H", "--diff-filter=A", "-1", "--", "tests/bench_auth_dependency.py")
+    source = git("show", f"{added + '~1' if added else 'HEAD'}:backend/auth/dependencies.py")
+    module = types.ModuleType("auth_dependencies_baseline")
+    module.__file__ = dependencies.__file__
+    exec(source, module.__dict__)
+    return module
+
+
+def build_database():
+    path = os.path.join(tempfile.mkdtemp(), "bench_auth.db")
+    # NullPool: con un pool acotado, la versión anterior se bloquea esperando conexión dentro del loop
+    # (las sesiones que la liberarían necesitan el loop) y el benchmark mediría el pool_timeout
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False}, poolclass=NullPool)
+    Base.metadata.create_all(bind=engine)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def simulate_round_trip(*args):
+        time.sleep(DB_LATENCY_MS / 1000)
+
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = SessionLocal()
+    user = User(email="perito@example.com", name="Perito", password_hash="x", role="consultor", is_active=1)
+    db.add(user)
+    db.commit()
+    user_id = user.id
+    db.close()
+    return SessionLocal, user_id
+
+
+def build_app(get_current_user, SessionLocal):
+    app = FastAPI()
+
+    def override_get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+
+    @app.get("/me")
+    async def me(current_user: User = Depends(get_current_user)):
+        return {"id": current_user.id}
+
+    return app
+
+
+async def run_load(app, token: str):
+    """Devuelve (segundos totales, lag máximo del event loop en ms, ms bloqueados en total)."""
+    lags = []
+    done = asyncio.Event()
+
+    async def monitor():
+        loop = asyncio.get_running_loop()
+        while not done.is_set():
+            start = loop.time()
+            await asyncio.sleep(TICK_MS / 1000)
+            lags.append(max(0.0, (loop.time() - start) * 1000 - TICK_MS))
+
+    headers = {"Authorization": f"Bearer {token}"}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.get("/me", headers=headers)  # Calentamiento
+        watcher = asyncio.create_task(monitor())
+        start = time.perf_counter()
+        responses = await asyncio.gather(*[client.get("/me", headers=headers) for _ in range(NUM_REQUESTS)])
+        elapsed = time.perf_counter() - start
+        done.set()
+        await watcher
+
+    assert all(response.status_code == 200 for response in responses)
+    return elapsed, max(lags, default=0.0), sum(lag for lag in lags if lag > TICK_MS)
+
+
+def measure(label, get_current_user, SessionLocal, token):
+    app = build_app(get_current_user, SessionLocal)
+    elapsed, max_lag, blocked = asyncio.run(run_load(app, token))
+    print(f"{label:<30} total: {elapsed * 1000:7.1f} ms | lag máx. loop: {max_lag:6.1f} ms | "
+          f"loop bloqueado: {blocked:7.1f} ms")
+    return elapsed, blocked
+
+
+def run_benchmark():
+    print("--- BENCHMARK DEPENDENCY DE AUTENTICACIÓN ---")
+    print(f"Requests concurrentes: {NUM_REQUESTS} | latencia simulada de BD: {DB_LATENCY_MS} ms")
+
+    SessionLocal, user_id = build_database()
+    token = create_access_token({"sub": str(user_id)})
+
+    before_total, before_blocked = measure("ANTES (consulta en el loop)", load_baseline().get_current_user,
+                                           SessionLocal, token)
+    after_total, after_blocked = measure("DESPUÉS (threadpool)", dependencies.get_current_user,
+                                         SessionLocal, token)
+
+    print(f"Speedup total: {before_total / after_total:.1f}x | "
+          f"bloqueo del loop: {before_blocked:.0f} ms -> {after_blocked:.0f} ms")
+
+
+if __name__ == "__main__":
+    run_benchmark()
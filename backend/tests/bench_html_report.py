@@ -0,0 +1,90 @@
+"""
+Benchmark del reporte HTML premium (html_report_generator.py).
+Renderiza NUM_REPORTS reportes para cada cantidad de normas de NORM_COUNTS y compara:
+  - ANTES: (versión previa, desde git) f-string gigante con el CSS inline, += por tarjeta / fila y QR en cada llamada
+  - DESPUÉS: plantillas precompiladas (html_templates.py), joins por lote, cuerpos de normas y QR en caché
+
+La ventaja viene sobre todo del costo fijo (QR, CSS); por tarjeta la versión previa no
+escapaba HTML, así que el speedup baja a medida que crecen las normas del reporte.
+
+Uso: python tests/bench_html_report.py
+"""
+import os
+import sys
+import time
+import types
+import subprocess
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+import html_report_generator
+
+# Configuración
+NUM_REPORTS = 200
+NORM_COUNTS = (300, 500, 1000, 2000)
+NUM_BUDGET_ITEMS = 60
+
+INPUT_DATA = {
+    "tipo_inmueble": "Oficina",
+    "m2_construccion": 800.0,
+    "niveles": 3,
+    "aforo": 80,
+    "trabajadores": 60,
+    "municipio": "Guadalajara",
+    "estado": "Jalisco"
+}
+
+
+
+def analysis_data(num_norms: int) -> dict:
+    return {
+        "normative_checklist": [
+            {"norma": f"NOM-{i:03d}-STPS", "titulo": "Condiciones de seguridad contra incendio",
+             "articulo": "5.1", "fundamento_legal": "Ley General de Protección Civil, art. 39"}
+            for i in range(num_norms)
+        ],
+        "budget_breakdown": {
+            "items": [{"concept": "Extintor PQS 6 kg", "quantity": 2, "unit_price": 850.0}] * NUM_BUDGET_ITEMS
+        }
+    }
+
+
+def load_baseline():
+    """Generador anterior: html_report_generator.py en el commit previo al que agregó html_templates.py."""
+    git = lambda *args: subprocess.run(
+        ["git", *args], capture_output=True, text=True, check=True, cwd=BACKEND_DIR
+    ).stdout.strip()
+    added = git("log", "--format=%H", "--diff-filter=A", "-1", "--", "html_templates.py")
+    source = git("show", f"{added}~1:backend/html_report_generator.py")
+    module = types.ModuleType("html_report_baseline")
+    exec(source, module.__dict__)
+    return module
+
+
+def measure(label, generate, data):
+    generate(INPUT_DATA, data)  # Calentamiento
+    start = time.perf_counter()
+    for _ in range(NUM_REPORTS):
+        generate(INPUT_DATA, data)
+    elapsed = time.perf_counter() - start
+    per_report_ms = elapsed / NUM_REPORTS * 1000
+    print(f"{label:<30} total: {elapsed:.2f}s | por reporte: {per_report_ms:.2f} ms")
+    return per_report_ms
+
+
+def run_benchmark():
+    print("--- BENCHMARK REPORTE HTML ---")
+    print(f"Reportes: {NUM_REPORTS} | normas por reporte: {NORM_COUNTS} | conceptos: {NUM_BUDGET_ITEMS}")
+    baseline = load_baseline()
+
+    for num_norms in NORM_COUNTS:
+        print(f"\n{num_norms} normas")
+        data = analysis_data(num_norms)
+        before = measure("ANTES (f-string + +=)", baseline.generate_html_report, data)
+        after = measure("DESPUÉS (precompiladas)", html_report_generator.generate_html_report, data)
+        print(f"Speedup: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,135 @@
+"""
+Micro-benchmark de la justificación jurídica determinista.
+Compara el costo por render del texto de obligatoriedad del PIPC:
+  - ANTES: dict literal de 32 estados + lista de causales + f-string en cada llamada
+  - DESPUÉS: plantillas por estado pre-compiladas + tabla de causales por bitmask
+
+Uso: python tests/bench_legal_justification.py
+"""
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from legal_justification import get_justification_engine
+
+# Configuración
+NUM_RENDERS = 50000
+
+# Datos de prueba (mismas claves que arma /analyze)
+DATA = {
+    "tipo_inmueble": "Hotel",
+    "m2_construccion": 4200.0,
+    "niveles": 5,
+    "aforo": 300,
+    "trabajadores": 120,
+    "municipio": "Monterrey",
+    "estado": "Nuevo León",
+    "has_gas": True,
+    "has_special_inst": False,
+    "has_pool": True
+}
+
+
+def legacy_justification(data):
+    """Réplica de AIService.generate_legal_justification anterior (modo mock)."""
+    municipio = data.get("municipio", "el municipio")
+    estado = data.get("estado", "el estado")
+    tipo = data.get("tipo_inmueble", "inmueble")
+    m2 = data.get("m2_construccion", 0)
+    trabajadores = data.get("trabajadores", 0)
+    aforo = data.get("aforo", 0)
+    niveles = data.get("niveles", 1)
+
+    # Construcción lógica de causales de riesgo
+    causales = []
+    if trabajadores > 25: causales.append(f"PLANTILLA DE TRABAJADORES SUPERIOR A 25 PERSONAS ({trabajadores})")
+    if m2 > 250: causales.append(f"SUPERFICIE CONSTRUIDA SUPERIOR A 250 M² ({m2} M²)")
+    if aforo > 50: causales.append(f"AFORO DE VISITANTES SUPERIOR A 50 PERSONAS ({aforo})")
+    if niveles > 2: causales.append(f"NIVELES ESTRUCTURALES MAYOR A 2 ({niveles})")
+    
+    # Nuevos factores de riesgo (Sincronización con Rules Engine)
+    if data.get("has_gas"): causales.append("INSTALACIÓN DE GAS L.P./NATURAL")
+    if data.get("has_special_inst"): causales.append("INSTALACIONES ESPECIALES (DICTAMEN ELÉCTRICO/GAS)")
+    if data.get("has_pool"): causales.append("RIESGO ACUÁTICO (ALBERCA/CUERPO DE AGUA)")
+    
+    if "Aeropuerto" in tipo or "Hangar" in tipo: causales.append("GIRO DE ALTO RIESGO POR INFRAESTRUCTURA DE TRANSPORTE AÉREO")
+
+    causales_str = ", ".join(causales) if causales else "GIRO REGULADO POR LEY DE ESTABLECIMIENTOS MERCANTILES"
+
+    # TEXTO BASE DETERMINISTA (SOLICITADO POR EL USUARIO - EN SINTONÍA CON CALCULATOR)
+    # 1. Determinación de nombres de ley precisos (Base de Datos Interna Ampliada)
+    leyes_estados = {
+        "Aguascalientes": {"ley": "LEY DE PROTECCIÓN CIVIL DEL ESTADO DE AGUASCALIENTES", "art": "ARTÍCULO 45"},
+        "Baja California": {"ley": "LEY DE PROTECCIÓN CIVIL Y GESTIÓN DE RIESGOS DE BAJA CALIFORNIA", "art": "ARTÍCULO 58"},
+        "Baja California Sur": {"ley": "LEY DE PROTECCIÓN CIVIL DE B.C.S.", "art": "ARTÍCULO 33"},
+        "Campeche": {"ley": "LEY DE PROTECCIÓN CIVIL DEL ESTADO DE CAMPECHE", "art": "ARTÍCULO 60"},
+        "Coahuila": {"ley": "LEY DE PROTECCIÓN CIVIL PARA EL ESTADO DE COAHUILA", "art": "ARTÍCULO 42"},
+        "Colima": {"ley": "LEY DE PROTECCIÓN CIVIL DEL ESTADO DE COLIMA", "art": "ARTÍCULO 55"},
+        "Chiapas": {"ley": "LEY DE PROTECCIÓN CIVIL DEL ESTADO DE CHIAPAS", "art": "ARTÍCULO 74"},
+        "Chihuahua": {"ley": "LEY DE PROTECCIÓN CIVIL DEL ESTADO DE CHIHUAHUA", "art": "ARTÍCULO 68"},
+        "Ciudad de México": {"ley": "LEY DE GESTIÓN INTEGRAL DE RIESGOS Y PC DE LA CDMX", "art": "ARTÍCULO 58"},
+        "Durango": {"ley": "LEY DE PROTECCIÓN CIVIL DEL ESTADO DE DURANGO", "art": "ARTÍCULO 40"},
+        "Guanajuato": {"ley": "LEY DE PROTECCIÓN CIVIL PARA EL ESTADO DE GUANAJUATO", "art": "ARTÍCULO 39"},
+        "Guerrero": {"ley": "LEY DE PROTECCIÓN CIVIL DEL ESTADO DE GUERRERO", "art": "ARTÍCULO 50"},
+        "Hidalgo": {"ley": "LEY DE PROTECCIÓN CIVIL DEL ESTADO DE HIDALGO", "art": "ARTÍCULO 72"},
+        "Jalisco": {"ley": "LEY DEL SISTEMA ESTATAL DE PROTECCIÓN CIVIL DE JALISCO", "art": "ARTÍCULO 24"},
+        "México": {"ley": "LIBRO SEXTO DEL CÓDIGO ADMINISTRATIVO DEL EDOMEX", "art": "ARTÍCULO 6.18"},
+        "Michoacán": {"ley": "LEY DE PROTECCIÓN CIVIL DEL ESTADO DE MICHOACÁN", "art": "ARTÍCULO 55"},
+        "Morelos": {"ley": "LEY DE PROTECCIÓN CIVIL DEL ESTADO DE MORELOS", "art": "ARTÍCULO 48"},
+        "Nayarit": {"ley": "LEY DE PROTECCIÓN CIVIL DEL ESTADO DE NAYARIT", "art": "ARTÍCULO 62"},
+        "Nuevo León": {"ley": "LEY DE PROTECCIÓN CIVIL DEL ESTADO DE NUEVO LEÓN", "art": "ARTÍCULO 18"},
+        "Oaxaca": {"ley": "LEY DE PROTECCIÓN CIVIL DEL ESTADO DE OAXACA", "art": "ARTÍCULO 44"},
+        "Puebla": {"ley": "LEY DEL SISTEMA ESTATAL DE PROTECCIÓN CIVIL DE PUEBLA", "art": "ARTÍCULO 66"},
+        "Querétaro": {"ley": "LEY DE PROTECCIÓN CIVIL DEL ESTADO DE QUERÉTARO", "art": "ARTÍCULO 54"},
+        "Quintana Roo": {"ley": "LEY DE PROTECCIÓN CIVIL DEL ESTADO DE QUINTANA ROO", "art": "ARTÍCULO 88"},
+        "San Luis Potosí": {"ley": "LEY DEL SISTEMA DE PROTECCIÓN CIVIL DE S.L.P.", "art": "ARTÍCULO 52"},
+        "Sinaloa": {"ley": "LEY DE PROTECCIÓN CIVIL DEL ESTADO DE SINALOA", "art": "ARTÍCULO 70"},
+        "Sonora": {"ley": "LEY DE PROTECCIÓN CIVIL PARA EL ESTADO DE SONORA", "art": "ARTÍCULO 38"},
+        "Tabasco": {"ley": "LEY DE PROTECCIÓN CIVIL DEL ESTADO DE TABASCO", "art": "ARTÍCULO 65"},
+        "Tamaulipas": {"ley": "LEY DE PROTECCIÓN CIVIL DEL ESTADO DE TAMAULIPAS", "art": "ARTÍCULO 41"},
+        "Tlaxcala": {"ley": "LEY DE PROTECCIÓN CIVIL DEL ESTADO DE TLAXCALA", "art": "ARTÍCULO 53"},
+        "Veracruz": {"ley": "LEY DE PC Y REDUCCIÓN DE RIESGO DE VERACRUZ", "art": "ARTÍCULO 66"},
+        "Yucatán": {"ley": "LEY DE PROTECCIÓN CIVIL DEL ESTADO DE YUCATÁN", "art": "ARTÍCULO 59"},
+        "Zacatecas": {"ley": "LEY DE PROTECCIÓN CIVIL DEL ESTADO DE ZACATECAS", "art": "ARTÍCULO 35"}
+    }
+
+    info_estatal = leyes_estados.get(estado, {"ley": "LEY DE PROTECCIÓN CIVIL DEL ESTADO", "art": "ARTÍCULO 58"})
+    ley_estatal_nombre = info_estatal["ley"]
+    art_ley_estatal = info_estatal["art"]
+
+    # 2. Generación del Texto Estricto (Sin Atlas, Referencias Precisas)
+    texto_juridico_estricto = (
+        f"EL INMUEBLE ESTÁ OBLIGADO A PRESENTAR UN PROGRAMA INTERNO DE PROTECCIÓN CIVIL (PIPC) "
+        f"DERIVADO DE SUS CARACTERÍSTICAS FÍSICAS Y OPERATIVAS: {causales_str}. "
+        f"ESTA CONDICIÓN ACTIVA LA OBLIGATORIEDAD PREVISTA EN EL ARTÍCULO 39 DE LA LEY GENERAL DE PROTECCIÓN CIVIL; "
+        f"{art_ley_estatal} DE LA {ley_estatal_nombre} Y SU REGLAMENTO ESTATAL; "
+        f"ASÍ COMO LAS DISPOSICIONES DEL REGLAMENTO DE PROTECCIÓN CIVIL DEL MUNICIPIO DE {municipio.upper()}."
+    )
+    return texto_juridico_estricto
+
+
+def measure(label, fn):
+    start = time.perf_counter()
+    for _ in range(NUM_RENDERS):
+        fn()
+    elapsed = time.perf_counter() - start
+    per_render_us = elapsed / NUM_RENDERS * 1_000_000
+    print(f"{label:<30} total: {elapsed:.3f}s | por render: {per_render_us:.2f} µs | {NUM_RENDERS / elapsed:,.0f} renders/s")
+    return per_render_us
+
+
+def run_benchmark():
+    engine = get_justification_engine()
+    print("--- BENCHMARK JUSTIFICACIÓN JURÍDICA ---")
+    print(f"Renders simulados: {NUM_RENDERS}")
+
+    before = measure("ANTES (dict + f-string)", lambda: legacy_justification(DATA))
+    after = measure("DESPUÉS (pre-compilado)", lambda: engine.render(DATA))
+
+    print(f"Speedup: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    run_benchmark()
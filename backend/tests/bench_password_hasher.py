@@ -0,0 +1,134 @@
+"""
+Benchmark de /history durante una ráfaga de logins (bcrypt).
+LOGIN_CLIENTS clientes hacen /auth/login en bucle durante STORM_SECONDS mientras
+un cliente consulta /history cada PROBE_INTERVAL_MS; se reporta p50/p99 de /history:
+  - SIN CARGA: solo /history
+  - ANTES: bcrypt en el thread del request (hash_handler directo, como antes)
+  - DESPUÉS: pool acotado de bcrypt (auth/password_hasher.py, 503 al saturarse;
+    los clientes rechazados respetan Retry-After)
+
+Uso: python tests/bench_password_hasher.py
+"""
+import os
+import sys
+import time
+import asyncio
+import logging
+import tempfile
+import statistics
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_login.db')}"
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench-key-not-a-real-key")
+os.environ.setdefault("JWT_SECRET_KEY", "bench-secret-key-not-for-production-000000")
+
+import httpx
+
+import main
+from database import Base, engine, SessionLocal, User, Analysis
+from auth import create_access_token, hash_password, verify_password, password_hasher
+from rate_limit_config import limiter
+
+# Configuración
+LOGIN_CLIENTS = 40
+STORM_SECONDS = 6
+PROBE_INTERVAL_MS = 50
+NUM_ANALYSES = 30
+EMAIL = "perito@example.com"
+PASSWORD = "Secreta123!"
+
+logging.disable(logging.WARNING)
+
+
+class InlineHasher:
+    """Comportamiento anterior: bcrypt directo en el thread del request."""
+
+    def hash(self, password: str) -> str:
+        return hash_password(password)
+
+    def verify(self, password: str, hashed_password: str) -> bool:
+        return verify_password(password, hashed_password)
+
+
+def build_database() -> str:
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    user = User(email=EMAIL, name="Perito", password_hash=hash_password(PASSWORD), role="consultor", is_active=1)
+    db.add(user)
+    db.commit()
+    for i in range(NUM_ANALYSES):
+        db.add(Analysis(user_id=user.id, municipio="Zapopan", estado="Jalisco", tipo_inmueble="Oficina",
+                        input_data={"m2_construccion": 800 + i}, report_data={}))
+    db.commit()
+    token = create_access_token({"sub": str(user.id)})
+    db.close()
+    return token
+
+
+def percentile(values, pct: int) -> float:
+    return statistics.quantiles(values, n=100)[pct - 1] if len(values) > 1 else (values or [0.0])[0]
+
+
+async def run_phase(token: str, storm: bool) -> dict:
+    stop = asyncio.Event()
+    latencies, logins = [], {}
+
+    async def probe(client):
+        while not stop.is_set():
+            start = time.perf_counter()
+            response = await client.get("/history", headers={"Authorization": f"Bearer {token}"})
+            assert response.status_code == 200
+            latencies.append((time.perf_counter() - start) * 1000)
+            await asyncio.sleep(PROBE_INTERVAL_MS / 1000)
+
+    async def login_loop(client):
+        while not stop.is_set():
+            response = await client.post("/auth/login", json={"email": EMAIL, "password": PASSWORD})
+            logins[response.status_code] = logins.get(response.status_code, 0) + 1
+            if response.status_code == 503:
+                await asyncio.sleep(float(response.headers.get("Retry-After", "1")))
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        tasks = [asyncio.create_task(probe(client))]
+        if storm:
+            tasks += [asyncio.create_task(login_loop(client)) for _ in range(LOGIN_CLIENTS)]
+        await asyncio.sleep(STORM_SECONDS)
+        stop.set()
+        await asyncio.gather(*tasks)
+
+    return {"p50": percentile(latencies, 50), "p99": percentile(latencies, 99),
+            "probes": len(latencies), "logins": logins}
+
+
+def measure(label: str, token: str, storm: bool, hasher) -> dict:
+    main.password_hasher = hasher
+    result = asyncio.run(run_phase(token, storm))
+    logins = ", ".join(f"{code}: {count}" for code, count in sorted(result["logins"].items())) or "-"
+    print(f"{label:<28} /history p50: {result['p50']:8.1f} ms | p99: {result['p99']:8.1f} ms | "
+          f"muestras: {result['probes']:4d} | logins [{logins}]")
+    return result
+
+
+def run_benchmark():
+    print("--- BENCHMARK /history DURANTE RÁFAGA DE LOGINS ---")
+    print(f"Clientes de login: {LOGIN_CLIENTS} | duración: {STORM_SECONDS}s | "
+          f"pool bcrypt: {password_hasher.workers} threads (nice {password_hasher.nice}), "
+          f"{password_hasher.max_pending} en curso máx.")
+
+    limiter.enabled = False  # Medir el servidor, no el rate limit de /auth/login
+    token = build_database()
+
+    measure("SIN CARGA", token, storm=False, hasher=password_hasher)
+    before = measure("ANTES (bcrypt en el request)", token, storm=True, hasher=InlineHasher())
+    after = measure("DESPUÉS (pool acotado)", token, storm=True, hasher=password_hasher)
+
+    print(f"p99 de /history: {before['p99']:.0f} ms -> {after['p99']:.0f} ms "
+          f"({before['p99'] / after['p99']:.1f}x)")
+    password_hasher.shutdown()
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,65 @@
+"""
+Benchmark del pool de procesos de render de PDFs (pdf_renderer.py).
+Envía NUM_REPORTS dictámenes concurrentes y compara throughput:
+  - ANTES: 8 threads renderizando en el mismo proceso (un solo GIL, como gunicorn --threads 8)
+  - DESPUÉS: PDFRenderer con 1..N procesos worker
+
+Uso: python tests/bench_pdf_renderer.py
+"""
+import os
+import sys
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from report_generator import generate_pdf_report
+from pdf_renderer import PDFRenderer
+from bench_pdf_templates import INPUT_DATA, RESULTS
+
+# Configuración
+NUM_REPORTS = 400
+THREADS = 8
+
+
+def measure_threads():
+    generate_pdf_report(INPUT_DATA, RESULTS)  # Calentamiento
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=THREADS) as pool:
+        list(pool.map(lambda _: generate_pdf_report(INPUT_DATA, RESULTS), range(NUM_REPORTS)))
+    elapsed = time.perf_counter() - start
+    print(f"{'ANTES (' + str(THREADS) + ' threads, 1 GIL)':<30} total: {elapsed:.2f}s | {NUM_REPORTS / elapsed:,.1f} reportes/s")
+    return NUM_REPORTS / elapsed
+
+
+def measure_processes(processes):
+    renderer = PDFRenderer(processes=processes, max_pending=NUM_REPORTS)
+    [f.result() for f in [renderer.submit(INPUT_DATA, RESULTS) for _ in range(processes)]]  # Workers tibios
+    start = time.perf_counter()
+    futures = [renderer.submit(INPUT_DATA, RESULTS) for _ in range(NUM_REPORTS)]
+    for f in futures:
+        f.result()
+    elapsed = time.perf_counter() - start
+    renderer.shutdown()
+    print(f"{'DESPUÉS (' + str(processes) + ' procesos)':<30} total: {elapsed:.2f}s | {NUM_REPORTS / elapsed:,.1f} reportes/s")
+    return NUM_REPORTS / elapsed
+
+
+def run_benchmark():
+    warnings.simplefilter("ignore", DeprecationWarning)  # Aliases Arial -> Helvetica de fpdf2
+    cores = os.cpu_count() or 1
+    print("--- BENCHMARK POOL DE PROCESOS DE RENDER (PDF) ---")
+    print(f"Reportes renderizados: {NUM_REPORTS} | cores: {cores}")
+
+    baseline = measure_threads()
+    single = measure_processes(1)
+    processes = 1
+    while processes < cores:
+        processes = min(processes * 2, cores)
+        throughput = measure_processes(processes)
+        print(f"  escalamiento vs 1 proceso: {throughput / single:.2f}x (ideal {processes}x) | vs threads: {throughput / baseline:.2f}x")
+
+
+if __name__ == "__main__":
+    run_benchmark()
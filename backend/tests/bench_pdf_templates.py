@@ -0,0 +1,76 @@
+"""
+Benchmark de plantillas de página del dictamen PDF.
+Renderiza NUM_REPORTS dictámenes en memoria y compara throughput:
+  - ANTES: encabezado, pie, portada y logo dibujados / decodificados en cada documento
+  - DESPUÉS: elementos fijos estampados desde plantillas pre-renderizadas (pdf_templates.py)
+
+Uso: python tests/bench_pdf_templates.py
+"""
+import os
+import sys
+import time
+import warnings
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import report_generator
+from report_generator import generate_pdf_report
+
+# Configuración
+NUM_REPORTS = 1000
+
+# Datos de prueba (mismas claves que arma /analyze)
+INPUT_DATA = {
+    "tipo_inmueble": "Oficina",
+    "m2_construccion": 800.0,
+    "niveles": 3,
+    "aforo": 80,
+    "trabajadores": 60,
+    "municipio": "Guadalajara",
+    "estado": "Jalisco"
+}
+
+RESULTS = {
+    "resumen_ejecutivo": {"legal_justification_strict": "EL INMUEBLE ESTÁ OBLIGADO A PRESENTAR UN PIPC."},
+    "ai_analysis": {"legal_justification": "EL INMUEBLE ESTÁ OBLIGADO A PRESENTAR UN PIPC."},
+    "checklist": [
+        {
+            "norma": f"NOM-00{i}-STPS FEDERAL",
+            "titulo": "Condiciones de seguridad",
+            "checks": [{"desc": "Verificar señalización de rutas de evacuación", "art": "5.1"}] * 4
+        }
+        for i in range(6)
+    ],
+    "presupuesto_inicial": [
+        {"id": str(i), "categoria": "Extinción", "concepto": "Extintor PQS 6 kg", "cantidad": 2,
+         "precio_unitario": 850.0, "norma": "NOM-002-STPS"}
+        for i in range(12)
+    ]
+}
+
+
+def measure(label, use_templates):
+    report_generator.USE_PAGE_TEMPLATES = use_templates
+    generate_pdf_report(INPUT_DATA, RESULTS)  # Calentamiento (plantillas / QR en caché)
+    start = time.perf_counter()
+    for _ in range(NUM_REPORTS):
+        generate_pdf_report(INPUT_DATA, RESULTS)
+    elapsed = time.perf_counter() - start
+    per_report_ms = elapsed / NUM_REPORTS * 1000
+    print(f"{label:<30} total: {elapsed:.2f}s | por reporte: {per_report_ms:.2f} ms | {NUM_REPORTS / elapsed:,.1f} reportes/s")
+    return per_report_ms
+
+
+def run_benchmark():
+    warnings.simplefilter("ignore", DeprecationWarning)  # Aliases Arial -> Helvetica de fpdf2
+    print("--- BENCHMARK PLANTILLAS DE PÁGINA (PDF) ---")
+    print(f"Reportes renderizados: {NUM_REPORTS}")
+
+    before = measure("ANTES (dibujo en vivo)", use_templates=False)
+    after = measure("DESPUÉS (plantillas)", use_templates=True)
+
+    print(f"Speedup: {before / after:.2f}x")
+
+
+if __name__ == "__main__":
+    run_benchmark()
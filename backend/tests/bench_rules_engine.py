@@ -0,0 +1,91 @@
+"""
+Micro-benchmark del motor de reglas (rules_matrix.json).
+Compara el costo por request de evaluar todas las reglas:
+  - ANTES: eval() del string crudo + reconstrucción de allowed_names por regla
+  - DESPUÉS: expresiones pre-compiladas con enlace solo de variables referenciadas
+
+Uso: python tests/bench_rules_engine.py
+"""
+import math
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from calculator_engine import CivilProtectionCalculator
+
+# Configuración
+NUM_REQUESTS = 20000
+
+# Contexto de prueba (mismas claves que arma /analyze)
+CONTEXT = {
+    "tipo_inmueble": "Hotel",
+    "m2_construccion": 4200.0,
+    "niveles": 5,
+    "aforo": 300,
+    "aforo_autorizado": 350,
+    "trabajadores": 120,
+    "municipio": "Monterrey",
+    "estado": "Nuevo León",
+    "has_gas": True,
+    "has_transformer": False,
+    "has_machine_room": True,
+    "has_substation": False,
+    "has_special_inst": False,
+    "has_pool": True,
+    "has_cocina": True,
+    "has_site": True
+}
+
+
+def legacy_eval(expression, context):
+    """Réplica del _safe_eval anterior (eval por string en cada llamada)."""
+    if expression == "always":
+        return True
+    try:
+        allowed_names = {k: v for k, v in context.items()}
+        allowed_names['math'] = math
+        allowed_names['ceil'] = math.ceil
+        return eval(expression, {"__builtins__": {}}, allowed_names)
+    except Exception:
+        return False
+
+
+def run_legacy(rules):
+    for rule in rules:
+        if legacy_eval(rule['trigger_logic'], CONTEXT):
+            if 'calculation_formula' in rule and rule['calculation_formula'] != "1":
+                legacy_eval(rule['calculation_formula'], CONTEXT)
+
+
+def run_compiled(engine):
+    for rule, trigger, formula in engine.compiled_rules:
+        if engine._safe_eval(trigger, CONTEXT):
+            if formula is not None:
+                engine._safe_eval(formula, CONTEXT)
+
+
+def measure(label, fn):
+    start = time.perf_counter()
+    for _ in range(NUM_REQUESTS):
+        fn()
+    elapsed = time.perf_counter() - start
+    per_request_us = elapsed / NUM_REQUESTS * 1_000_000
+    print(f"{label:<30} total: {elapsed:.3f}s | por request: {per_request_us:.1f} µs")
+    return per_request_us
+
+
+def run_benchmark():
+    engine = CivilProtectionCalculator()
+    print("--- BENCHMARK MOTOR DE REGLAS ---")
+    print(f"Reglas: {len(engine.rules)} | Requests simulados: {NUM_REQUESTS}")
+
+    before = measure("ANTES (eval por string)", lambda: run_legacy(engine.rules))
+    after = measure("DESPUÉS (pre-compilado)", lambda: run_compiled(engine))
+
+    print(f"Speedup: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    run_benchmark()
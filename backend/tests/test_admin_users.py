@@ -0,0 +1,121 @@
+"""
+Tests para /admin/users (UserCRUD: conteo agregado de análisis y paginación keyset)
+Coverage target: > 80%
+"""
+import itertools
+import pytest
+from sqlalchemy import event
+
+from database import User, Analysis, UserCRUD
+from auth import create_access_token
+
+
+_emails = itertools.count()
+
+
+def add_users(db, analyses_per_user: list) -> list:
+    users = [User(email=f"perito{next(_emails)}@example.com", name=f"Perito {i}", password_hash="x",
+                  role="admin" if i == 0 else "consultor", is_active=1)
+             for i in range(len(analyses_per_user))]
+    db.add_all(users)
+    db.commit()
+    for user, count in zip(users, analyses_per_user):
+        db.add_all([Analysis(user_id=user.id, municipio="Zapopan", estado="Jalisco", tipo_inmueble="Oficina",
+                             input_data={}, report_data={}) for _ in range(count)])
+    db.commit()
+    return users
+
+
+def count_selects(db, fn):
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        result = fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return result, len(statements)
+
+
+# ==================== CLASE 1: TEST CONSULTA AGREGADA ====================
+
+@pytest.mark.database
+@pytest.mark.unit
+class TestListUsersWithCounts:
+    """Tests de UserCRUD.list_users_with_counts"""
+
+    def test_counts_in_single_query(self, test_db):
+        """Test conteos correctos (incluye usuarios sin análisis) con una sola consulta"""
+        add_users(test_db, [3, 0, 5, 1])
+
+        rows, queries = count_selects(test_db, lambda: UserCRUD.list_users_with_counts(test_db, limit=10))
+
+        assert queries == 1
+        assert [row.analyses_count for row in rows] == [3, 0, 5, 1]
+        assert [row.id for row in rows] == sorted(row.id for row in rows)
+
+    def test_keyset_and_offset_pages_match(self, test_db):
+        """Test que recorrer con after_id da las mismas páginas que con offset"""
+        add_users(test_db, [1, 2, 3, 4, 5, 6, 7])
+
+        keyset, after_id = [], None
+        while True:
+            rows = UserCRUD.list_users_with_counts(test_db, limit=3, after_id=after_id)
+            keyset.extend(rows)
+            if len(rows) < 3:
+                break
+            after_id = rows[-1].id
+        by_offset = [row for offset in (0, 3, 6) for row in UserCRUD.list_users_with_counts(test_db, limit=3, offset=offset)]
+
+        assert [tuple(row) for row in keyset] == [tuple(row) for row in by_offset]
+        assert [row.analyses_count for row in keyset] == [1, 2, 3, 4, 5, 6, 7]
+
+    def test_total_is_cached(self, test_db):
+        """Test que el total se reutiliza dentro del TTL y se recalcula al invalidar"""
+        add_users(test_db, [0, 0])
+
+        assert UserCRUD.count_users(test_db) == 2
+        add_users(test_db, [0])
+        _, queries = count_selects(test_db, lambda: UserCRUD.count_users(test_db))
+        assert queries == 0
+
+        UserCRUD.invalidate_total()
+        assert UserCRUD.count_users(test_db) == 3
+
+
+# ==================== CLASE 2: TEST ENDPOINT ====================
+
+@pytest.mark.api
+@pytest.mark.integration
+class TestAdminUsersEndpoint:
+    """Tests de GET /admin/users"""
+
+    def test_cursor_pagination(self, client, test_db, monkeypatch):
+        """Test next_after_id, include_total y formato de la respuesta"""
+        import main
+        monkeypatch.setattr(main, "SessionLocal", lambda: test_db)
+        monkeypatch.setattr(test_db, "close", lambda: None)
+        users = add_users(test_db, [2, 0, 1])
+        headers = {"Authorization": f"Bearer {create_access_token({'sub': str(users[0].id)})}"}
+
+        first = client.get("/admin/users?limit=2", headers=headers).json()
+        second = client.get(f"/admin/users?limit=2&after_id={first['next_after_id']}&include_total=false",
+                            headers=headers).json()
+
+        assert first["status"] == "success"
+        assert first["total"] == 3
+        assert [u["analyses_count"] for u in first["users"]] == [2, 0]
+        assert first["next_after_id"] == users[1].id
+        assert second["total"] is None
+        assert [u["id"] for u in second["users"]] == [users[2].id]
+        assert second["next_after_id"] is None
+
+
+# ==================== RUN ALL TESTS ====================
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--cov=database", "--cov-report=term-missing"])
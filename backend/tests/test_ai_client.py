@@ -0,0 +1,258 @@
+"""
+Tests para ai_client.py (contra un servidor stub local de Chat Completions)
+Coverage target: > 80%
+"""
+import pytest
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import ai_client as client_module
+from ai_client import AsyncAIClient, AIClientError
+from ai_service import AIService
+from llm_cache import LLMCache
+
+
+# ==================== SERVIDOR STUB ====================
+
+class StubOpenAI:
+    """
+    Servidor HTTP local que imita POST /v1/chat/completions.
+
+    Atributos configurables: delay (seg), fail_first (n respuestas 503 iniciales), content
+    """
+
+    def __init__(self):
+        self.delay = 0.0
+        self.fail_first = 0
+        self.content = "Respuesta del stub"
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                stub.requests.append({"path": self.path, "body": body, "auth": self.headers.get("Authorization")})
+                time.sleep(stub.delay)
+                if stub.fail_first > 0:
+                    stub.fail_first -= 1
+                    self.send_response(503)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                payload = json.dumps({
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": stub.content}}]
+                }).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub():
+    server = StubOpenAI()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def client(stub, monkeypatch):
+    """Cliente apuntando al stub, sin esperas de backoff"""
+    monkeypatch.setattr(client_module, "AI_BACKOFF_BASE", 0.0)
+    ai = AsyncAIClient(base_url=stub.url, api_key="sk-stub", read_timeout=2, max_retries=2)
+    yield ai
+    ai.close()
+
+
+# ==================== CLASE 1: TEST LLAMADAS ====================
+
+@pytest.mark.unit
+class TestChatCompletions:
+    """Tests de llamadas, reintentos y timeouts"""
+
+    def test_chat_returns_content(self, client, stub):
+        """Test llamada exitosa (ruta, auth y payload)"""
+        content = client.run(client.chat([{"role": "user", "content": "hola"}], max_tokens=10, label="prueba"))
+
+        assert content == "Respuesta del stub"
+        assert stub.requests[0]["path"] == "/v1/chat/completions"
+        assert stub.requests[0]["auth"] == "Bearer sk-stub"
+        assert stub.requests[0]["body"]["max_tokens"] == 10
+
+    def test_retries_on_503(self, client, stub):
+        """Test reintento ante 5xx hasta obtener respuesta"""
+        stub.fail_first = 2
+
+        assert client.run(client.chat([], label="prueba")) == "Respuesta del stub"
+        assert len(stub.requests) == 3
+        assert client.stats()["prueba"]["retries"] == 2
+
+    def test_gives_up_after_max_retries(self, client, stub):
+        """Test error definitivo cuando se agotan los reintentos"""
+        stub.fail_first = 10
+
+        with pytest.raises(AIClientError):
+            client.run(client.chat([], label="prueba"))
+        assert len(stub.requests) == 3
+        assert client.stats()["prueba"]["errors"] == 1
+
+    def test_read_timeout(self, stub, monkeypatch):
+        """Test que una respuesta lenta respeta el timeout de lectura"""
+        monkeypatch.setattr(client_module, "AI_BACKOFF_BASE", 0.0)
+        stub.delay = 1.0
+        ai = AsyncAIClient(base_url=stub.url, api_key="sk-stub", read_timeout=0.2, max_retries=0)
+
+        start = time.time()
+        with pytest.raises(AIClientError, match="Timeout"):
+            ai.run(ai.chat([]))
+        assert time.time() - start < 0.9
+        ai.close()
+
+    def test_latency_recorded_per_label(self, client, stub):
+        """Test métricas de latencia por tipo de llamada"""
+        stub.delay = 0.05
+        client.run(client.chat([], label="a"))
+        client.run(client.chat([], label="a"))
+        client.run(client.chat([], label="b"))
+
+        stats = client.stats()
+        assert stats["a"]["calls"] == 2
+        assert stats["b"]["calls"] == 1
+        assert stats["a"]["avg_ms"] >= 50
+
+
+# ==================== CLASE 2: TEST FAN-OUT EN AIService ====================
+
+@pytest.mark.integration
+class TestAIServiceFanOut:
+    """Tests de AIService sobre el cliente asíncrono"""
+
+    @pytest.fixture
+    def service(self, client, monkeypatch):
+        monkeypatch.setenv("OPENAI_API_KEY", "sk-stub")
+        return AIService(client=client)
+
+    def test_sections_run_concurrently(self, service, stub):
+        """Test que justificación y enriquecimiento se piden en paralelo"""
+        stub.delay = 0.4
+        stub.content = json.dumps([{"capitulo": "Datos Administrativos", "items": []}])
+        data = {"estado": "Jalisco", "municipio": "Guadalajara", "tipo_inmueble": "Oficina", "m2_construccion": 500}
+
+        start = time.time()
+        justificacion, estructura = service.generate_report_sections(data, [{"capitulo": "Base", "items": []}])
+
+        # En serie tomaría >= 0.8s
+        assert time.time() - start < 0.75
+        assert len(stub.requests) == 2
+        assert estructura == [{"capitulo": "Datos Administrativos", "items": []}]
+        assert justificacion == stub.content
+
+    def test_fallback_when_api_down(self, service, stub):
+        """Test que sin respuesta de la IA se usa el texto jurídico determinista"""
+        stub.fail_first = 10
+        data = {"estado": "Jalisco", "municipio": "Guadalajara", "trabajadores": 30}
+
+        justificacion, estructura = service.generate_report_sections(data)
+
+        assert "ARTÍCULO 24 DE LA LEY DEL SISTEMA ESTATAL DE PROTECCIÓN CIVIL DE JALISCO" in justificacion
+        assert estructura is None
+
+
+# ==================== CLASE 3: TEST CACHÉ DE RESPUESTAS ====================
+
+@pytest.mark.integration
+class TestCachedCalls:
+    """Tests del cliente con caché persistente de respuestas"""
+
+    @pytest.fixture
+    def cached_client(self, stub, tmp_path, monkeypatch):
+        monkeypatch.setattr(client_module, "AI_BACKOFF_BASE", 0.0)
+        cache = LLMCache(db_path=str(tmp_path / "llm_cache.sqlite"), ttl_seconds=60, stale_ttl_seconds=60)
+        ai = AsyncAIClient(base_url=stub.url, api_key="sk-stub", max_retries=0, cache=cache)
+        yield ai
+        ai.close()
+
+    def test_repeated_prompt_served_from_cache(self, cached_client, stub):
+        """Test que el mismo prompt no vuelve a llamar a la API"""
+        call = lambda: cached_client.run(cached_client.chat([{"role": "user", "content": "hola"}], label="prueba"))
+
+        assert call() == "Respuesta del stub"
+        assert call() == "Respuesta del stub"
+        assert len(stub.requests) == 1
+        assert cached_client.cache.stats()["methods"]["prueba"]["hits"] == 1
+
+    def test_invalid_response_not_cached(self, cached_client, stub):
+        """Test que validate=False evita guardar respuestas inutilizables"""
+        call = lambda: cached_client.run(cached_client.chat([], label="prueba", validate=lambda c: False))
+        call()
+        call()
+
+        assert len(stub.requests) == 2
+
+    def test_stale_served_and_refreshed(self, cached_client, stub):
+        """Test stale-while-revalidate: se sirve la entrada vencida y se refresca en background"""
+        cache = cached_client.cache
+        messages = [{"role": "user", "content": "hola"}]
+        key = cache.make_key("gpt-3.5-turbo", None, None, messages)
+        cache.put(key, "Respuesta vieja", "prueba")
+        cache.ttl_seconds = -1  # Todo lo guardado queda vencido (pero dentro de la ventana stale)
+
+        assert cached_client.run(cached_client.chat(messages, label="prueba")) == "Respuesta vieja"
+
+        deadline = time.time() + 2
+        while len(stub.requests) < 1 and time.time() < deadline:
+            time.sleep(0.02)
+        time.sleep(0.1)
+        cache.ttl_seconds = 60
+        assert cache.get(key) == ("Respuesta del stub", False)
+
+    def test_cache_io_off_event_loop(self, cached_client, stub):
+        """Test que get/put de SQLite no corren en el thread del loop (no frenan el fan-out)"""
+        import asyncio
+        cache = cached_client.cache
+        threads = []
+        get, put = cache.get, cache.put
+
+        def slow_get(*args):
+            threads.append(threading.current_thread().name)
+            time.sleep(0.3)
+            return get(*args)
+
+        def tracked_put(*args):
+            threads.append(threading.current_thread().name)
+            return put(*args)
+
+        cache.get, cache.put = slow_get, tracked_put
+
+        async def fan_out():
+            return await asyncio.gather(*[
+                cached_client.chat([{"role": "user", "content": f"sección {i}"}], label="prueba") for i in range(3)
+            ])
+
+        start = time.perf_counter()
+        assert cached_client.run(fan_out()) == ["Respuesta del stub"] * 3
+        elapsed = time.perf_counter() - start
+
+        assert len(threads) == 6
+        assert "ai-client-loop" not in threads
+        assert elapsed < 0.8  # Las 3 búsquedas se solapan (en serie serían ≥ 0.9 s)
+
+
+# ==================== RUN ALL TESTS ====================
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--cov=ai_client", "--cov-report=term-missing"])
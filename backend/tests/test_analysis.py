@@ -77,6 +77,65 @@ def test_nuevo_leon_specificity():
     assert "Art. 18" in responsiva["fundamento"], "El fundamento debe ser Art. 18"
     print("    > PASSED")
 
+def test_legal_tree_memoized_read_only():
+    """
+    PERF: El árbol normativo se memoiza; el contenido compartido no se puede corromper.
+    """
+    print(f"[*] Ejecutando: test_legal_tree_memoized_read_only...")
+    import copy
+    profile = {"estado": "Jalisco", "municipio": "Local", "has_pool": True}
+    noms = get_applicable_noms(profile)
+    
+    # Reasignar claves de un nivel (como hace /analyze con la guía) está permitido
+    guide = next(n for n in noms if n.get("is_pipc_guide"))
+    guide["titulo"] += " (AMPLIADO POR IA)"
+    guide["guide_content"] = []
+    
+    # Mutar el contenido anidado compartido NO
+    try:
+        noms[3]["checks"].append({"id": "X"})
+        assert False, "El contenido anidado debe ser de solo lectura"
+    except TypeError:
+        pass
+    
+    # La siguiente llamada no ve los cambios y deepcopy devuelve estructuras mutables
+    fresh = get_applicable_noms(profile)
+    fresh_guide = next(n for n in fresh if n.get("is_pipc_guide"))
+    assert "AMPLIADO" not in fresh_guide["titulo"]
+    assert fresh_guide["guide_content"], "La guía en caché no debe perderse"
+    editable = copy.deepcopy(fresh)
+    editable[3]["checks"].append({"id": "X"})
+    print("    > PASSED")
+
+def test_legal_tree_invalidated_on_state_change(tmp_path, monkeypatch):
+    """
+    PERF: La caché del árbol se invalida cuando cambia el archivo del estado.
+    """
+    print(f"[*] Ejecutando: test_legal_tree_invalidated_on_state_change...")
+    import json
+    import noms_library
+    states_dir = tmp_path / "data" / "states_db"
+    states_dir.mkdir(parents=True)
+    state_file = states_dir / "estado_prueba.json"
+    
+    def write_state(reglamento):
+        state_file.write_text(json.dumps({
+            "state_law": {},
+            "municipios": {"Centro": {"reglamento": reglamento, "art_inspeccion": "Art. 1"}}
+        }), encoding="utf-8")
+    
+    monkeypatch.setattr(noms_library, "BASE_DIR", str(tmp_path))
+    profile = {"estado": "Estado Prueba", "municipio": "Centro"}
+    
+    write_state("Reglamento A")
+    municipal = get_applicable_noms(profile)[2]
+    assert municipal["checks"][0]["desc"] == "Reglamento A"
+    
+    write_state("Reglamento B (reformado)")
+    municipal = get_applicable_noms(profile)[2]
+    assert municipal["checks"][0]["desc"] == "Reglamento B (reformado)"
+    print("    > PASSED")
+
 if __name__ == "__main__":
     print("\n=== INICIANDO SUITE DE PRUEBAS DE EXPERTO LEGAL (QA) ===")
     print("Objetivo: Verificar que el sistema use leyes reales por estado.\n")
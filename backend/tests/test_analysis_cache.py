@@ -0,0 +1,198 @@
+"""
+Tests para analysis_cache.py
+Coverage target: > 80%
+"""
+import pytest
+from analysis_cache import AnalysisCache
+
+
+# ==================== FIXTURES ESPECÍFICAS ====================
+
+@pytest.fixture
+def cache():
+    """
+    Fixture de caché solo en memoria.
+
+    Returns:
+        AnalysisCache: Caché vacía (máx. 2 entradas)
+    """
+    return AnalysisCache(max_entries=2, ttl_seconds=60, db_path="")
+
+
+@pytest.fixture
+def report():
+    """Reporte mínimo de análisis"""
+    return {
+        "resumen_ejecutivo": {"total_brigadistas": 3},
+        "presupuesto_inicial": [{"concepto": "Extintor PQS", "total": 1200.0}]
+    }
+
+
+# ==================== CLASE 1: TEST LLAVE CANÓNICA ====================
+
+@pytest.mark.unit
+class TestCacheKey:
+    """Tests de la llave content-addressed"""
+
+    def test_key_ignores_dict_order(self):
+        """Test que el orden de las llaves no cambia el hash"""
+        a = {"municipio": "Guadalajara", "estado": "Jalisco", "m2_construccion": 500.0}
+        b = {"m2_construccion": 500.0, "estado": "Jalisco", "municipio": "Guadalajara"}
+
+        assert AnalysisCache.make_key(a, "r1", "l1") == AnalysisCache.make_key(b, "r1", "l1")
+
+    def test_key_changes_with_versions(self):
+        """Test que cambiar reglas o marco legal invalida la llave"""
+        data = {"municipio": "Guadalajara", "m2_construccion": 500.0}
+        base = AnalysisCache.make_key(data, "r1", "l1")
+
+        assert AnalysisCache.make_key(data, "r2", "l1") != base
+        assert AnalysisCache.make_key(data, "r1", "l2") != base
+        assert AnalysisCache.make_key(dict(data, m2_construccion=501.0), "r1", "l1") != base
+
+
+# ==================== CLASE 2: TEST LRU / TTL / MÉTRICAS ====================
+
+@pytest.mark.unit
+class TestCacheBehavior:
+    """Tests de hits, misses y eviction"""
+
+    def test_miss_then_hit(self, cache, report):
+        """Test miss inicial y hit después de guardar"""
+        assert cache.get("k1") is None
+        cache.put("k1", report)
+
+        entry = cache.get("k1")
+        assert entry["report"] == report
+
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == 0.5
+
+    def test_returns_copies(self, cache, report):
+        """Test que mutar el resultado no altera la caché"""
+        cache.put("k1", report)
+        cache.get("k1")["report"]["resumen_ejecutivo"]["total_brigadistas"] = 99
+
+        assert cache.get("k1")["report"]["resumen_ejecutivo"]["total_brigadistas"] == 3
+
+    def test_lru_eviction(self, cache, report):
+        """Test que se descarta la entrada menos usada"""
+        cache.put("k1", report)
+        cache.put("k2", report)
+        cache.get("k1")          # k1 pasa a ser la más reciente
+        cache.put("k3", report)  # desaloja k2
+
+        assert cache.get("k2") is None
+        assert cache.get("k1") is not None
+        assert cache.stats()["evictions"] == 1
+
+    def test_ttl_expiration(self, report):
+        """Test que las entradas expiran"""
+        cache = AnalysisCache(max_entries=10, ttl_seconds=-1, db_path="")
+        cache.put("k1", report)
+
+        assert cache.get("k1") is None
+
+
+# ==================== CLASE 3: TEST RESPALDO SQLITE ====================
+
+@pytest.mark.integration
+class TestCachePersistence:
+    """Tests del respaldo en disco"""
+
+    def test_survives_new_instance(self, report, tmp_path):
+        """Test que otra instancia (otro worker / reinicio) lee la entrada"""
+        db_path = str(tmp_path / "cache.sqlite")
+        AnalysisCache(db_path=db_path).put("k1", report)
+
+        other = AnalysisCache(db_path=db_path)
+        entry = other.get("k1")
+
+        assert entry["report"] == report
+        assert other.stats()["persistent"] is True
+
+    def test_clear(self, report, tmp_path):
+        """Test limpiar memoria y disco"""
+        cache = AnalysisCache(db_path=str(tmp_path / "cache.sqlite"))
+        cache.put("k1", report)
+        cache.clear()
+
+        assert cache.get("k1") is None
+
+    def test_connections_closed(self, report, tmp_path, monkeypatch):
+        """Test que cada operación cierra su conexión (no solo hace commit)"""
+        import sqlite3
+        opened = []
+        connect = sqlite3.connect
+
+        def tracking_connect(*args, **kwargs):
+            conn = connect(*args, **kwargs)
+            opened.append(conn)
+            return conn
+
+        monkeypatch.setattr(sqlite3, "connect", tracking_connect)
+        cache = AnalysisCache(db_path=str(tmp_path / "cache.sqlite"))
+        cache.put("k1", report)
+        AnalysisCache(db_path=cache.db_path).get("k1")
+        cache.clear()
+
+        assert len(opened) == 5
+        for conn in opened:
+            with pytest.raises(sqlite3.ProgrammingError):
+                conn.execute("SELECT 1")
+
+
+# ==================== CLASE 4: TEST INTEGRACIÓN CON /analyze ====================
+
+@pytest.mark.integration
+class TestPdfNotReused:
+    """Tests de que la caché reutiliza el reporte pero no el PDF (lleva fecha de generación)"""
+
+    def test_cache_hit_renders_new_pdf(self, monkeypatch):
+        """Test que un segundo análisis idéntico sale de caché y aun así renderiza su propio PDF"""
+        import main
+        from concurrent.futures import Future
+        from blob_store import NullBlobStore
+        from render_queue import RenderQueue
+
+        class FakeAI:
+            def generate_report_sections(self, data, base_structure):
+                return "Justificación legal de prueba", base_structure
+
+            def check_normative_updates(self, estado):
+                return []
+
+        rendered = []
+
+        def fake_submit(input_dict, report, wait=0):
+            rendered.append(report)
+            future = Future()
+            future.set_result(b"%PDF")
+            return future
+
+        cache, queue = AnalysisCache(db_path=""), RenderQueue(max_workers=1)
+        monkeypatch.setattr(main, "analysis_cache", cache)
+        monkeypatch.setattr(main, "render_queue", queue)
+        monkeypatch.setattr(main, "blob_store", NullBlobStore())
+        monkeypatch.setattr(main.pdf_renderer, "submit", fake_submit)
+        data = main.AnalysisRequest(tipo_inmueble="Oficina", m2_construccion=800, niveles=2, aforo=60,
+                                    aforo_autorizado=60, trabajadores=20, municipio="Zapopan", estado="Jalisco")
+
+        jobs = []
+        for i in range(2):
+            input_dict, full_report = main._build_full_report(data, FakeAI())
+            jobs.append(main._enqueue_pdf(input_dict, full_report, f"Dictamen_cache_{i}.pdf", owner_id=1))
+
+        assert cache.stats()["hits"] == 1
+        assert len(rendered) == 2
+        for job in jobs:
+            assert queue.wait(job["job_id"], timeout=10)["pdf"] == b"%PDF"
+        queue.shutdown()
+
+
+# ==================== RUN ALL TESTS ====================
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--cov=analysis_cache", "--cov-report=term-missing"])
@@ -225,6 +225,106 @@ class TestAuthFlow:
             assert "access_token" in refresh_response.json()
 
 
+# ==================== CLASE 2B: TEST ENDPOINT /analyze/batch ====================
+
+@pytest.mark.api
+@pytest.mark.integration
+class TestAnalyzeBatchEndpoint:
+    """Tests del endpoint POST /analyze/batch (NDJSON en streaming)"""
+    
+    @pytest.fixture(autouse=True)
+    def no_rate_limit(self, monkeypatch):
+        """Cada test reinicia los ids de usuario: el límite de 5/hora por usuario cruzaría tests"""
+        from rate_limit_config import limiter
+        monkeypatch.setattr(limiter, "enabled", False)
+    
+    def test_batch_requires_auth(self, client, valid_analysis_data):
+        """Test que /analyze/batch requiere autenticación"""
+        response = client.post("/analyze/batch", json={"items": [valid_analysis_data]})
+        assert response.status_code == 401
+    
+    def test_batch_rejects_empty(self, client, db_auth_headers):
+        """Test lote vacío (debe fallar 400)"""
+        response = client.post("/analyze/batch", json={"items": []}, headers=db_auth_headers)
+        assert response.status_code == 400
+    
+    def test_batch_streams_results_and_summary(self, client, test_db, db_user, db_auth_headers):
+        """Test una línea por inmueble + resumen final"""
+        import json
+        
+        item = {
+            "tipo_inmueble": "Oficina",
+            "m2_construccion": 1500.0,
+            "niveles": 3,
+            "aforo": 250,
+            "aforo_autorizado": 250,
+            "trabajadores": 40,
+            "municipio": "Guadalajara",
+            "estado": "Jalisco"
+        }
+        items = [item, dict(item, m2_construccion=5000.0)]
+        response = client.post("/analyze/batch", json={"items": items}, headers=db_auth_headers)
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        
+        lines = [json.loads(line) for line in response.text.splitlines() if line]
+        results = [line for line in lines if line["type"] == "result"]
+        summary = lines[-1]
+        
+        assert sorted(r["index"] for r in results) == [0, 1]
+        assert all(r["status"] == "success" for r in results)
+        assert all(r["pdf_filename"] is None for r in results)
+        assert summary["type"] == "summary"
+        assert summary["total"] == 2
+        assert summary["succeeded"] == 2
+        assert summary["saved"] == 2
+        
+        # Bulk insert con la sesión del request (get_db)
+        from database import Analysis
+        saved = test_db.query(Analysis).filter(Analysis.user_id == db_user["user_id"]).all()
+        assert sorted(a.id for a in saved) == sorted(summary["saved_ids"])
+        assert sorted(a.input_data["m2_construccion"] for a in saved) == [1500.0, 5000.0]
+    
+    def test_batch_saves_processed_items_on_disconnect(self, test_db, monkeypatch):
+        """Test que si el cliente corta el stream se guarda lo ya procesado y no se arrancan más inmuebles"""
+        import json
+        import threading
+        import main
+        from database import User, Analysis
+        
+        started, release = threading.Event(), threading.Event()
+        
+        def fake_report(item, ai):
+            if item.municipio != "Zapopan":
+                started.set()
+                release.wait(10)
+            return item.dict(), {"municipio": item.municipio}
+        
+        monkeypatch.setattr(main, "StreamingResponse", lambda content, media_type: content)
+        monkeypatch.setattr(main, "BATCH_MAX_WORKERS", 1)
+        monkeypatch.setattr(main, "_build_full_report", fake_report)
+        user = User(email="perito@example.com", name="Perito", password_hash="x", role="consultor", is_active=1)
+        test_db.add(user)
+        test_db.commit()
+        
+        base = {"tipo_inmueble": "Oficina", "m2_construccion": 1500.0, "niveles": 3, "aforo": 250,
+                "aforo_autorizado": 250, "trabajadores": 40, "estado": "Jalisco"}
+        batch = main.BatchAnalysisRequest(items=[
+            dict(base, municipio=municipio) for municipio in ("Zapopan", "Guadalajara", "Tlaquepaque")
+        ])
+        stream = main.analyze_batch_endpoint(request=None, batch=batch, current_user=user, db=test_db)
+        
+        first = json.loads(next(stream))
+        assert started.wait(10)
+        threading.Timer(0.2, release.set).start()
+        stream.close()  # Desconexión: Tlaquepaque sigue en cola y se cancela
+        
+        saved = test_db.query(Analysis.municipio).filter(Analysis.user_id == user.id).all()
+        assert first["data"]["municipio"] == "Zapopan"
+        assert sorted(row.municipio for row in saved) == ["Guadalajara", "Zapopan"]
+
+
 # ==================== CLASE 3: TEST ENDPOINT PROTECTION ====================
 
 @pytest.mark.security
@@ -0,0 +1,245 @@
+"""
+Tests para auth/dependencies.py (dependency de autenticación sin bloquear el event loop),
+auth/principal_cache.py (caché del usuario autenticado) y auth/token_context.py
+(verificación del JWT una vez por request)
+Coverage target: > 80%
+"""
+import time
+import asyncio
+import threading
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from starlette.requests import Request
+from sqlalchemy import event
+
+from database import User
+from auth import create_access_token
+from auth.dependencies import get_current_user
+from auth.principal_cache import PrincipalCache, principal_cache
+from auth.token_context import VerifiedTokenCache, bearer_token, request_claims
+from rate_limit_config import get_user_identifier
+
+
+def bearer(token: str) -> HTTPAuthorizationCredentials:
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+
+def make_request(authorization: str = None) -> Request:
+    headers = [(b"authorization", authorization.encode())] if authorization else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers,
+                    "client": ("10.0.0.1", 1234)})
+
+
+def authenticate(token: str, db) -> User:
+    return asyncio.run(get_current_user(make_request(f"Bearer {token}"), bearer(token), db))
+
+
+def count_queries(db, fn):
+    queries = []
+
+    def record(*args):
+        queries.append(args[2])
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return len(queries)
+
+
+def add_user(db, is_active: int = 1) -> User:
+    user = User(email=f"perito{is_active}@example.com", name="Perito", password_hash="x",
+                role="consultor", is_active=is_active)
+    db.add(user)
+    db.commit()
+    return user
+
+
+# ==================== CLASE 1: TEST GET_CURRENT_USER ====================
+
+@pytest.mark.auth
+@pytest.mark.unit
+class TestGetCurrentUser:
+    """Tests de la dependency get_current_user"""
+
+    def test_valid_token(self, test_db):
+        """Test token válido: devuelve el usuario"""
+        user = add_user(test_db)
+        token = create_access_token({"sub": str(user.id)})
+
+        current = authenticate(token, test_db)
+
+        assert current.id == user.id
+
+    def test_query_runs_off_event_loop(self, test_db):
+        """Test que la consulta SQL no se ejecuta en el hilo del event loop"""
+        user = add_user(test_db)
+        token = create_access_token({"sub": str(user.id)})
+        query_threads = []
+
+        def record_thread(*args):
+            query_threads.append(threading.get_ident())
+
+        engine = test_db.get_bind()
+        event.listen(engine, "before_cursor_execute", record_thread)
+        try:
+            authenticate(token, test_db)
+        finally:
+            event.remove(engine, "before_cursor_execute", record_thread)
+
+        assert query_threads
+        assert threading.get_ident() not in query_threads
+
+    def test_invalid_token_and_unknown_user(self, test_db):
+        """Test token inválido y usuario inexistente: 401"""
+        for token in ["no-es-un-jwt", create_access_token({"sub": "999"})]:
+            with pytest.raises(HTTPException) as error:
+                authenticate(token, test_db)
+            assert error.value.status_code == 401
+
+    def test_inactive_user(self, test_db):
+        """Test usuario desactivado: 403"""
+        user = add_user(test_db, is_active=0)
+        token = create_access_token({"sub": str(user.id)})
+
+        with pytest.raises(HTTPException) as error:
+            authenticate(token, test_db)
+
+        assert error.value.status_code == 403
+
+
+    def test_cached_principal_skips_query(self, test_db):
+        """Test que el segundo request del mismo usuario no consulta `users`"""
+        user = add_user(test_db)
+        token = create_access_token({"sub": str(user.id)})
+
+        assert count_queries(test_db, lambda: authenticate(token, test_db)) == 1
+        assert count_queries(test_db, lambda: authenticate(token, test_db)) == 0
+        assert authenticate(token, test_db).email == user.email
+
+    def test_invalidation_applies_immediately(self, test_db):
+        """Test que desactivar al usuario se refleja sin esperar el TTL"""
+        user = add_user(test_db)
+        token = create_access_token({"sub": str(user.id)})
+        authenticate(token, test_db)
+
+        user.is_active = 0
+        test_db.commit()
+        principal_cache.invalidate(user.id)
+
+        with pytest.raises(HTTPException) as error:
+            authenticate(token, test_db)
+        assert error.value.status_code == 403
+
+
+# ==================== CLASE 2: TEST CACHÉ DE PRINCIPALES ====================
+
+@pytest.mark.auth
+@pytest.mark.unit
+class TestPrincipalCache:
+    """Tests de PrincipalCache (TTL, copias y versión compartida)"""
+
+    def test_hit_returns_fresh_copy(self):
+        """Test que cada hit es un User nuevo con las mismas columnas"""
+        cache = PrincipalCache(ttl_seconds=60)
+        user = User(id=7, email="a@b.com", name="A", role="admin", is_active=1, created_at=None)
+        cache.put(user, cache.version(7))
+
+        first, second = cache.get(7), cache.get(7)
+
+        assert first is not second and first is not user
+        assert (first.id, first.role, first.email) == (7, "admin", "a@b.com")
+        assert cache.stats()["hits"] == 2
+
+    def test_ttl_expiry(self):
+        """Test que una entrada vencida obliga a consultar de nuevo"""
+        cache = PrincipalCache(ttl_seconds=0.01)
+        cache.put(User(id=1, email="a@b.com", name="A", role="cliente", is_active=1), cache.version(1))
+        time.sleep(0.02)
+
+        assert cache.get(1) is None
+
+    def test_invalidated_while_loading_is_not_stored(self):
+        """Test carrera: invalidación entre la consulta y el put"""
+        cache = PrincipalCache(ttl_seconds=60)
+        version = cache.version(1)
+        cache.invalidate(1)
+        cache.put(User(id=1, email="a@b.com", name="A", role="admin", is_active=1), version)
+
+        assert cache.get(1) is None
+
+    def test_shared_invalidation_between_workers(self, tmp_path):
+        """Test que la invalidación en un worker se ve en otro (SQLite compartido)"""
+        db_path = str(tmp_path / "principals.db")
+        worker_a, worker_b = PrincipalCache(ttl_seconds=60, db_path=db_path), PrincipalCache(ttl_seconds=60, db_path=db_path)
+        user = User(id=3, email="a@b.com", name="A", role="admin", is_active=1)
+        worker_b.put(user, worker_b.version(3))
+        assert worker_b.get(3) is not None
+
+        worker_a.invalidate(3)
+
+        assert worker_b.get(3) is None
+        assert worker_b.stats()["shared_invalidation"]
+
+
+# ==================== CLASE 3: TEST CONTEXTO DEL TOKEN ====================
+
+@pytest.mark.auth
+@pytest.mark.unit
+class TestTokenContext:
+    """Tests de la verificación única del JWT por request"""
+
+    def test_verified_token_cache(self):
+        """Test que el segundo uso del mismo token no se vuelve a verificar"""
+        cache = VerifiedTokenCache()
+        token = create_access_token({"sub": "5"})
+
+        assert cache.verify(token)["sub"] == "5"
+        assert cache.verify(token)["sub"] == "5"
+        assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+    def test_invalid_and_expired_tokens_are_not_served(self, monkeypatch):
+        """Test tokens inválidos o vencidos (no se guardan) y entradas que vencen en caché"""
+        from datetime import timedelta
+        from auth import token_context
+        cache = VerifiedTokenCache()
+
+        assert cache.verify("no-es-un-jwt") is None
+        assert cache.verify(create_access_token({"sub": "5"}, expires_delta=timedelta(seconds=-10))) is None
+        assert cache.stats()["entries"] == 0
+
+        token = create_access_token({"sub": "5"})
+        exp = cache.verify(token)["exp"]
+        monkeypatch.setattr(token_context.time, "time", lambda: exp + 1)
+        cache.verify(token)  # Vencida en caché: se descarta y se verifica de nuevo
+
+        assert cache.stats()["hits"] == 0 and cache.stats()["misses"] == 4
+
+    def test_claims_resolved_once_per_request(self):
+        """Test que limiter y dependency comparten los claims del mismo request"""
+        token = create_access_token({"sub": "9"})
+        request = make_request(f"Bearer {token}")
+
+        assert get_user_identifier(request) == "user:9"
+        claims = request.state.token_claims
+        assert request_claims(request) is claims
+
+    def test_identifier_falls_back_to_ip(self):
+        """Test sin token o con token inválido: llave por IP"""
+        assert get_user_identifier(make_request()) == "ip:10.0.0.1"
+        assert get_user_identifier(make_request("Bearer basura")) == "ip:10.0.0.1"
+
+    def test_bearer_scheme_case_insensitive(self):
+        """Test que el esquema se lee igual que HTTPBearer"""
+        assert bearer_token("bearer abc") == "abc"
+        assert bearer_token("Basic abc") is None
+        assert bearer_token(None) is None
+
+
+# ==================== RUN ALL TESTS ====================
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--cov=auth.dependencies", "--cov=auth.principal_cache", "--cov=auth.token_context", "--cov-report=term-missing"])
@@ -0,0 +1,194 @@
+"""
+Tests para blob_store.py (directorio local y bucket S3-compatible contra un stub local)
+Coverage target: > 80%
+"""
+import pytest
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from blob_store import LocalBlobStore, S3BlobStore, NullBlobStore, create_blob_store, iter_bytes
+
+
+PDF = b"%PDF-1.4 " + bytes(range(256)) * 1000
+
+
+# ==================== SERVIDOR STUB ====================
+
+class StubS3:
+    """Bucket en memoria que responde PUT/GET/HEAD/DELETE path-style (/bucket/llave)."""
+
+    def __init__(self):
+        self.objects = {}
+        self.auth = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, code, body=b""):
+                self.send_response(code)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(body)
+
+            def do_PUT(self):
+                stub.auth.append(self.headers.get("Authorization"))
+                stub.objects[self.path] = self.rfile.read(int(self.headers["Content-Length"]))
+                self._reply(200)
+
+            def do_GET(self):
+                if self.path not in stub.objects:
+                    return self._reply(404)
+                self._reply(200, stub.objects[self.path])
+
+            def do_HEAD(self):
+                self._reply(200 if self.path in stub.objects else 404)
+
+            def do_DELETE(self):
+                stub.objects.pop(self.path, None)
+                self._reply(204)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def s3_stub():
+    server = StubS3()
+    yield server
+    server.close()
+
+
+# ==================== CLASE 1: TEST DIRECTORIO LOCAL ====================
+
+@pytest.mark.unit
+class TestLocalBlobStore:
+    """Tests del blob store en directorio local"""
+
+    def test_put_get_stream(self, tmp_path):
+        """Test escritura y lectura completa / por chunks"""
+        store = LocalBlobStore(str(tmp_path / "reports"))
+        store.put("Dictamen_Zapopan_abc.pdf", PDF)
+
+        assert store.exists("Dictamen_Zapopan_abc.pdf")
+        assert store.get("Dictamen_Zapopan_abc.pdf") == PDF
+        assert b"".join(store.stream("Dictamen_Zapopan_abc.pdf", chunk_size=4096)) == PDF
+        assert not list((tmp_path / "reports").glob("*.tmp"))
+
+    def test_missing_and_delete(self, tmp_path):
+        """Test llave inexistente y borrado idempotente"""
+        store = LocalBlobStore(str(tmp_path))
+        store.put("a.pdf", PDF)
+        store.delete("a.pdf")
+        store.delete("a.pdf")
+
+        assert store.get("a.pdf") is None
+        assert store.stream("a.pdf") is None
+        assert not store.exists("a.pdf")
+
+    def test_rejects_paths(self, tmp_path):
+        """Test que la llave no puede salir del directorio"""
+        store = LocalBlobStore(str(tmp_path))
+
+        for key in ["../fuera.pdf", "sub/a.pdf", "..", ""]:
+            with pytest.raises(ValueError):
+                store.put(key, PDF)
+
+
+# ==================== CLASE 2: TEST BUCKET S3-COMPATIBLE ====================
+
+@pytest.mark.integration
+class TestS3BlobStore:
+    """Tests del blob store S3-compatible contra el stub"""
+
+    def test_roundtrip(self, s3_stub):
+        """Test PUT / GET / stream / HEAD / DELETE con token Bearer"""
+        store = S3BlobStore(endpoint=s3_stub.url, bucket="reports", token="tok")
+        store.put("Dictamen_Zapopan_abc.pdf", PDF)
+
+        assert "/reports/Dictamen_Zapopan_abc.pdf" in s3_stub.objects
+        assert s3_stub.auth == ["Bearer tok"]
+        assert store.get("Dictamen_Zapopan_abc.pdf") == PDF
+        assert b"".join(store.stream("Dictamen_Zapopan_abc.pdf")) == PDF
+        assert store.exists("Dictamen_Zapopan_abc.pdf")
+
+        store.delete("Dictamen_Zapopan_abc.pdf")
+        assert store.get("Dictamen_Zapopan_abc.pdf") is None
+        assert store.stream("Dictamen_Zapopan_abc.pdf") is None
+
+    def test_requires_endpoint(self):
+        """Test que sin endpoint se cae a modo solo memoria"""
+        with pytest.raises(ValueError):
+            S3BlobStore(endpoint="")
+
+
+# ==================== CLASE 3: TEST CONFIGURACIÓN / UTILIDADES ====================
+
+@pytest.mark.unit
+class TestBlobStoreConfig:
+    """Tests de selección de backend y troceado en memoria"""
+
+    def test_create_none(self):
+        """Test backend none y desconocido: sin persistencia"""
+        assert isinstance(create_blob_store("none"), NullBlobStore)
+        assert create_blob_store("ftp").persistent is False
+
+    def test_iter_bytes(self):
+        """Test troceado de bytes para StreamingResponse"""
+        chunks = list(iter_bytes(PDF, chunk_size=1000))
+
+        assert b"".join(chunks) == PDF
+        assert max(len(c) for c in chunks) == 1000
+
+
+# ==================== CLASE 4: TEST DESCARGA ====================
+
+@pytest.mark.api
+@pytest.mark.integration
+class TestDownloadFromBlobStore:
+    """Tests de GET /download con el PDF ya movido al blob store"""
+
+    def test_owned_job_without_history_row(self, client, test_db, tmp_path, monkeypatch):
+        """Test que el dueño del job descarga del blob store antes de que exista el registro en historial"""
+        import main
+        from database import User
+        from auth import create_access_token
+        from render_queue import RenderQueue, DONE
+
+        queue = RenderQueue(max_workers=1)
+        monkeypatch.setattr(main, "render_queue", queue)
+        monkeypatch.setattr(main, "blob_store", LocalBlobStore(str(tmp_path)))
+        monkeypatch.setattr("database.SessionLocal", lambda: test_db)
+        monkeypatch.setattr(test_db, "close", lambda: None)
+        owner = User(email="perito@example.com", name="Perito", password_hash="x", role="consultor", is_active=1)
+        other = User(email="otro@example.com", name="Otro", password_hash="x", role="consultor", is_active=1)
+        test_db.add_all([owner, other])
+        test_db.commit()
+
+        job = queue.submit(main._finish_pdf, "Dictamen_Lote_abc.pdf", PDF, "Dictamen_Lote_abc.pdf", owner_id=owner.id)
+        finished = queue.wait(job["job_id"], timeout=10)
+        assert finished["status"] == DONE
+        assert finished["pdf"] is None  # Los bytes quedaron solo en el blob store
+
+        def get(user):
+            token = create_access_token({"sub": str(user.id)})
+            return client.get("/download/Dictamen_Lote_abc.pdf", headers={"Authorization": f"Bearer {token}"})
+
+        response = get(owner)
+        assert response.status_code == 200
+        assert response.content == PDF
+        assert get(other).status_code == 404
+        queue.shutdown()
+
+
+# ==================== RUN ALL TESTS ====================
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--cov=blob_store", "--cov-report=term-missing"])
@@ -5,8 +5,9 @@ Coverage target: > 80%
 import pytest
 import math
 import json
+import os
 from pathlib import Path
-from calculator_engine import CivilProtectionCalculator
+from calculator_engine import CivilProtectionCalculator, CompiledExpression, compile_expression, RuleEngineRegistry
 
 
 # ==================== FIXTURES ESPECÍFICAS ====================
@@ -54,7 +55,6 @@ class TestCalculatorInit:
         assert hasattr(calculator, 'rules_data')
         assert hasattr(calculator, 'constants')
         assert hasattr(calculator, 'rules')
-        assert calculator.output_item_counter == 1
     
     def test_rules_loaded(self, calculator):
         """Test que las reglas se cargan desde JSON"""
@@ -605,6 +605,199 @@ class TestCoverage:
         assert calc.constants == {}
 
 
+# ==================== CLASE 11: TEST COMPILADOR DE REGLAS ====================
+
+@pytest.mark.calculator
+@pytest.mark.unit
+class TestRuleCompiler:
+    """Tests del compilador de expresiones de la matriz de reglas"""
+    
+    def test_rules_compiled_on_load(self, calculator):
+        """Test que cada regla se compila una vez al cargar"""
+        assert len(calculator.compiled_rules) == len(calculator.rules)
+        
+        for rule, trigger, formula in calculator.compiled_rules:
+            assert isinstance(trigger, CompiledExpression)
+            assert trigger.error is None, f"Trigger inválido en {rule['id']}"
+            if formula is not None:
+                assert formula.error is None, f"Fórmula inválida en {rule['id']}"
+    
+    def test_compiled_expression_binds_only_referenced_names(self):
+        """Test que solo se enlazan las variables referenciadas"""
+        expr = CompiledExpression("ceil(m2_construccion / 80)")
+        assert expr.names == ("m2_construccion",)
+        assert expr.evaluate({"m2_construccion": 800, "otro": 1}) == 10
+    
+    def test_compile_expression_is_cached(self):
+        """Test que la misma expresión no se re-parsea"""
+        assert compile_expression("niveles >= 3") is compile_expression("niveles >= 3")
+    
+    def test_dunder_access_rejected_at_compile_time(self):
+        """Test que el acceso a dunders se rechaza al compilar"""
+        assert CompiledExpression("().__class__").error is not None
+        assert CompiledExpression("__import__('os')").error is not None
+    
+    def test_compiled_matches_raw_eval(self, calculator, basic_data):
+        """Test que el camino compilado produce el mismo presupuesto"""
+        data = dict(basic_data, has_pool=True, has_gas=True, has_cocina=False,
+                    has_site=False, has_special_inst=False, has_substation=False,
+                    has_transformer=False, has_machine_room=False, aforo=50)
+        result = calculator.analyze_full_compliance(data)
+        conceptos = [i["concepto"] for i in result["presupuesto_inicial"]]
+        
+        for rule in calculator.rules:
+            context = dict(data, m2_construccion=float(data["m2_construccion"]))
+            triggered = rule["trigger_logic"] == "always" or eval(
+                rule["trigger_logic"], {"__builtins__": {}, "math": math, "ceil": math.ceil}, context
+            )
+            assert (rule["output_item"]["concept_template"] in conceptos) == bool(triggered)
+
+
+# ==================== CLASE 12: TEST MOTOR COMPARTIDO Y RECARGA ====================
+
+@pytest.mark.calculator
+@pytest.mark.unit
+class TestRuleEngineRegistry:
+    """Tests del motor compartido por worker con recarga en caliente"""
+    
+    @pytest.fixture
+    def rules_file(self, tmp_path):
+        """Copia de rules_matrix.json en un directorio temporal"""
+        source = Path(__file__).parent.parent / "data" / "rules_matrix.json"
+        target = tmp_path / "rules_matrix.json"
+        target.write_text(source.read_text(encoding="utf-8"), encoding="utf-8")
+        return target
+    
+    def _rewrite(self, path, data):
+        """Reescribe el archivo forzando un mtime distinto"""
+        path.write_text(json.dumps(data), encoding="utf-8")
+        st = path.stat()
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    
+    def test_same_instance_while_file_unchanged(self, rules_file):
+        """Test que sin cambios se reutiliza la misma instancia"""
+        registry = RuleEngineRegistry(str(rules_file))
+        assert registry.get() is registry.get()
+        assert registry.reload_count == 0
+    
+    def test_reload_on_change(self, rules_file):
+        """Test que un cambio en el archivo produce un motor nuevo"""
+        registry = RuleEngineRegistry(str(rules_file))
+        first = registry.get()
+        
+        data = json.loads(rules_file.read_text(encoding="utf-8"))
+        data["rules"] = data["rules"][:3]
+        self._rewrite(rules_file, data)
+        
+        second = registry.get()
+        assert second is not first
+        assert len(second.rules) == 3
+        assert registry.reload_count == 1
+        assert second.rules_fingerprint != first.rules_fingerprint
+    
+    def test_invalid_file_keeps_previous_engine(self, rules_file):
+        """Test que un JSON inválido no reemplaza el motor vigente"""
+        registry = RuleEngineRegistry(str(rules_file))
+        first = registry.get()
+        
+        rules_file.write_text("{ invalido", encoding="utf-8")
+        st = rules_file.stat()
+        os.utime(rules_file, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+        
+        assert registry.get() is first
+    
+    def test_shared_engine_does_not_mutate_state(self, calculator, basic_data):
+        """Test que analizar no altera el estado de la instancia compartida"""
+        first = calculator.analyze_full_compliance(basic_data)
+        second = calculator.analyze_full_compliance(basic_data)
+        assert [i["id"] for i in first["presupuesto_inicial"]] == [i["id"] for i in second["presupuesto_inicial"]]
+
+
+# ==================== CLASE 13: TEST EVALUACIÓN BATCH (PORTAFOLIOS) ====================
+
+@pytest.mark.calculator
+@pytest.mark.unit
+class TestBatchEvaluation:
+    """Tests del modo batch vectorizado de analyze_batch"""
+    
+    FLAGS = ["has_gas", "has_pool", "has_cocina", "has_site", "has_special_inst",
+             "has_substation", "has_transformer", "has_machine_room"]
+    
+    @pytest.fixture
+    def portfolio(self):
+        """Portafolio variado con flags faltantes en algunas filas"""
+        import random
+        rng = random.Random(42)
+        tipos = ["Hotel", "Hospital", "Industrial", "Oficina corporativa", "Restaurante", "Comercio"]
+        rows = []
+        for _ in range(300):
+            row = {
+                "tipo_inmueble": rng.choice(tipos),
+                "m2_construccion": rng.choice([rng.uniform(0, 8000), rng.randint(0, 5000)]),
+                "niveles": rng.randint(0, 8),
+                "aforo": rng.randint(0, 400),
+                "trabajadores": rng.randint(0, 300),
+                "estado": rng.choice(["Ciudad de México", "Jalisco"])
+            }
+            for flag in self.FLAGS:
+                if rng.random() < 0.9:
+                    row[flag] = rng.random() < 0.4
+            rows.append(row)
+        return rows
+    
+    @pytest.fixture(autouse=True)
+    def no_checklist(self, monkeypatch):
+        """El batch no construye el árbol normativo; se omite en el camino escalar"""
+        monkeypatch.setattr("calculator_engine.get_applicable_noms", lambda profile: [])
+    
+    def test_batch_matches_scalar_path(self, calculator, portfolio):
+        """Test que el presupuesto por fila es idéntico al camino escalar"""
+        batch = calculator.analyze_batch(portfolio)
+        
+        assert len(batch["resultados"]) == len(portfolio)
+        for row, result in zip(portfolio, batch["resultados"]):
+            expected = calculator.analyze_full_compliance(row)["presupuesto_inicial"]
+            assert result["presupuesto_inicial"] == expected
+    
+    def test_columnar_input_matches_rows(self, calculator, portfolio):
+        """Test que la entrada por columnas produce el mismo resultado"""
+        rows = [dict({f: False for f in self.FLAGS}, **row) for row in portfolio]
+        columns = {key: [row[key] for row in rows] for key in rows[0]}
+        
+        assert calculator.analyze_batch(columns) == calculator.analyze_batch(rows)
+    
+    def test_structured_array_input(self, calculator):
+        """Test entrada como arreglo estructurado NumPy"""
+        np = pytest.importorskip("numpy")
+        data = np.array(
+            [("Hotel", 3500.0, 4, 100, 80, "Jalisco", True),
+             ("Comercio", 200.0, 1, 10, 5, "Ciudad de México", False)],
+            dtype=[("tipo_inmueble", "U32"), ("m2_construccion", "f8"), ("niveles", "i8"),
+                   ("aforo", "i8"), ("trabajadores", "i8"), ("estado", "U32"), ("has_pool", "?")]
+        )
+        batch = calculator.analyze_batch(data)
+        
+        for record, result in zip(data.tolist(), batch["resultados"]):
+            row = dict(zip(data.dtype.names, record))
+            assert result["presupuesto_inicial"] == calculator.analyze_full_compliance(row)["presupuesto_inicial"]
+    
+    def test_portfolio_totals(self, calculator, portfolio):
+        """Test que los totales del portafolio suman las filas"""
+        batch = calculator.analyze_batch(portfolio)
+        totals = batch["portafolio"]
+        
+        assert totals["total_inmuebles"] == len(portfolio)
+        assert totals["total_inversion"] == pytest.approx(sum(r["total_estimado"] for r in batch["resultados"]))
+        assert totals["total_inversion"] == pytest.approx(sum(totals["por_categoria"].values()))
+        assert totals["reglas_activadas"]["RULE_EXT_PQS"] == len(portfolio)
+    
+    def test_empty_batch(self, calculator):
+        """Test batch vacío"""
+        batch = calculator.analyze_batch([])
+        assert batch["resultados"] == []
+        assert batch["portafolio"]["total_inversion"] == 0.0
+
+
 # ==================== RUN ALL TESTS ====================
 
 if __name__ == "__main__":
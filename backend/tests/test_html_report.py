@@ -0,0 +1,153 @@
+"""
+Tests para html_templates.py y html_report_generator.py
+Coverage target: > 80%
+"""
+import pytest
+
+from html_templates import Template
+from html_report_generator import generate_html_report, iter_html_report
+
+
+INPUT_DATA = {
+    "municipio": "Zapopan",
+    "estado": "Jalisco",
+    "tipo_inmueble": "Oficina",
+    "m2_construccion": 1500,
+    "niveles": 3,
+    "aforo": 80,
+    "trabajadores": 60
+}
+
+ANALYSIS_DATA = {
+    "normative_checklist": [
+        {"norma": f"NOM-{i:03d}-STPS", "titulo": "Condiciones de seguridad",
+         "articulo": "5.1", "fundamento_legal": "Ley General de Protección Civil"}
+        for i in range(250)
+    ],
+    "budget_breakdown": {
+        "items": [
+            {"concept": "Extintor PQS 6 kg", "quantity": 2, "unit_price": 850.0},
+            {"concept": "Señalización", "quantity": 10, "unit_price": 120.5}
+        ]
+    }
+}
+
+
+# ==================== CLASE 1: TEST MOTOR DE PLANTILLAS ====================
+
+@pytest.mark.unit
+class TestTemplate:
+    """Tests de las plantillas precompiladas"""
+
+    def test_autoescape_and_filters(self):
+        """Test escape por defecto, |safe y filtros numéricos"""
+        template = Template("<p>{{ nombre }}</p>{{ html|safe }} ${{ total|money }} {{ m2|thousands }} m²")
+
+        result = template.render(nombre="<b>A&B</b>", html="<i>ok</i>", total=1234.5, m2=1500)
+
+        assert result == "<p>&lt;b&gt;A&amp;B&lt;/b&gt;</p><i>ok</i> $1,234.50 1,500 m²"
+
+    def test_braces_outside_fields_are_literal(self):
+        """Test que el CSS con llaves no necesita escaparse"""
+        template = Template(".a { color: red; } {{ x }}")
+
+        assert template.render(x=1) == ".a { color: red; } 1"
+        assert template.fields == ("x",)
+
+    def test_render_many_positional_rows(self):
+        """Test filas como tuplas en el orden de los campos (con campo repetido)"""
+        template = Template("<tr><td>{{ a }}</td><td>{{ b }}</td><td>{{ a }}</td></tr>")
+
+        assert template.fields == ("a", "b")
+        assert template.render_many([(1, "x"), (2, "<y>")]) == (
+            "<tr><td>1</td><td>x</td><td>1</td></tr><tr><td>2</td><td>&lt;y&gt;</td><td>2</td></tr>"
+        )
+
+    def test_render_many_one_or_no_fields(self):
+        """Test filas de un solo campo y plantillas sin campos"""
+        assert Template("<li>{{ a }}</li>").render_many([("x",), (2,)]) == "<li>x</li><li>2</li>"
+        assert Template("<hr>").render_many([(), ()]) == "<hr><hr>"
+
+    def test_cache_size_memoizes_render(self):
+        """Test LRU por valores de los campos (y sin caché si un valor no es hashable)"""
+        template = Template("<p>{{ a }}</p>", cache_size=8)
+
+        assert template.render(a="<x>") == template.render(a="<x>") == "<p>&lt;x&gt;</p>"
+        assert template.render(a=["<x>"]) == "<p>[&#x27;&lt;x&gt;&#x27;]</p>"
+        assert template._render.cache_info().hits == 1
+
+    def test_unknown_filter(self):
+        """Test que un filtro inexistente falla al compilar, no al renderizar"""
+        with pytest.raises(ValueError):
+            Template("{{ x|upper }}")
+
+
+# ==================== CLASE 2: TEST REPORTE HTML ====================
+
+@pytest.mark.report
+@pytest.mark.unit
+class TestHTMLReport:
+    """Tests del reporte HTML premium"""
+
+    def test_complete_report(self):
+        """Test secciones, tarjetas, totales y QR"""
+        html = generate_html_report(INPUT_DATA, ANALYSIS_DATA)
+
+        assert html.lstrip().startswith("<!DOCTYPE html>")
+        assert html.rstrip().endswith("</html>")
+        assert "<title>Dictamen de Protección Civil - Zapopan, Jalisco</title>" in html
+        assert html.count('class="norma-card"') == 250
+        assert '<div class="norma-numero">250</div>' in html
+        assert "1,500 m²" in html
+        assert "$2,905.00" in html  # 2*850 + 10*120.5
+        assert "data:image/png;base64," in html
+
+    def test_streaming_chunks_match_full_report(self):
+        """Test que el HTML por chunks es el mismo documento y llega en varias partes"""
+        chunks = list(iter_html_report(INPUT_DATA, ANALYSIS_DATA, chunk_rows=50))
+
+        assert len(chunks) >= 8  # encabezado + 5 lotes de tarjetas + presupuesto + pie
+        assert "".join(chunks) == generate_html_report(INPUT_DATA, ANALYSIS_DATA)
+
+    def test_user_values_are_escaped(self):
+        """Test que los datos del usuario no inyectan HTML"""
+        data = dict(INPUT_DATA, municipio="<script>alert(1)</script>")
+
+        html = generate_html_report(data, {"normative_checklist": [{"norma": "<img src=x>"}]})
+
+        assert "<script>alert(1)</script>" not in html
+        assert "&lt;script&gt;" in html
+        assert "<img src=x>" not in html
+
+    def test_empty_analysis(self):
+        """Test reporte sin normas ni presupuesto"""
+        html = generate_html_report({}, {})
+
+        assert "N/A, N/A" in html
+        assert "$0.00" in html
+
+    def test_norma_bodies_rendered_once(self):
+        """Test que el cuerpo de cada norma se reutiliza entre reportes (solo cambia el número)"""
+        from html_report_generator import _NORMA_BODY
+        generate_html_report(INPUT_DATA, ANALYSIS_DATA)
+        hits = _NORMA_BODY._render.cache_info().hits
+
+        html = generate_html_report(INPUT_DATA, ANALYSIS_DATA)
+
+        assert _NORMA_BODY._render.cache_info().hits - hits == 250
+        assert '<div class="norma-numero">250</div>\n                <h3 class="norma-titulo">NOM-249-STPS</h3>' in html
+
+    def test_invalid_data_fails_before_first_chunk(self):
+        """Test que los datos inválidos fallan al pedir el primer chunk (antes de enviar headers)"""
+        bad_norma = {"normative_checklist": [{"norma": "NOM-002-STPS"}, "no-es-dict"]}
+        bad_price = {"budget_breakdown": {"items": [{"concept": "Extintor", "quantity": 2, "unit_price": "caro"}]}}
+
+        for analysis in (bad_norma, bad_price):
+            with pytest.raises((AttributeError, TypeError, ValueError)):
+                next(iter_html_report(INPUT_DATA, analysis))
+
+
+# ==================== RUN ALL TESTS ====================
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--cov=html_templates", "--cov=html_report_generator", "--cov-report=term-missing"])
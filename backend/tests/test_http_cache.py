@@ -0,0 +1,181 @@
+"""
+Tests para http_cache.py (ETags, If-None-Match y caché de HTML renderizado)
+Coverage target: > 80%
+"""
+import pytest
+
+from http_cache import HTMLReportCache, make_etag, etag_matches, cache_headers
+from auth import create_access_token
+
+
+# ==================== CLASE 1: TEST ETAGS ====================
+
+@pytest.mark.unit
+class TestETags:
+    """Tests de generación y comparación de ETags"""
+
+    def test_strong_etag_by_parts(self):
+        """Test ETag fuerte, estable y distinto por revisión"""
+        etag = make_etag("html", 7, "2026-01-01T00:00:00", "v1")
+
+        assert etag.startswith('"') and etag.endswith('"')
+        assert etag == make_etag("html", 7, "2026-01-01T00:00:00", "v1")
+        assert etag != make_etag("html", 7, "2026-01-02T00:00:00", "v1")
+        assert etag != make_etag("html", 7, "2026-01-01T00:00:00", "v2")
+
+    def test_if_none_match(self):
+        """Test lista de ETags, prefijo débil W/ y comodín"""
+        etag = make_etag("pdf", "Dictamen_Zapopan_abc.pdf")
+
+        assert etag_matches(etag, etag)
+        assert etag_matches(f'"otro", W/{etag}', etag)
+        assert etag_matches("*", etag)
+        assert not etag_matches('"otro"', etag)
+        assert not etag_matches(None, etag)
+
+    def test_cache_headers(self):
+        """Test que el contenido privado se revalida siempre"""
+        headers = cache_headers('"abc"')
+
+        assert headers == {"ETag": '"abc"', "Cache-Control": "private, no-cache"}
+
+
+# ==================== CLASE 2: TEST CACHÉ DE HTML ====================
+
+@pytest.mark.unit
+class TestHTMLReportCache:
+    """Tests de la caché de HTML por revisión del análisis"""
+
+    def test_hit_only_same_revision(self):
+        """Test que una revisión nueva del análisis no sirve el HTML viejo"""
+        cache = HTMLReportCache()
+        cache.put(1, "rev-1", b"<html>1</html>")
+
+        assert cache.get(1, "rev-1") == b"<html>1</html>"
+        assert cache.get(1, "rev-2") is None
+
+        cache.put(1, "rev-2", b"<html>2</html>")
+        assert cache.get(1, "rev-1") is None
+        assert cache.stats()["entries"] == 1
+        assert cache.stats()["size_bytes"] == len(b"<html>2</html>")
+
+    def test_lru_by_entries_and_size(self):
+        """Test evicción por número de entradas y por tamaño total"""
+        cache = HTMLReportCache(max_entries=2, max_bytes=10)
+        cache.put(1, "r", b"aaaa")
+        cache.put(2, "r", b"bbbb")
+        cache.get(1, "r")              # 1 pasa a ser el más reciente
+        cache.put(3, "r", b"cccc")     # excede entradas: sale 2
+
+        assert cache.get(2, "r") is None
+        assert cache.get(1, "r") == b"aaaa"
+
+        cache.put(4, "r", b"dddddddd")  # excede tamaño: salen los más viejos
+        assert cache.get(4, "r") == b"dddddddd"
+        assert cache.stats()["size_bytes"] <= 10
+        assert cache.stats()["evictions"] >= 2
+
+        cache.put(5, "r", b"x" * 11)   # más grande que la caché completa: no se guarda
+        assert cache.get(5, "r") is None
+
+    def test_discard(self):
+        """Test invalidación al eliminar el análisis"""
+        cache = HTMLReportCache()
+        cache.put(1, "r", b"<html/>")
+        cache.discard(1)
+        cache.discard(1)
+
+        assert cache.get(1, "r") is None
+        assert cache.stats()["size_bytes"] == 0
+
+
+# ==================== CLASE 3: TEST ENDPOINTS CONDICIONALES ====================
+
+@pytest.mark.api
+@pytest.mark.integration
+class TestConditionalEndpoints:
+    """Tests de ETag / If-None-Match en /preview-html y /download"""
+
+    @pytest.fixture
+    def setup(self, client, test_db, db_user, tmp_path, monkeypatch):
+        """Un análisis con PDF del usuario de db_user y otro usuario sin ownership"""
+        import main
+        from database import User, Analysis
+        from blob_store import LocalBlobStore
+        from render_queue import RenderQueue
+
+        queue = RenderQueue(max_workers=1)
+        monkeypatch.setattr(main, "render_queue", queue)
+        monkeypatch.setattr(main, "blob_store", LocalBlobStore(str(tmp_path)))
+        monkeypatch.setattr(main, "html_report_cache", HTMLReportCache())
+        monkeypatch.setattr("database.SessionLocal", lambda: test_db)
+        monkeypatch.setattr(test_db, "close", lambda: None)
+
+        other = User(email="otro@example.com", name="Otro", password_hash="x", role="consultor", is_active=1)
+        analysis = Analysis(user_id=db_user["user_id"], municipio="Zapopan", estado="Jalisco",
+                            tipo_inmueble="Oficina", pdf_path="Dictamen_Zapopan_abc.pdf",
+                            input_data={"municipio": "Zapopan", "estado": "Jalisco", "tipo_inmueble": "Oficina",
+                                        "m2_construccion": 1500, "niveles": 3, "aforo": 80, "trabajadores": 60},
+                            report_data={"normative_checklist": [
+                                {"norma": "NOM-002-STPS", "titulo": "Prevención de incendios",
+                                 "articulo": "5.1", "fundamento_legal": "Ley General de Protección Civil"}
+                            ]})
+        test_db.add_all([other, analysis])
+        test_db.commit()
+        main.blob_store.put("Dictamen_Zapopan_abc.pdf", b"%PDF-1.4 dictamen")
+
+        other_headers = {"Authorization": f"Bearer {create_access_token({'sub': str(other.id)})}"}
+        yield client, analysis.id, other_headers
+        queue.shutdown()
+
+    def test_preview_etag_then_304(self, setup, db_auth_headers):
+        """Test 200 con ETag (HTML desde la BD) y 304 sin cuerpo con If-None-Match"""
+        client, analysis_id, _ = setup
+
+        first = client.get(f"/preview-html/{analysis_id}", headers=db_auth_headers)
+        etag = first.headers.get("etag")
+        second = client.get(f"/preview-html/{analysis_id}",
+                            headers={**db_auth_headers, "If-None-Match": etag})
+        cached = client.get(f"/preview-html/{analysis_id}", headers=db_auth_headers)
+
+        assert first.status_code == 200
+        assert etag and "NOM-002-STPS" in first.text
+        assert first.headers["cache-control"] == "private, no-cache"
+        assert second.status_code == 304
+        assert second.content == b""
+        assert cached.status_code == 200
+        assert cached.text == first.text
+        assert cached.headers["etag"] == etag
+
+    def test_preview_ownership_before_304(self, setup, db_auth_headers):
+        """Test que otro usuario con el ETag correcto recibe 403, no 304"""
+        client, analysis_id, other_headers = setup
+        etag = client.get(f"/preview-html/{analysis_id}", headers=db_auth_headers).headers["etag"]
+
+        response = client.get(f"/preview-html/{analysis_id}", headers={**other_headers, "If-None-Match": etag})
+
+        assert response.status_code == 403
+        assert "etag" not in response.headers
+
+    def test_download_etag(self, setup, db_auth_headers):
+        """Test ETag por nombre de PDF: 200 desde el blob store, 304 con If-None-Match, 403 a otro usuario"""
+        client, _, other_headers = setup
+        url = "/download/Dictamen_Zapopan_abc.pdf"
+
+        first = client.get(url, headers=db_auth_headers)
+        etag = first.headers.get("etag")
+        second = client.get(url, headers={**db_auth_headers, "If-None-Match": etag})
+        other = client.get(url, headers={**other_headers, "If-None-Match": etag})
+
+        assert first.status_code == 200
+        assert first.content == b"%PDF-1.4 dictamen"
+        assert etag == make_etag("pdf", "Dictamen_Zapopan_abc.pdf")
+        assert second.status_code == 304
+        assert second.content == b""
+        assert other.status_code == 403
+
+
+# ==================== RUN ALL TESTS ====================
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--cov=http_cache", "--cov-report=term-missing"])
@@ -0,0 +1,126 @@
+"""
+Tests para legal_justification.py
+Coverage target: > 80%
+"""
+import pytest
+import noms_library
+import legal_justification
+from legal_justification import (
+    JustificationEngine, get_justification_engine, render_legal_justification, risk_mask,
+    SIN_CAUSALES, RISK_GAS, RISK_AEREO
+)
+
+
+# ==================== FIXTURES ESPECÍFICAS ====================
+
+@pytest.fixture
+def engine():
+    """
+    Fixture de motor con dos estados.
+
+    Returns:
+        JustificationEngine: Plantillas de Jalisco y Estado de México
+    """
+    return JustificationEngine({
+        "Jalisco": {"ley": "Ley del Sistema Estatal de Protección Civil de Jalisco", "art_pipc": "Art. 24"},
+        "Estado de México": {"ley": "Libro Sexto del Código Administrativo del EdoMex", "art_pipc": "Art. 6.14"},
+        "default": {"ley": "Ley General de Protección Civil (Supletoria)", "art_pipc": "Art. 39"}
+    })
+
+
+# ==================== CLASE 1: TEST CAUSALES (BITMASK) ====================
+
+@pytest.mark.unit
+class TestCausales:
+    """Tests de la tabla de causales por bitmask"""
+
+    def test_causales_order_and_values(self, engine):
+        """Test que las causales salen en orden fijo con sus valores"""
+        data = {"trabajadores": 30, "m2_construccion": 500.0, "has_gas": True, "tipo_inmueble": "Hangar"}
+
+        assert engine.causales(data) == (
+            "PLANTILLA DE TRABAJADORES SUPERIOR A 25 PERSONAS (30), "
+            "SUPERFICIE CONSTRUIDA SUPERIOR A 250 M² (500.0 M²), "
+            "INSTALACIÓN DE GAS L.P./NATURAL, "
+            "GIRO DE ALTO RIESGO POR INFRAESTRUCTURA DE TRANSPORTE AÉREO"
+        )
+        assert risk_mask(data) & RISK_GAS
+        assert risk_mask(data) & RISK_AEREO
+
+    def test_no_causales(self, engine):
+        """Test inmueble sin causales de riesgo"""
+        assert engine.causales({"trabajadores": 5, "m2_construccion": 100}) == SIN_CAUSALES
+
+    def test_all_masks_render(self, engine):
+        """Test que las 256 combinaciones quedan sin marcadores sin resolver"""
+        for mask in range(256):
+            template, fields = legal_justification._CAUSALES[mask]
+            text = template % tuple(1 for _ in fields)
+            assert "%s" not in text and "{" not in text
+
+
+# ==================== CLASE 2: TEST PLANTILLAS POR ESTADO ====================
+
+@pytest.mark.unit
+class TestStateTemplates:
+    """Tests de las plantillas construidas desde legal_db.json"""
+
+    def test_state_law_cited(self, engine):
+        """Test que se cita la ley y artículo del estado"""
+        text = engine.render({"estado": "Jalisco", "municipio": "Zapopan", "trabajadores": 30})
+
+        assert "ARTÍCULO 24 DE LA LEY DEL SISTEMA ESTATAL DE PROTECCIÓN CIVIL DE JALISCO" in text
+        assert text.endswith("DEL MUNICIPIO DE ZAPOPAN.")
+        assert "ATLAS" not in text
+
+    def test_state_alias(self, engine):
+        """Test que 'México' se resuelve como Estado de México"""
+        text = engine.render({"estado": "México", "municipio": "Toluca"})
+
+        assert "ARTÍCULO 6.14 DE LA LIBRO SEXTO DEL CÓDIGO ADMINISTRATIVO DEL EDOMEX" in text
+
+    def test_unknown_state_fallback(self, engine):
+        """Test estado no catalogado (no cita la Ley General dos veces)"""
+        text = engine.render({"estado": "Atlantis", "municipio": "Centro"})
+
+        assert "ARTÍCULO 58 DE LA LEY DE PROTECCIÓN CIVIL DEL ESTADO" in text
+        assert "SUPLETORIA" not in text
+
+    def test_rebuilds_on_legal_db_change(self, monkeypatch):
+        """Test que el motor compartido se reconstruye con una nueva versión de legal_db"""
+        before = get_justification_engine()
+        monkeypatch.setattr(noms_library, "LEGAL_DB_VERSION", "otra-version")
+        monkeypatch.setattr(noms_library, "STATE_LAWS", {"Jalisco": {"ley": "Ley Reformada", "art_pipc": "Art. 99"}})
+        monkeypatch.setattr(noms_library, "_check_legal_db", lambda: None)
+
+        after = get_justification_engine()
+        assert after is not before
+        assert "ARTÍCULO 99 DE LA LEY REFORMADA" in after.render({"estado": "Jalisco"})
+
+
+# ==================== CLASE 3: TEST CONSISTENCIA ENTRE MÓDULOS ====================
+
+@pytest.mark.integration
+class TestSharedJustification:
+    """Tests de que calculadora y AIService producen el mismo texto"""
+
+    def test_calculator_matches_ai_service_mock(self, monkeypatch):
+        """Test que el resumen ejecutivo y el dictamen (modo mock) no divergen"""
+        from ai_service import AIService
+        from calculator_engine import CivilProtectionCalculator
+        monkeypatch.setenv("OPENAI_API_KEY", "")
+        data = {
+            "estado": "Jalisco", "municipio": "Zapopan", "tipo_inmueble": "Oficina",
+            "m2_construccion": 800.0, "trabajadores": 60, "aforo": 80, "niveles": 3, "has_gas": True
+        }
+
+        calc_text = CivilProtectionCalculator()._generate_strict_legal_justification(data)
+        ai_text = AIService().generate_legal_justification(data)
+
+        assert calc_text == ai_text == render_legal_justification(data)
+
+
+# ==================== RUN ALL TESTS ====================
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--cov=legal_justification", "--cov-report=term-missing"])
@@ -0,0 +1,136 @@
+"""
+Tests para llm_cache.py
+Coverage target: > 80%
+"""
+import pytest
+import time
+from llm_cache import LLMCache
+
+
+# ==================== FIXTURES ESPECÍFICAS ====================
+
+@pytest.fixture
+def cache(tmp_path):
+    """
+    Fixture de caché SQLite temporal.
+
+    Returns:
+        LLMCache: Caché vacía (máx. 3 entradas)
+    """
+    return LLMCache(db_path=str(tmp_path / "llm_cache.sqlite"), ttl_seconds=60,
+                    stale_ttl_seconds=60, max_entries=3)
+
+
+def messages(prompt):
+    return [{"role": "user", "content": prompt}]
+
+
+# ==================== CLASE 1: TEST HUELLA DEL PROMPT ====================
+
+@pytest.mark.unit
+class TestPromptFingerprint:
+    """Tests de la llave (modelo + parámetros + prompt normalizado)"""
+
+    def test_whitespace_normalized(self):
+        """Test que la indentación del f-string no cambia la llave"""
+        a = LLMCache.make_key("gpt-4", 0.3, 300, messages("\n            Municipio: Zapopan\n            Estado: Jalisco"))
+        b = LLMCache.make_key("gpt-4", 0.3, 300, messages("Municipio: Zapopan Estado: Jalisco"))
+
+        assert a == b
+
+    def test_key_depends_on_model_and_temperature(self):
+        """Test que cambiar modelo o temperatura produce otra llave"""
+        base = LLMCache.make_key("gpt-4", 0.3, 300, messages("hola"))
+
+        assert LLMCache.make_key("gpt-3.5-turbo", 0.3, 300, messages("hola")) != base
+        assert LLMCache.make_key("gpt-4", 0.5, 300, messages("hola")) != base
+        assert LLMCache.make_key("gpt-4", 0.3, 300, messages("adiós")) != base
+
+
+# ==================== CLASE 2: TEST TTL / EVICTION / MÉTRICAS ====================
+
+@pytest.mark.unit
+class TestLLMCacheBehavior:
+    """Tests de hits, vencimiento y límite de tamaño"""
+
+    def test_miss_then_hit(self, cache):
+        """Test miss inicial y hit después de guardar, con contadores por método"""
+        assert cache.get("k1", "municipal_research") is None
+        cache.put("k1", "respuesta", "municipal_research")
+
+        assert cache.get("k1", "municipal_research") == ("respuesta", False)
+        stats = cache.stats()["methods"]["municipal_research"]
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == 0.5
+
+    def test_stale_entry(self, tmp_path):
+        """Test que una entrada vencida dentro de la ventana stale se marca como vencida"""
+        cache = LLMCache(db_path=str(tmp_path / "c.sqlite"), ttl_seconds=-1, stale_ttl_seconds=60)
+        cache.put("k1", "respuesta")
+
+        assert cache.get("k1") == ("respuesta", True)
+        assert cache.stats()["methods"]["chat"]["stale_hits"] == 1
+
+    def test_expired_entry(self, tmp_path):
+        """Test que sin serve_stale una entrada vencida es miss"""
+        cache = LLMCache(db_path=str(tmp_path / "c.sqlite"), ttl_seconds=-1, serve_stale=False)
+        cache.put("k1", "respuesta")
+
+        assert cache.get("k1") is None
+
+    def test_size_bounded_lru(self, cache):
+        """Test que se desaloja la entrada menos usada al exceder max_entries"""
+        for key in ["k1", "k2", "k3"]:
+            cache.put(key, key)
+            time.sleep(0.01)
+        cache.get("k1")        # k1 pasa a ser la más reciente
+        time.sleep(0.01)
+        cache.put("k4", "k4")  # desaloja k2
+
+        assert cache.get("k2") is None
+        assert cache.get("k1") is not None
+        assert cache.stats()["entries"] == 3
+
+    def test_survives_new_instance(self, cache, tmp_path):
+        """Test persistencia entre instancias (reinicio / otro worker)"""
+        cache.put("k1", "respuesta")
+
+        other = LLMCache(db_path=str(tmp_path / "llm_cache.sqlite"))
+        assert other.get("k1") == ("respuesta", False)
+
+    def test_disabled(self):
+        """Test caché desactivada (db_path vacío)"""
+        cache = LLMCache(db_path="")
+        cache.put("k1", "respuesta")
+
+        assert cache.get("k1") is None
+        assert cache.stats()["enabled"] is False
+
+    def test_connections_closed(self, cache, monkeypatch):
+        """Test que cada operación cierra su conexión (no solo hace commit)"""
+        import sqlite3
+        opened = []
+        connect = sqlite3.connect
+
+        def tracking_connect(*args, **kwargs):
+            conn = connect(*args, **kwargs)
+            opened.append(conn)
+            return conn
+
+        monkeypatch.setattr(sqlite3, "connect", tracking_connect)
+        cache.put("k1", "respuesta")
+        cache.get("k1")
+        cache.stats()
+        cache.clear()
+
+        assert len(opened) == 5  # Esquema + 4 operaciones
+        for conn in opened:
+            with pytest.raises(sqlite3.ProgrammingError):
+                conn.execute("SELECT 1")
+
+
+# ==================== RUN ALL TESTS ====================
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--cov=llm_cache", "--cov-report=term-missing"])
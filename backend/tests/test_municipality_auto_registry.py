@@ -0,0 +1,190 @@
+"""
+Tests para municipality_auto_registry.py
+Coverage target: > 80%
+"""
+import pytest
+import json
+import time
+import threading
+import municipality_auto_registry as registry_module
+from municipality_auto_registry import (
+    auto_register_municipality, compact_state, get_municipality_count, read_municipality_log,
+    research_municipality, ResearchUnavailable
+)
+from state_registry import get_state_registry
+
+
+# ==================== FIXTURES ESPECÍFICAS ====================
+
+@pytest.fixture
+def base_dir(tmp_path):
+    """
+    Fixture de directorio base temporal con un estado existente.
+
+    Returns:
+        str: Directorio base (contiene data/states_db/jalisco.json)
+    """
+    states = tmp_path / "data" / "states_db"
+    states.mkdir(parents=True)
+    (states / "jalisco.json").write_text(json.dumps({
+        "state_law": {"ley_nombre": "Ley del Sistema Estatal de PC de Jalisco"},
+        "municipios": {"Guadalajara": {"reglamento": "Reglamento GDL"}}
+    }), encoding="utf-8")
+    return str(tmp_path)
+
+
+@pytest.fixture
+def research_calls(monkeypatch):
+    """
+    Fixture que reemplaza la investigación con IA por una lenta y contable.
+
+    Returns:
+        list: Municipios investigados (uno por llamada)
+    """
+    calls = []
+
+    def fake_research(self, estado, municipio):
+        calls.append(municipio)
+        time.sleep(0.2)
+        return {"reglamento": f"Reglamento de PC de {municipio} (IA)"}
+
+    monkeypatch.setattr("ai_service.AIService.research_municipal_regulations", fake_research)
+    return calls
+
+
+def states_path(base_dir):
+    return f"{base_dir}/data/states_db"
+
+
+# ==================== CLASE 1: TEST STORE APPEND-ONLY ====================
+
+@pytest.mark.unit
+class TestAppendOnlyStore:
+    """Tests del log append-only de municipios"""
+
+    def test_register_appends_without_rewriting_base(self, base_dir, research_calls):
+        """Test que registrar no reescribe el JSON base del estado"""
+        base_json = f"{states_path(base_dir)}/jalisco.json"
+        before = open(base_json, encoding="utf-8").read()
+
+        assert auto_register_municipality("Jalisco", "Zapopan", base_dir) is True
+
+        assert open(base_json, encoding="utf-8").read() == before
+        logged = read_municipality_log(f"{states_path(base_dir)}/jalisco.municipios.jsonl")
+        assert logged["Zapopan"]["reglamento"] == "Reglamento de PC de Zapopan (IA)"
+
+    def test_registry_merges_log(self, base_dir, research_calls):
+        """Test que el registro en memoria ve los municipios del log"""
+        auto_register_municipality("Jalisco", "Zapopan", base_dir)
+
+        assert get_state_registry(base_dir).has_municipality("Jalisco", "Zapopan")
+        assert get_municipality_count("Jalisco", base_dir) == 2
+
+    def test_existing_municipality_skips_research(self, base_dir, research_calls):
+        """Test que un municipio existente no dispara la IA"""
+        assert auto_register_municipality("Jalisco", "Guadalajara", base_dir) is False
+        assert research_calls == []
+
+    def test_new_state_creates_base_file(self, base_dir, research_calls):
+        """Test que un estado nuevo crea su JSON base"""
+        assert auto_register_municipality("Morelos", "Cuautla", base_dir) is True
+
+        state = get_state_registry(base_dir).get("Morelos")
+        assert state["_meta"]["auto_populated"] is True
+        assert "Cuautla" in state["municipios"]
+
+    def test_ai_fallback_not_registered(self, base_dir, monkeypatch):
+        """Test que la estructura genérica de fallback de la IA no se registra como investigada"""
+        from ai_service import AIService
+        monkeypatch.setattr(AIService, "research_municipal_regulations",
+                            lambda self, estado, municipio: self._generate_generic_municipal_structure(
+                                estado, municipio, "timeout"))
+
+        with pytest.raises(ResearchUnavailable, match="timeout"):
+            research_municipality("Jalisco", "Zapopan")
+        assert auto_register_municipality("Jalisco", "Zapopan", base_dir) is False
+        assert read_municipality_log(f"{states_path(base_dir)}/jalisco.municipios.jsonl") == {}
+
+    def test_partial_line_ignored(self, base_dir):
+        """Test que una línea a medio escribir (otro proceso) no rompe la lectura"""
+        log_path = f"{states_path(base_dir)}/jalisco.municipios.jsonl"
+        with open(log_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"municipio": "Zapopan", "data": {}}) + "\n")
+            f.write('{"municipio": "Tonal')
+
+        assert list(read_municipality_log(log_path)) == ["Zapopan"]
+
+
+# ==================== CLASE 2: TEST CONCURRENCIA ====================
+
+@pytest.mark.unit
+class TestConcurrentRegistration:
+    """Tests de deduplicación y locks"""
+
+    def test_concurrent_same_municipality_researched_once(self, base_dir, research_calls):
+        """Test que requests concurrentes por el mismo municipio hacen una sola investigación"""
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(auto_register_municipality("Jalisco", "Tlaquepaque", base_dir)))
+            for _ in range(5)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert research_calls == ["Tlaquepaque"]
+        assert results.count(True) == 1
+        assert len(read_municipality_log(f"{states_path(base_dir)}/jalisco.municipios.jsonl")) == 1
+
+    def test_research_runs_outside_lock(self, base_dir, research_calls):
+        """Test que municipios distintos se investigan en paralelo (no serializados por el lock)"""
+        municipios = ["Tonalá", "Tlajomulco", "El Salto", "Zapotlanejo"]
+        threads = [
+            threading.Thread(target=auto_register_municipality, args=("Jalisco", m, base_dir))
+            for m in municipios
+        ]
+        start = time.time()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        # 4 investigaciones de 0.2s en serie tomarían >= 0.8s
+        assert time.time() - start < 0.6
+        assert sorted(research_calls) == sorted(municipios)
+
+
+# ==================== CLASE 3: TEST COMPACTACIÓN ====================
+
+@pytest.mark.unit
+class TestCompaction:
+    """Tests de compactación del log al JSON base"""
+
+    def test_compact_folds_log_into_base(self, base_dir, research_calls):
+        """Test que compactar incorpora el log al JSON y lo vacía"""
+        auto_register_municipality("Jalisco", "Zapopan", base_dir)
+
+        assert compact_state("Jalisco", base_dir) == 1
+
+        base = json.loads(open(f"{states_path(base_dir)}/jalisco.json", encoding="utf-8").read())
+        assert set(base["municipios"]) == {"Guadalajara", "Zapopan"}
+        assert read_municipality_log(f"{states_path(base_dir)}/jalisco.municipios.jsonl") == {}
+        assert get_state_registry(base_dir).has_municipality("Jalisco", "Zapopan")
+
+    def test_auto_compaction_threshold(self, base_dir, research_calls, monkeypatch):
+        """Test compactación automática cada COMPACT_EVERY registros"""
+        monkeypatch.setattr(registry_module, "COMPACT_EVERY", 2)
+
+        auto_register_municipality("Jalisco", "Zapopan", base_dir)
+        auto_register_municipality("Jalisco", "Tonalá", base_dir)
+
+        base = json.loads(open(f"{states_path(base_dir)}/jalisco.json", encoding="utf-8").read())
+        assert {"Zapopan", "Tonalá"} <= set(base["municipios"])
+        assert get_municipality_count("Jalisco", base_dir) == 3
+
+
+# ==================== RUN ALL TESTS ====================
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--cov=municipality_auto_registry", "--cov-report=term-missing"])
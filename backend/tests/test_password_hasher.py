@@ -0,0 +1,99 @@
+"""
+Tests para auth/password_hasher.py (pool acotado de bcrypt) y el rehash en login
+Coverage target: > 80%
+"""
+import threading
+import pytest
+
+from auth import hash_handler
+from auth.hash_handler import hash_password, hash_rounds, needs_rehash
+from auth.password_hasher import PasswordHasher, HasherSaturated
+from database import User
+
+
+@pytest.fixture
+def fast_rounds(monkeypatch):
+    """bcrypt con costo mínimo para que los tests no tarden."""
+    monkeypatch.setattr(hash_handler, "BCRYPT_ROUNDS", 4)
+
+
+# ==================== CLASE 1: TEST POOL DE HASHING ====================
+
+@pytest.mark.auth
+@pytest.mark.unit
+class TestPasswordHasher:
+    """Tests del pool de bcrypt con admisión acotada"""
+
+    def test_hash_and_verify_in_pool(self, fast_rounds):
+        """Test hash y verificación corren en los threads del pool"""
+        hasher = PasswordHasher(workers=2, max_pending=4)
+        try:
+            hashed = hasher.hash("Secreta123!")
+
+            assert hasher.verify("Secreta123!", hashed)
+            assert not hasher.verify("otra", hashed)
+            assert hasher.stats()["completed"] == 3
+            assert hasher.stats()["pending"] == 0
+        finally:
+            hasher.shutdown()
+
+    def test_saturation_rejects_fast(self, fast_rounds):
+        """Test que con la cola llena se rechaza de inmediato con Retry-After"""
+        hasher = PasswordHasher(workers=1, max_pending=1)
+        release = threading.Event()
+        try:
+            busy = hasher._submit(release.wait)  # Ocupa el único lugar
+
+            with pytest.raises(HasherSaturated) as error:
+                hasher.hash("Secreta123!")
+            assert error.value.retry_after >= 1
+            assert hasher.stats()["rejected"] == 1
+
+            release.set()
+            busy.result(5)
+            assert hasher.verify("Secreta123!", hasher.hash("Secreta123!"))
+        finally:
+            release.set()
+            hasher.shutdown()
+
+
+# ==================== CLASE 2: TEST COSTO Y REHASH ====================
+
+@pytest.mark.auth
+@pytest.mark.unit
+class TestRehash:
+    """Tests del costo configurable y del rehash transparente en login"""
+
+    def test_needs_rehash(self, monkeypatch):
+        """Test detección del costo del hash almacenado"""
+        monkeypatch.setattr(hash_handler, "BCRYPT_ROUNDS", 4)
+        hashed = hash_password("Secreta123!")
+
+        assert hash_rounds(hashed) == 4
+        assert not needs_rehash(hashed)
+        monkeypatch.setattr(hash_handler, "BCRYPT_ROUNDS", 5)
+        assert needs_rehash(hashed)
+        assert hash_rounds("no-es-bcrypt") == 0
+
+    @pytest.mark.api
+    def test_login_rehashes_with_new_cost(self, client, test_db, monkeypatch):
+        """Test que un login exitoso regenera el hash con el costo configurado"""
+        monkeypatch.setattr(hash_handler, "BCRYPT_ROUNDS", 4)
+        user = User(email="perito@example.com", name="Perito", role="consultor", is_active=1,
+                    password_hash=hash_password("Secreta123!"))
+        test_db.add(user)
+        test_db.commit()
+        monkeypatch.setattr(hash_handler, "BCRYPT_ROUNDS", 5)
+
+        response = client.post("/auth/login", json={"email": "perito@example.com", "password": "Secreta123!"})
+
+        assert response.status_code == 200
+        test_db.refresh(user)
+        assert hash_rounds(user.password_hash) == 5
+        assert hash_handler.verify_password("Secreta123!", user.password_hash)
+
+
+# ==================== RUN ALL TESTS ====================
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--cov=auth.password_hasher", "--cov=auth.hash_handler", "--cov-report=term-missing"])
@@ -0,0 +1,134 @@
+"""
+Tests para pdf_renderer.py (pool de procesos de render) y su integración con render_queue
+Coverage target: > 80%
+"""
+import pytest
+from concurrent.futures import Future
+
+from pdf_renderer import PDFRenderer, RendererSaturated
+from render_queue import RenderQueue, DONE, ERROR
+
+
+DATA = {"municipio": "Zapopan", "estado": "Jalisco", "tipo_inmueble": "Oficina", "m2_construccion": 800}
+RESULTS = {"ai_analysis": {"legal_justification": "Justificación legal de prueba"}}
+
+
+@pytest.fixture
+def renderer():
+    renderer = PDFRenderer(processes=1, max_pending=1)
+    yield renderer
+    renderer.shutdown()
+
+
+# ==================== CLASE 1: TEST POOL DE PROCESOS ====================
+
+@pytest.mark.report
+@pytest.mark.integration
+class TestPDFRenderer:
+    """Tests del render en procesos worker"""
+
+    def test_render_returns_pdf_bytes(self, renderer):
+        """Test que el payload serializado vuelve como bytes de PDF"""
+        pdf = renderer.render(DATA, RESULTS, timeout=60)
+
+        assert pdf.startswith(b"%PDF")
+        stats = renderer.stats()
+        assert stats["pending"] == 0
+        (worker,) = stats["workers"].values()
+        assert worker["renders"] == 1
+        assert worker["errors"] == 0
+        assert worker["avg_ms"] > 0
+
+    def test_render_error_propagates(self, renderer):
+        """Test que un error dentro del worker llega al Future y cuenta en las métricas"""
+        with pytest.raises(RuntimeError, match="KeyError"):
+            renderer.render(DATA, {}, timeout=60)  # Sin ai_analysis
+
+        (worker,) = renderer.stats()["workers"].values()
+        assert worker["errors"] == 1
+
+    def test_saturated_rejects_with_retry_after(self, renderer):
+        """Test backpressure: con la cola llena se rechaza de inmediato con Retry-After"""
+        future = renderer.submit(DATA, RESULTS)
+
+        with pytest.raises(RendererSaturated) as exc:
+            renderer.submit(DATA, RESULTS)
+        with pytest.raises(RendererSaturated):
+            renderer.check_capacity()
+
+        assert exc.value.retry_after >= 1
+        assert renderer.stats()["rejected"] == 2
+        assert future.result(timeout=60).startswith(b"%PDF")
+        renderer.check_capacity()  # Ya hay lugar
+
+    def test_wait_admits_when_slot_frees(self, renderer):
+        """Test que con wait (lotes) el render espera lugar en vez de rechazarse"""
+        first = renderer.submit(DATA, RESULTS)
+        second = renderer.submit(DATA, RESULTS, wait=60)
+
+        assert first.result(timeout=60).startswith(b"%PDF")
+        assert second.result(timeout=60).startswith(b"%PDF")
+        assert renderer.stats()["rejected"] == 0
+
+
+# ==================== CLASE 2: TEST JOBS DE RENDER EXTERNO ====================
+
+@pytest.mark.unit
+class TestRenderQueueTrack:
+    """Tests de render_queue.track (jobs cuyo render corre en otro ejecutor)"""
+
+    def test_track_finishes_with_callback_result(self):
+        """Test que el job termina con lo que retorna finish_fn(pdf, *args)"""
+        queue = RenderQueue(max_workers=1)
+        future = Future()
+        job = queue.track("a.pdf", future, lambda pdf, suffix: pdf + suffix, b"-ok", owner_id=3)
+        assert job["status"] == "pending"
+        assert job["owner_id"] == 3
+
+        future.set_result(b"%PDF")
+        finished = queue.wait(job["job_id"], timeout=10)
+        queue.shutdown()
+
+        assert finished["status"] == DONE
+        assert finished["pdf"] == b"%PDF-ok"
+
+    def test_track_failed_future(self):
+        """Test que un render fallido deja el job en error"""
+        queue = RenderQueue(max_workers=1)
+        future = Future()
+        job = queue.track("b.pdf", future, lambda pdf: pdf)
+
+        future.set_exception(RuntimeError("worker caído"))
+        finished = queue.wait(job["job_id"], timeout=10)
+        queue.shutdown()
+
+        assert finished["status"] == ERROR
+        assert "worker caído" in finished["error"]
+
+    def test_shutdown_closes_renders_finishing_during_drain(self, monkeypatch):
+        """Test que al apagar, un render que termina mientras se drena el pool sí se cierra"""
+        import main
+        queue = RenderQueue(max_workers=1)
+        future = Future()
+        job = queue.track("c.pdf", future, lambda pdf: pdf)
+
+        class DrainingRenderer:
+            def shutdown(self, wait=True):
+                future.set_result(b"%PDF")  # El render en curso termina durante el drenado
+
+        monkeypatch.setattr(main, "pdf_renderer", DrainingRenderer())
+        monkeypatch.setattr(main, "render_queue", queue)
+        monkeypatch.setattr(main.password_hasher, "shutdown", lambda wait=True: None)
+        monkeypatch.setattr(main.research_queue, "stop", lambda: None)
+        monkeypatch.setattr(main.ai_client, "close", lambda: None)
+        main.on_shutdown()
+
+        finished = queue.get(job["job_id"])
+        assert finished["status"] == DONE
+        assert finished["pdf"] == b"%PDF"
+
+
+# ==================== RUN ALL TESTS ====================
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--cov=pdf_renderer", "--cov-report=term-missing"])
@@ -0,0 +1,92 @@
+"""
+Tests para pdf_signature.py (firma como revisión incremental del PDF existente)
+Coverage target: > 80%
+"""
+import io
+import re
+import base64
+import pytest
+import PyPDF2
+from PIL import Image
+
+from report_generator import generate_pdf_report
+from pdf_signature import stamp_signature
+
+
+DATA = {"municipio": "Zapopan", "estado": "Jalisco", "tipo_inmueble": "Oficina", "m2_construccion": 800}
+RESULTS = {"ai_analysis": {"legal_justification": "Justificación legal de prueba"}}
+LONG_RESULTS = {"ai_analysis": {"legal_justification": "Fundamento legal extenso. " * 150}}
+
+
+def signature_data_url() -> str:
+    image = Image.new("RGBA", (300, 120), (0, 0, 0, 0))
+    for x in range(20, 280):
+        image.putpixel((x, 50 + x % 20), (0, 0, 80, 255))
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG")
+    return "data:image/png;base64," + base64.b64encode(buffer.getvalue()).decode()
+
+
+def image_placements(pdf: bytes) -> list:
+    """Matrices de imagen (cm ... Do) por página, sin el nombre del XObject."""
+    placements = []
+    for page in PyPDF2.PdfReader(io.BytesIO(pdf)).pages:
+        contents = page["/Contents"]
+        streams = contents if isinstance(contents, list) else [contents]
+        data = b"".join(stream.get_object().get_data() for stream in streams)
+        placements.append(re.findall(rb"([\d. ]+) cm /\w+ Do", data))
+    return placements
+
+
+# ==================== CLASE 1: TEST FIRMA INCREMENTAL ====================
+
+@pytest.mark.report
+@pytest.mark.unit
+class TestStampSignature:
+    """Tests de la firma estampada sobre un dictamen ya generado"""
+
+    @pytest.mark.parametrize("results", [RESULTS, LONG_RESULTS], ids=["portada", "portada_en_pagina_2"])
+    def test_same_placement_as_full_render(self, results):
+        """Test que la firma queda donde la dibuja el render completo (aunque la zona pase a la página 2)"""
+        signature = signature_data_url()
+        original = generate_pdf_report(DATA, results)
+
+        signed = stamp_signature(original, signature)
+        full = generate_pdf_report(dict(DATA, signature_image=signature), results)
+
+        assert image_placements(signed) == image_placements(full)
+        assert len(PyPDF2.PdfReader(io.BytesIO(signed)).pages) == len(PyPDF2.PdfReader(io.BytesIO(original)).pages)
+
+    def test_appends_revision(self):
+        """Test que los bytes originales quedan intactos y se agrega una xref con /Prev"""
+        original = generate_pdf_report(DATA, RESULTS)
+        signed = stamp_signature(original, signature_data_url())
+        revision = signed[len(original):]
+
+        assert signed.startswith(original)
+        assert revision.count(b"startxref") == 1
+        assert b"/Prev" in revision
+        assert b"/SigI1" in revision
+
+    def test_rejects_missing_signature(self):
+        """Test firma vacía o sin data URL"""
+        original = generate_pdf_report(DATA, RESULTS)
+
+        for signature in ["", "no-es-base64"]:
+            with pytest.raises(ValueError):
+                stamp_signature(original, signature)
+
+    def test_rejects_pdf_without_signature_zone(self):
+        """Test PDF ajeno (sin etiqueta de firma): no se estampa"""
+        from fpdf import FPDF
+        other = FPDF()
+        other.add_page()
+
+        with pytest.raises(ValueError):
+            stamp_signature(bytes(other.output()), signature_data_url())
+
+
+# ==================== RUN ALL TESTS ====================
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--cov=pdf_signature", "--cov-report=term-missing"])
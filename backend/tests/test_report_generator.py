@@ -7,7 +7,8 @@ import os
 from pathlib import Path
 from fpdf import FPDF
 import PyPDF2
-from report_generator import PDFReport, generate_pdf_report
+from report_generator import PDFReport, generate_pdf_report, render_qr_png
+from render_queue import RenderQueue, DONE, ERROR
 
 
 # ==================== CLASE 1: TEST PDF BÁSICO ====================
@@ -352,6 +353,23 @@ class TestDigitalSignature:
             # Buscar indicadores de firma
             # (Depende de la implementación actual)
             assert len(text) > 0
+    
+    def test_signature_image_without_temp_files(self, temp_pdf_dir, valid_analysis_data, monkeypatch):
+        """Test que la firma Base64 se incrusta desde memoria (sin temp_sig_*.png)"""
+        import io
+        import base64
+        from PIL import Image
+        monkeypatch.chdir(temp_pdf_dir)
+        buffer = io.BytesIO()
+        Image.new("RGB", (60, 20), "white").save(buffer, format="PNG")
+        data = dict(valid_analysis_data)
+        data["signature_image"] = "data:image/png;base64," + base64.b64encode(buffer.getvalue()).decode()
+        
+        pdf = generate_pdf_report(data, {"ai_analysis": {"legal_justification": "Test"}})
+        
+        assert pdf.startswith(b"%PDF")
+        assert b"/Subtype /Image" in pdf
+        assert list(temp_pdf_dir.iterdir()) == []
 
 
 # ==================== CLASE 5: TEST QR CODE ====================
@@ -384,6 +402,27 @@ class TestQRCode:
         with open(result_path, 'rb') as pdf_file:
             pdf_reader = PyPDF2.PdfReader(pdf_file)
             assert len(pdf_reader.pages) > 0
+    
+    def test_qr_png_cached_by_payload(self, temp_pdf_dir, valid_analysis_data, monkeypatch):
+        """Test LRU de QRs: el mismo contenido no se vuelve a rasterizar ni toca disco"""
+        import re
+        import report_generator
+        monkeypatch.chdir(temp_pdf_dir)
+        render_qr_png.cache_clear()
+        payloads = []
+        monkeypatch.setattr(report_generator, "render_qr_png",
+                            lambda payload: payloads.append(payload) or render_qr_png(payload))
+        
+        generate_pdf_report(valid_analysis_data, {"ai_analysis": {"legal_justification": "Test"}})
+        render_qr_png(payloads[0])
+        
+        # El QR conserva la fecha y hora completas de generación (el contenido no cambia por la caché)
+        assert re.search(r" - \d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}", payloads[0])
+        info = render_qr_png.cache_info()
+        assert info.misses == 1
+        assert info.hits == 1
+        assert render_qr_png("otro contenido").startswith(b"\x89PNG")
+        assert not list(temp_pdf_dir.glob("temp_*.png"))
 
 
 # ==================== CLASE 6: TEST HEADER Y FOOTER ====================
@@ -649,6 +688,178 @@ class TestPDFValidation:
             pytest.fail(f"PDF is not readable: {e}")
 
 
+# ==================== CLASE 10: TEST COLA DE RENDER EN BACKGROUND ====================
+
+@pytest.mark.report
+@pytest.mark.integration
+class TestRenderQueue:
+    """Tests de la cola de renderizado de PDFs (render_queue.py)"""
+    
+    MIN_RESULTS = {
+        "basic_requirements": {},
+        "resumen_ejecutivo": {
+            "total_brigadistas": 0,
+            "nivel_riesgo_estimado": "",
+            "legal_justification_strict": ""
+        },
+        "presupuesto_inicial": [],
+        "checklist": [],
+        "ai_analysis": {"legal_justification": "Justificación legal de prueba"}
+    }
+    
+    def test_submit_returns_immediately_and_renders(self, temp_pdf_dir):
+        """Test que submit no bloquea y el PDF existe al terminar el job"""
+        queue = RenderQueue(max_workers=1)
+        filename = str(temp_pdf_dir / "test_queue.pdf")
+        data = {"municipio": "Guadalajara", "estado": "Jalisco", "m2_construccion": 100}
+        
+        job = queue.submit(generate_pdf_report, filename, data, self.MIN_RESULTS, filename, owner_id=7)
+        assert job["status"] in ("pending", "running", DONE)
+        assert job["owner_id"] == 7
+        
+        finished = queue.wait(job["job_id"], timeout=30)
+        queue.shutdown()
+        
+        assert finished["status"] == DONE
+        assert finished["finished_at"] is not None
+        assert os.path.exists(filename)
+        assert queue.get_by_filename(filename)["job_id"] == job["job_id"]
+    
+    def test_in_memory_render_kept_by_job(self, temp_pdf_dir, monkeypatch):
+        """Test render sin filename: bytes en memoria, sin archivos nuevos en el directorio"""
+        monkeypatch.chdir(temp_pdf_dir)
+        queue = RenderQueue(max_workers=1)
+        data = {"municipio": "Guadalajara", "estado": "Jalisco", "m2_construccion": 100}
+        
+        job = queue.submit(generate_pdf_report, "Dictamen_memoria.pdf", data, self.MIN_RESULTS)
+        finished = queue.wait(job["job_id"], timeout=30)
+        queue.shutdown()
+        
+        assert finished["status"] == DONE
+        assert finished["pdf"].startswith(b"%PDF")
+        assert not any(p.suffix == ".pdf" for p in temp_pdf_dir.iterdir())
+    
+    def test_failed_render_reports_error(self):
+        """Test que un render que falla queda en estado error con el mensaje"""
+        queue = RenderQueue(max_workers=1)
+        
+        def broken_render():
+            raise RuntimeError("fallo de layout")
+        
+        job = queue.submit(broken_render, "no_existe.pdf")
+        finished = queue.wait(job["job_id"], timeout=10)
+        queue.shutdown()
+        
+        assert finished["status"] == ERROR
+        assert "fallo de layout" in finished["error"]
+    
+    def test_finished_jobs_expire(self):
+        """Test que los jobs terminados se purgan después del TTL"""
+        queue = RenderQueue(max_workers=1, job_ttl=0)
+        
+        job = queue.submit(lambda: None, "a.pdf")
+        queue.wait(job["job_id"], timeout=10)
+        queue.submit(lambda: None, "b.pdf")  # submit purga los expirados
+        queue.shutdown()
+        
+        assert queue.get(job["job_id"]) is None
+        assert queue.get_by_filename("a.pdf") is None
+
+
+# ==================== CLASE 11: TEST PLANTILLAS DE PÁGINA ====================
+
+@pytest.mark.report
+@pytest.mark.unit
+class TestPageTemplates:
+    """Tests de los elementos fijos estampados desde plantillas (pdf_templates.py)"""
+    
+    RESULTS = {
+        "ai_analysis": {"legal_justification": "Justificación legal de prueba"},
+        "checklist": [
+            {"norma": "NOM-002-STPS FEDERAL", "titulo": "Incendios", "checks": [{"desc": "Extintores", "art": "5.1"}]}
+        ],
+        "presupuesto_inicial": [
+            {"id": "1", "categoria": "Extinción", "concepto": "Extintor PQS", "cantidad": 2,
+             "precio_unitario": 500.0, "norma": "NOM-002"}
+        ]
+    }
+    DATA = {"municipio": "Zapopan", "estado": "Jalisco", "tipo_inmueble": "Oficina", "m2_construccion": 800}
+    
+    def render(self, monkeypatch, use_templates):
+        import io
+        import report_generator
+        monkeypatch.setattr(report_generator, "USE_PAGE_TEMPLATES", use_templates)
+        pdf = generate_pdf_report(self.DATA, self.RESULTS)
+        return PyPDF2.PdfReader(io.BytesIO(pdf))
+    
+    def test_same_content_as_live_drawing(self, monkeypatch):
+        """Test que estampar las plantillas produce el mismo texto y páginas que dibujar en vivo"""
+        strip_time = lambda text: text.split("Generado el")[0]
+        live = [strip_time(p.extract_text()) for p in self.render(monkeypatch, False).pages]
+        stamped = [strip_time(p.extract_text()) for p in self.render(monkeypatch, True).pages]
+        
+        assert len(stamped) == len(live) > 1
+        assert stamped == live
+        assert "ANALISIS TÉCNICO DE OBLIGATORIEDAD EN MATERIA DE P.C." in stamped[1]
+    
+    def test_stamped_fonts_declared_per_page(self, monkeypatch):
+        """Test que cada página declara las fuentes usadas por el bloque estampado"""
+        reader = self.render(monkeypatch, True)
+        
+        for page in reader.pages:
+            fonts = page["/Resources"]["/Font"]
+            assert "/F3" in fonts  # Cursiva del pie de página
+    
+    def test_logo_decoded_once(self, monkeypatch):
+        """Test que cada documento recibe el logo ya decodificado (sin volver a leer el PNG)"""
+        import report_generator
+        from fpdf import image_parsing
+        monkeypatch.setattr(report_generator, "USE_PAGE_TEMPLATES", True)
+        report_generator.PDFReport()  # Construye el prototipo
+        
+        def fail(*args, **kwargs):
+            raise AssertionError("logo decodificado de nuevo")
+        monkeypatch.setattr(image_parsing, "get_img_info", fail)
+        pdf = report_generator.PDFReport()
+        pdf.add_page()
+        pdf.image(report_generator.LOGO_PATH, x=12, y=12, w=20)
+        
+        assert pdf.image_cache.images[report_generator.LOGO_PATH]["usages"] == 1
+    
+    def test_falls_back_to_live_drawing_when_internals_change(self, monkeypatch):
+        """Test que si un interno de fpdf2 cambió, las plantillas se desactivan y se dibuja en vivo"""
+        import report_generator
+        import pdf_templates
+        
+        registry = pdf_templates.TemplateRegistry(report_generator.PDFReport)
+        for name, draw in report_generator.chrome_templates._draws.items():
+            registry.register(name, draw)
+        monkeypatch.setattr(report_generator, "chrome_templates", registry)
+        monkeypatch.setattr(pdf_templates, "PDFResourceType", None)  # Simula un interno movido
+        
+        strip_time = lambda text: text.split("Generado el")[0]
+        live = [strip_time(p.extract_text()) for p in self.render(monkeypatch, False).pages]
+        fallback = [strip_time(p.extract_text()) for p in self.render(monkeypatch, True).pages]
+        
+        assert registry.enabled is False
+        assert fallback == live
+    
+    def test_import_without_internals(self, monkeypatch):
+        """Test que el módulo importa aunque fpdf2 ya no tenga los internos (sin plantillas ni caché prototipo)"""
+        import sys
+        import importlib.util
+        import pdf_templates
+        
+        monkeypatch.setitem(sys.modules, "fpdf.image_parsing", None)
+        spec = importlib.util.spec_from_file_location("pdf_templates_sin_internos", pdf_templates.__file__)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        
+        assert module.TEMPLATES_SUPPORTED is False
+        assert module.new_image_cache(()) is None
+        assert module.TemplateRegistry(object).enabled is False
+
+
 # ==================== RUN ALL TESTS ====================
 
 if __name__ == "__main__":
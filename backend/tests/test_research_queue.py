@@ -0,0 +1,214 @@
+"""
+Tests para research_queue.py
+Coverage target: > 80%
+"""
+import pytest
+import json
+import time
+import sqlite3
+import research_queue as queue_module
+from research_queue import ResearchQueue
+from state_registry import get_state_registry
+
+
+# ==================== FIXTURES ESPECÍFICAS ====================
+
+@pytest.fixture
+def base_dir(tmp_path):
+    """
+    Fixture de directorio base temporal con un estado existente.
+
+    Returns:
+        str: Directorio base (contiene data/states_db/jalisco.json)
+    """
+    states = tmp_path / "data" / "states_db"
+    states.mkdir(parents=True)
+    (states / "jalisco.json").write_text(json.dumps({
+        "state_law": {"ley_nombre": "Ley del Sistema Estatal de PC de Jalisco"},
+        "municipios": {"Guadalajara": {"reglamento": "Reglamento GDL"}}
+    }), encoding="utf-8")
+    return str(tmp_path)
+
+
+@pytest.fixture
+def research_calls():
+    """Municipios investigados por la IA falsa (uno por llamada)"""
+    return []
+
+
+@pytest.fixture
+def make_queue(tmp_path, research_calls):
+    """
+    Fixture fábrica de colas sobre una base SQLite temporal con IA falsa.
+
+    Returns:
+        callable: make_queue(**kwargs) -> ResearchQueue
+    """
+    queues = []
+
+    def fake_research(estado, municipio):
+        research_calls.append(municipio)
+        return {"reglamento": f"Reglamento de PC de {municipio} (IA)", "_ai_researched": True}
+
+    def factory(**kwargs):
+        kwargs.setdefault("db_path", str(tmp_path / "research_queue.sqlite"))
+        kwargs.setdefault("research_fn", fake_research)
+        queue = ResearchQueue(**kwargs)
+        queues.append(queue)
+        return queue
+
+    yield factory
+    for queue in queues:
+        queue.stop()
+
+
+# ==================== CLASE 1: TEST ENCOLADO Y DEDUPLICACIÓN ====================
+
+@pytest.mark.unit
+class TestEnqueue:
+    """Tests de encolado deduplicado y persistente"""
+
+    def test_dedup_same_municipality(self, make_queue, base_dir):
+        """Test que el mismo municipio se encola una sola vez"""
+        queue = make_queue()
+
+        assert queue.enqueue("Jalisco", "Zapopan", base_dir) is True
+        assert queue.enqueue("Jalisco", "Zapopan", base_dir) is False
+        assert queue.enqueue("Jalisco", "Tonalá", base_dir) is True
+        assert queue.stats()["depth"] == 2
+
+    def test_survives_restart(self, make_queue, base_dir):
+        """Test que los pendientes sobreviven a una nueva instancia (reinicio / otro worker)"""
+        make_queue().enqueue("Jalisco", "Zapopan", base_dir)
+
+        other = make_queue()
+        assert other.stats()["depth"] == 1
+        assert other.run_pending() == 1
+
+    def test_done_not_requeued_immediately(self, make_queue, base_dir):
+        """Test que un municipio recién investigado no se vuelve a encolar"""
+        queue = make_queue()
+        queue.enqueue("Jalisco", "Zapopan", base_dir)
+        queue.run_pending()
+
+        assert queue.enqueue("Jalisco", "Zapopan", base_dir) is False
+        assert queue.stats()["depth"] == 0
+
+
+# ==================== CLASE 2: TEST PROCESAMIENTO ====================
+
+@pytest.mark.unit
+class TestProcessing:
+    """Tests del worker: investigación, reintentos y límite de tasa"""
+
+    def test_job_upgrades_to_gold(self, make_queue, base_dir, research_calls):
+        """Test que el trabajo agrega el municipio al log del estado"""
+        queue = make_queue()
+        queue.enqueue("Jalisco", "Zapopan", base_dir)
+
+        assert queue.run_pending() == 1
+        assert research_calls == ["Zapopan"]
+        data = get_state_registry(base_dir).get("Jalisco")["municipios"]["Zapopan"]
+        assert data["reglamento"] == "Reglamento de PC de Zapopan (IA)"
+
+        stats = queue.stats()
+        assert stats["done"] == 1
+        assert stats["completed_last_minute"] == 1
+
+    def test_failure_retries_then_errors(self, make_queue, base_dir, monkeypatch):
+        """Test reintentos hasta RESEARCH_MAX_ATTEMPTS"""
+        monkeypatch.setattr(queue_module, "RESEARCH_MAX_ATTEMPTS", 2)
+
+        def failing_research(estado, municipio):
+            raise RuntimeError("API no disponible")
+
+        queue = make_queue(research_fn=failing_research)
+        queue.enqueue("Jalisco", "Zapopan", base_dir)
+
+        queue.run_pending(limit=1)
+        assert queue.stats()["depth"] == 1
+        queue.run_pending(limit=1)
+        assert queue.stats()["failed"] == 1
+        assert queue.stats()["depth"] == 0
+
+    def test_ai_fallback_retries_without_registering(self, make_queue, base_dir, monkeypatch):
+        """Test que si la IA cae al fallback genérico el trabajo se reintenta y no se registra"""
+        from ai_service import AIService
+        from municipality_auto_registry import research_municipality
+        monkeypatch.setattr(AIService, "research_municipal_regulations",
+                            lambda self, estado, municipio: self._generate_generic_municipal_structure(
+                                estado, municipio, "API no disponible"))
+
+        queue = make_queue(research_fn=research_municipality)
+        queue.enqueue("Jalisco", "Zapopan", base_dir)
+        queue.run_pending(limit=1)
+
+        assert queue.stats()["depth"] == 1
+        assert queue.stats()["done"] == 0
+        assert not get_state_registry(base_dir).has_municipality("Jalisco", "Zapopan")
+
+    def test_rate_limit_per_minute(self, make_queue, base_dir, research_calls):
+        """Test que no se inician más de max_per_minute investigaciones por minuto"""
+        queue = make_queue(max_per_minute=2)
+        for municipio in ["Zapopan", "Tonalá", "Tlaquepaque"]:
+            queue.enqueue("Jalisco", municipio, base_dir)
+
+        assert queue.run_pending() == 2
+        assert research_calls == ["Zapopan", "Tonalá"]
+        assert queue.stats()["depth"] == 1
+
+    def test_stale_running_job_recovered(self, make_queue, base_dir, tmp_path):
+        """Test que un trabajo de un worker caído vuelve a la cola"""
+        queue = make_queue()
+        queue.enqueue("Jalisco", "Zapopan", base_dir)
+        with sqlite3.connect(str(tmp_path / "research_queue.sqlite")) as conn:
+            conn.execute(
+                "UPDATE research_jobs SET status = 'running', started_at = ?",
+                (time.time() - queue_module.STALE_RUNNING_SECONDS - 1,)
+            )
+
+        assert queue.run_pending() == 1
+        assert queue.stats()["done"] == 1
+
+    def test_background_worker(self, make_queue, base_dir, research_calls):
+        """Test que el worker en background procesa lo encolado"""
+        queue = make_queue()
+        queue.start()
+        queue.enqueue("Jalisco", "Zapopan", base_dir)
+
+        deadline = time.time() + 5
+        while queue.stats()["done"] < 1 and time.time() < deadline:
+            time.sleep(0.05)
+
+        assert research_calls == ["Zapopan"]
+        assert queue.stats()["worker_alive"] is True
+
+
+# ==================== CLASE 3: TEST INTEGRACIÓN CON EL ÁRBOL LEGAL ====================
+
+@pytest.mark.integration
+class TestLegalTreeIntegration:
+    """Tests de Nivel Plata inmediato -> Nivel Oro tras la investigación"""
+
+    def test_silver_then_gold(self, make_queue, base_dir, monkeypatch):
+        """Test que el primer análisis no espera a la IA y el siguiente usa los datos investigados"""
+        import noms_library
+        queue = make_queue()
+        monkeypatch.setattr(noms_library, "BASE_DIR", base_dir)
+        monkeypatch.setattr(noms_library, "research_queue", queue)
+        profile = {"estado": "Jalisco", "municipio": "Zapopan"}
+
+        municipal = noms_library.get_applicable_noms(profile)[2]
+        assert municipal["checks"][0]["desc"] == "Reglamento de Protección Civil del Municipio de Zapopan"
+        assert queue.stats()["depth"] == 1
+
+        queue.run_pending()
+
+        municipal = noms_library.get_applicable_noms(profile)[2]
+        assert municipal["checks"][0]["desc"] == "Reglamento de PC de Zapopan (IA)"
+
+
+# ==================== RUN ALL TESTS ====================
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--cov=research_queue", "--cov-report=term-missing"])
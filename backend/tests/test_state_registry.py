@@ -0,0 +1,122 @@
+"""
+Tests para state_registry.py
+Coverage target: > 80%
+"""
+import pytest
+import os
+import json
+from state_registry import StateRegistry, get_state_registry
+
+
+# ==================== FIXTURES ESPECÍFICAS ====================
+
+@pytest.fixture
+def states_dir(tmp_path):
+    """
+    Fixture de directorio states_db temporal con dos estados.
+
+    Returns:
+        Path: Directorio con jalisco.json y nuevo_leon.json
+    """
+    states = tmp_path / "data" / "states_db"
+    states.mkdir(parents=True)
+    (states / "jalisco.json").write_text(json.dumps({
+        "state_law": {"ley_nombre": "Ley del Sistema Estatal de PC de Jalisco"},
+        "municipios": {"Guadalajara": {"reglamento": "Reglamento GDL"}, "Zapopan": {}}
+    }), encoding="utf-8")
+    (states / "nuevo_leon.json").write_text(json.dumps({
+        "municipios": {"Monterrey": {}}
+    }), encoding="utf-8")
+    return states
+
+
+# ==================== CLASE 1: TEST PRECARGA E ÍNDICE ====================
+
+@pytest.mark.unit
+class TestStateRegistryLookup:
+    """Tests de precarga y búsqueda"""
+
+    def test_load_all(self, states_dir):
+        """Test que se indexan todos los archivos al arranque"""
+        registry = StateRegistry(str(states_dir))
+
+        assert registry.load_all() == 2
+        assert registry.reload_count == 2
+
+    def test_lookup_by_state_name(self, states_dir):
+        """Test búsqueda por nombre de estado (con acentos / espacios)"""
+        registry = StateRegistry(str(states_dir))
+        registry.load_all()
+
+        assert registry.get("Nuevo León")["municipios"] == {"Monterrey": {}}
+        assert registry.has_municipality("Jalisco", "Zapopan") is True
+        assert registry.has_municipality("Jalisco", "Tlaquepaque") is False
+        assert registry.municipality_count("Jalisco") == 2
+
+    def test_missing_state(self, states_dir):
+        """Test estado sin archivo (fallback vacío)"""
+        registry = StateRegistry(str(states_dir))
+
+        assert registry.get("Yucatán") == {}
+        assert registry.signature("Yucatán") is None
+        assert registry.municipality_count("Yucatán") == 0
+
+    def test_lookups_do_not_reparse(self, states_dir):
+        """Test que las consultas repetidas no vuelven a leer el archivo"""
+        registry = StateRegistry(str(states_dir))
+        registry.load_all()
+
+        for _ in range(10):
+            registry.get("Jalisco")
+        assert registry.reload_count == 2
+
+
+# ==================== CLASE 2: TEST RECARGA INCREMENTAL ====================
+
+@pytest.mark.unit
+class TestStateRegistryRefresh:
+    """Tests de recarga cuando se reescribe un archivo"""
+
+    def test_reload_only_changed_state(self, states_dir):
+        """Test que solo se recarga el estado reescrito"""
+        registry = StateRegistry(str(states_dir))
+        registry.load_all()
+
+        data = json.loads((states_dir / "jalisco.json").read_text(encoding="utf-8"))
+        data["municipios"]["Tlaquepaque"] = {}
+        (states_dir / "jalisco.json").write_text(json.dumps(data), encoding="utf-8")
+
+        assert registry.has_municipality("Jalisco", "Tlaquepaque") is True
+        assert registry.has_municipality("Nuevo León", "Monterrey") is True
+        assert registry.reload_count == 3
+
+    def test_new_state_file(self, states_dir):
+        """Test que un estado creado después del arranque se detecta"""
+        registry = StateRegistry(str(states_dir))
+        registry.load_all()
+
+        (states_dir / "morelos.json").write_text(json.dumps({"municipios": {"Cuautla": {}}}), encoding="utf-8")
+
+        assert registry.has_municipality("Morelos", "Cuautla") is True
+
+    def test_corrupt_rewrite_keeps_previous(self, states_dir):
+        """Test que un archivo corrupto / a medio escribir no borra los datos vigentes"""
+        registry = StateRegistry(str(states_dir))
+        registry.load_all()
+
+        (states_dir / "jalisco.json").write_text("{ incompleto", encoding="utf-8")
+
+        assert registry.has_municipality("Jalisco", "Guadalajara") is True
+
+    def test_shared_registry_per_directory(self, states_dir):
+        """Test que get_state_registry reutiliza la instancia por directorio"""
+        base_dir = str(states_dir.parent.parent)
+
+        assert get_state_registry(base_dir) is get_state_registry(base_dir)
+        assert get_state_registry(base_dir).states_dir == os.path.join(base_dir, "data", "states_db")
+
+
+# ==================== RUN ALL TESTS ====================
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--cov=state_registry", "--cov-report=term-missing"])
@@ -16,17 +16,31 @@ const ResultsView = ({
 }) => {
     const [activeTab, setActiveTab] = useState('resumen');
 
+    // [NUEVO] El PDF se renderiza en background: esperar a que el job termine
+    const waitForRender = async (apiUrl, renderJob) => {
+        for (let attempt = 0; attempt < 60; attempt++) {
+            const jobRes = await axios.get(`${apiUrl}${renderJob.status_url}`);
+            if (jobRes.data.status === 'done') return;
+            if (jobRes.data.status === 'error') {
+                throw new Error(jobRes.data.error || 'Error al generar el PDF');
+            }
+            await new Promise((resolve) => setTimeout(resolve, 1000));
+        }
+        throw new Error('Tiempo de espera agotado generando el PDF');
+    };
+
     const downloadPDF = async () => {
         if (!result) return;
 
         try {
             // [NUEVO LOGICA: FIRMA]
             if (signatureImage) {
-                // Si hay firma, pedimos al backend que REGENERE el PDF con ella
+                // Si hay firma, el backend la estampa sobre el PDF ya generado (o lo regenera con ella)
                 const apiUrl = process.env.REACT_APP_API_URL || 'http://localhost:8000';
                 const payload = {
                     report_data: result.data,
-                    signature_image: signatureImage
+                    signature_image: signatureImage,
+                    pdf_filename: result.pdf_filename || null
                 };
 
                 // UX Feedback
@@ -59,6 +73,9 @@ const ResultsView = ({
             if (result.download_url) {
                 // [FIX] Usar blob request para incluir headers de auth
                 const apiUrl = process.env.REACT_APP_API_URL || 'http://localhost:8000';
+                if (result.render_job) {
+                    await waitForRender(apiUrl, result.render_job);
+                }
                 const fileRes = await axios.get(`${apiUrl}${result.download_url}`, {
                     responseType: 'blob'
                 });